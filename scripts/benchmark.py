@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark pipeline stages against synthetic data, fully offline.
+
+Usage:
+    python scripts/benchmark.py run [--scale 1 10 100] [--stage combine ...] [--output results.json]
+    python scripts/benchmark.py compare <base.json> <new.json>
+
+Each stage runs in its own process inside a synthetic data/ tree written by
+synthetic_data.py, so wall time and peak RSS are measured per stage. Results
+are written as JSON tagged with the git commit, ready to compare across commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import synthetic_data
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks')
+
+GET_GDF = "from lon_lat_lookup_gen import get_gdf; get_gdf({path!r})"
+KMZ = """
+import geopandas as gpd, pandas as pd
+from content_pack import gdf_to_kmz_with_bundled_icons
+df = pd.read_csv('data/us/raf/airfields.csv')
+gdf = gpd.GeoDataFrame(df, geometry=gpd.GeoSeries.from_wkt(df['geometry']), crs='EPSG:4326')
+gdf_to_kmz_with_bundled_icons(gdf, 'data/content-pack/barbless-maps/layers/RAF Airfield Guide.kmz')
+"""
+
+# name -> command run from the synthetic root
+STAGES = {
+    'get_gdf:faa': [sys.executable, '-c', GET_GDF.format(path='data/us/faa/nasr/APT_BASE.csv')],
+    'get_gdf:ourairports': [sys.executable, '-c', GET_GDF.format(path='data/world/ourairports/airports.csv')],
+    'get_gdf:daylight': [sys.executable, '-c', GET_GDF.format(path='data/world/osm/daylight/aerodrome.csv')],
+    'get_gdf:afac': [sys.executable, '-c', GET_GDF.format(path='data/mx/afac/aerodromos.csv')],
+    'get_gdf:cr': [sys.executable, '-c', GET_GDF.format(path='data/cr/ad-locales-v15.csv')],
+    'combine': [sys.executable, os.path.join(SCRIPTS_DIR, 'combine.py')],
+    'missing-from-ourairports': [sys.executable, os.path.join(SCRIPTS_DIR, 'missing-from-ourairports.py')],
+    'gas-grass': [sys.executable, os.path.join(SCRIPTS_DIR, 'gas-grass.py')],
+    'kmz': [sys.executable, '-c', KMZ],
+    # the three scripts above in one process, sharing parsed sources
+    'unidrome:build': [sys.executable, os.path.join(SCRIPTS_DIR, 'unidrome.py'), 'build'],
+}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_stage(name, root):
+    """Run one stage in its own process, returning wall time, CPU time and peak RSS of that process."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SCRIPTS_DIR, os.environ.get('PYTHONPATH')])))
+    # the instrumented scripts write their per-stage breakdown here
+    report_path = os.path.join(root, f"report-{name.replace(':', '-')}.json")
+    env['UNIDROME_REPORT'] = report_path
+    with tempfile.TemporaryFile() as stderr_file:
+        start = time.perf_counter()
+        process = subprocess.Popen(STAGES[name], cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=stderr_file)
+        # wait4 gives the resource usage of exactly this child
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors='replace')
+    process.returncode = returncode = os.waitstatus_to_exitcode(status)
+    result = {
+        'stage': name,
+        'wall_s': round(wall, 3),
+        'cpu_s': round(usage.ru_utime + usage.ru_stime, 3),
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),  # ru_maxrss is in KiB on Linux
+        'returncode': returncode,
+    }
+    if returncode != 0:
+        result['error'] = stderr.strip().splitlines()[-1] if stderr.strip() else ''
+    if os.path.exists(report_path):
+        with open(report_path) as file:
+            result['stages'] = json.load(file)['stages']
+    return result
+
+def prepare_root(root, scale, seed):
+    synthetic_data.generate(root, scale, seed)
+    icons = os.path.join(root, 'icons')
+    if not os.path.exists(icons):
+        shutil.copytree(os.path.join(REPO_DIR, 'icons'), icons)
+
+def run(scales, stages, seed, output, data_dir=None):
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'results': [],
+    }
+    for scale in scales:
+        root = os.path.join(data_dir, f"{scale}x") if data_dir else tempfile.mkdtemp(prefix=f"unidrome-bench-{scale}x-")
+        try:
+            start = time.perf_counter()
+            prepare_root(root, scale, seed)
+            print(f"{scale}x synthetic data generated in {time.perf_counter() - start:.1f}s at {root}")
+            for name in stages:
+                result = dict(run_stage(name, root), scale=scale)
+                report['results'].append(result)
+                status = 'ok' if result['returncode'] == 0 else f"failed: {result.get('error', '')}"
+                print(f"  {name:<28} {result['wall_s']:>9.2f}s {result['peak_rss_mb']:>9.1f} MB  {status}")
+        finally:
+            if not data_dir:
+                shutil.rmtree(root, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved to {output}")
+    return report
+
+def compare(base_path, new_path):
+    with open(base_path) as file:
+        base = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+    base_results = {(r['stage'], r['scale']): r for r in base['results']}
+    print(f"{'stage':<28} {'scale':>5} {'wall ' + base['commit']:>14} {'wall ' + new['commit']:>14} {'ratio':>7} {'rss ratio':>9}")
+    for result in new['results']:
+        key = (result['stage'], result['scale'])
+        if key not in base_results:
+            continue
+        before = base_results[key]
+        wall_ratio = result['wall_s'] / before['wall_s'] if before['wall_s'] else float('nan')
+        rss_ratio = result['peak_rss_mb'] / before['peak_rss_mb'] if before['peak_rss_mb'] else float('nan')
+        print(f"{key[0]:<28} {key[1]:>5} {before['wall_s']:>14.2f} {result['wall_s']:>14.2f} {wall_ratio:>7.2f} {rss_ratio:>9.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark pipeline stages on synthetic data.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Generate synthetic data and time each stage')
+    run_parser.add_argument('--scale', type=int, nargs='+', default=[1], help='Multiples of world scale, e.g. 1 10 100')
+    run_parser.add_argument('--stage', action='append', choices=list(STAGES), help='Stage to run, repeatable (default all)')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--data-dir', type=str, help='Keep the synthetic data here instead of a temporary directory')
+    run_parser.add_argument('--output', type=str, help='Results JSON (default benchmarks/<commit>.json)')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two results files')
+    compare_parser.add_argument('base', type=str)
+    compare_parser.add_argument('new', type=str)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        output = args.output or os.path.join(RESULTS_DIR, f"{git_commit()}.json")
+        run(args.scale, args.stage or list(STAGES), args.seed, output, args.data_dir)
+    else:
+        compare(args.base, args.new)
@@ -0,0 +1,147 @@
+"""
+DBSCAN clustering of source rows into aerodromes, incremental between runs.
+
+Each run's assignments are kept with the row's H3 cell in STATE_PATH. The next
+run compares rows by key and only re-clusters around what was added, removed
+or moved: every cell touched by a change plus its neighbors, and every cluster
+with a member there. Everything else keeps its aerodrome id. Ids of re-clustered
+aerodromes are carried over from the previous clusters they share rows with
+(see stable_ids), so they stay stable across runs, full rebuilds included, and
+a row only changes id when its cluster merges or splits.
+
+This gives the same clusters as a full run as long as 2 * EPS is well inside
+one cell at CELL_RESOLUTION, so no point within reach of a change can lie
+outside the neighbor ring of the change's cell.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.cluster import DBSCAN
+import h3_index
+
+STATE_PATH = 'data/world/unified/clusters.parquet'
+# degrees, about 550 m
+EPS = .005
+MIN_SAMPLES = 2
+# res 6 cells are about 3 km across, against 2 * EPS of about 1.1 km
+CELL_RESOLUTION = 6
+# re-cluster everything when a change reaches more than this share of the rows
+FULL_REBUILD_FRACTION = .5
+
+def dbscan(lon, lat):
+    """DBSCAN labels with each noise point (-1) given a label of its own."""
+    if len(lon) == 0:
+        return np.zeros(0, dtype=np.int64)
+    labels = DBSCAN(eps=EPS, min_samples=MIN_SAMPLES).fit(np.column_stack([lon, lat])).labels_
+    noise = labels == -1
+    labels[noise] = labels.max(initial=-1) + 1 + np.arange(noise.sum())
+    return labels
+
+def row_keys(refs):
+    """Unique keys from source refs, numbering repeats (and rows without one) in order of appearance."""
+    refs = refs.astype('string').fillna('')
+    return refs + '#' + refs.groupby(refs).cumcount().astype(str)
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return None
+    return pq.read_table(path).to_pandas()
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(state, preserve_index=False), path, compression='zstd')
+
+def stable_ids(labels, previous_ids, next_id, moved=None):
+    """
+    Map new cluster labels to aerodrome ids, reusing previous ids (NaN previous_ids are new rows)
+    and numbering labels left without one from next_id.
+
+    Previous ids are handed out greedily over (label, previous id) pairs, most shared rows that
+    did not move first, then most shared rows, then the oldest (lowest) id, each label and each
+    id used once:
+    - a merged cluster keeps the id of its largest member cluster, the oldest of equally large
+      ones, and the other members' ids are retired
+    - the largest part of a split cluster keeps its id, and the other parts take the id of
+      another cluster they have rows of if it is still free, or a new one
+    So rows that stayed put keep their id over rows that moved away from them.
+    """
+    if moved is None:
+        moved = np.zeros(len(labels), dtype=bool)
+    pairs = pd.DataFrame({'label': labels, 'previous': previous_ids, 'stayed': ~np.asarray(moved)}).dropna()
+    counts = pairs.groupby(['label', 'previous']).agg(stayed=('stayed', 'sum'), rows=('stayed', 'size')).reset_index()
+    counts = counts.sort_values(['stayed', 'rows', 'previous', 'label'], ascending=[False, False, True, True],
+                                kind='stable')
+    # sequential, so a label whose best id went to a bigger overlap still gets its next best free one
+    mapping = {}
+    taken = set()
+    for label, previous in zip(counts['label'].to_numpy(), counts['previous'].to_numpy(dtype=np.int64)):
+        if label not in mapping and previous not in taken:
+            mapping[label] = previous
+            taken.add(previous)
+    mapping = pd.Series(mapping, dtype=np.int64)
+
+    unique_labels = np.unique(labels)
+    unmatched = unique_labels[~np.isin(unique_labels, mapping.index)]
+    mapping = pd.concat([mapping, pd.Series(next_id + np.arange(len(unmatched)), index=unmatched)])
+    return mapping.reindex(labels).to_numpy(dtype=np.int64)
+
+def moved_rows(current, previous, position):
+    """Whether each current row moved since previous, position being its previous row or -1."""
+    known = position >= 0
+    before = previous.iloc[position[known]]
+    moved = np.zeros(len(current), dtype=bool)
+    moved[known] = ((current['lon'].to_numpy()[known] != before['lon'].to_numpy())
+                    | (current['lat'].to_numpy()[known] != before['lat'].to_numpy()))
+    return moved
+
+def changed_cells(current, previous, position, moved):
+    """Cells of rows that were added, removed or moved, position being each current row's previous row or -1."""
+    known = position >= 0
+    gone = np.ones(len(previous), dtype=bool)
+    gone[position[known]] = False
+    gone[position[moved]] = True
+    return np.union1d(current['cell'].to_numpy()[~known | moved], previous['cell'].to_numpy()[gone])
+
+def assign(keys, lon, lat, cells, previous=None, full=False):
+    """
+    Aerodrome ids for rows identified by keys, re-clustering only around changes since previous.
+
+    Returns the ids and the number of rows that were re-clustered.
+    """
+    current = pd.DataFrame({'key': np.asarray(keys, dtype=object), 'lon': np.asarray(lon, dtype=float),
+                            'lat': np.asarray(lat, dtype=float), 'cell': np.asarray(cells, dtype=np.uint64)})
+    if previous is None or len(previous) == 0:
+        return stable_ids(dbscan(current['lon'], current['lat']), np.full(len(current), np.nan), 0), len(current)
+
+    # one hashed lookup of every key, rather than isin/map which loop in Python over Arrow strings
+    position = pd.Index(previous['key'].to_numpy(dtype=object)).get_indexer(current['key'])
+    previous_ids = np.where(position >= 0, previous['aerodrome_id'].to_numpy()[position], np.nan)
+    next_id = int(previous['aerodrome_id'].max()) + 1
+    moved = moved_rows(current, previous, position)
+
+    subset = np.ones(len(current), dtype=bool)
+    if not full:
+        touched = changed_cells(current, previous, position, moved)
+        if len(touched):
+            region = np.unique(np.concatenate([h3_index.neighbors(cell) for cell in touched]))
+        else:
+            region = np.zeros(0, dtype=np.uint64)
+        # whole clusters with any member in the region, as they were and as they are now
+        affected = np.union1d(previous['aerodrome_id'][np.isin(previous['cell'], region)].to_numpy(),
+                              previous_ids[np.isin(current['cell'], region)])
+        subset = np.isin(current['cell'], region) | np.isin(previous_ids, affected)
+        if subset.sum() > FULL_REBUILD_FRACTION * len(current):
+            subset[:] = True
+
+    ids = previous_ids.copy()
+    labels = dbscan(current['lon'][subset], current['lat'][subset])
+    ids[subset] = stable_ids(labels, previous_ids[subset], next_id, moved[subset])
+    return ids.astype(np.int64), int(subset.sum())
+
+def state(keys, lon, lat, cells, ids):
+    return pd.DataFrame({'key': np.asarray(keys, dtype=object), 'lon': np.asarray(lon, dtype=float),
+                         'lat': np.asarray(lat, dtype=float), 'cell': np.asarray(cells, dtype=np.uint64),
+                         'aerodrome_id': ids})
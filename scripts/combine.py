@@ -1,79 +1,110 @@
-from lon_lat_lookup_gen import lon_lat_lookup, get_all_gdfs
+import argparse
+import os
+from lon_lat_lookup_gen import lon_lat_lookup
 import geopandas as gpd
 import pandas as pd
-import h3pandas
-from sklearn.cluster import DBSCAN
 import numpy as np
-
-gdfs = get_all_gdfs()
-for file in gdfs:
-    # filter out closed airports and heliports
-    g = gdfs[file]
-    airports = g[g['_is_airport'] == True]
-    active = airports[airports['_is_active'] == True]
-    gdfs[file] = active
-
-
-prefixes = [ f"{k.replace('data/', '').replace('.csv', '').replace('/', '_').replace('.', '_')}_" for k in lon_lat_lookup ]
-gdfs = [gdfs[file] for file in gdfs]
-all_gdf_cnt = len(gdfs)
-prefixed_gdfs = []
-for gdf, prefix in zip(gdfs, prefixes):
-    prefixed_gdf = gdf.rename(columns=lambda x: f"{prefix}{x}" if x != 'geometry' else x)
-    prefixed_gdfs.append(prefixed_gdf)
-gdfs = prefixed_gdfs
-
-for gdf in gdfs:
-    gdf.set_crs(epsg=4326, inplace=True)
-
-for i, gdf in enumerate(gdfs):
-    gdfs[i] = gdf.rename(columns={'geometry': f'geometry_temp_{i}'})
-
-# Concatenate all GeoDataFrames
-combined_gdf = pd.concat(gdfs, ignore_index=True)
-
-# Combine the geometry columns into one efficiently
-geometry_cols = [f'geometry_temp_{i}' for i in range(len(gdfs))]
-combined_gdf['geometry'] = combined_gdf[geometry_cols[0]]
-for col in geometry_cols[1:]:
-    combined_gdf['geometry'] = combined_gdf['geometry'].combine_first(combined_gdf[col])
-
-# Drop the temporary geometry columns
-combined_gdf = combined_gdf.drop(columns=geometry_cols)
-
-# Convert the combined DataFrame back to a GeoDataFrame
-combined_gdf = gpd.GeoDataFrame(combined_gdf, geometry='geometry')
-#combined_gdf = combined_gdf[combined_gdf['us_faa_nasr_APT_BASE_SITE_TYPE_CODE'] != 'H']
-#combined_gdf = combined_gdf[combined_gdf['world_ourairports_airports_type'] != 'heliport']
-#combined_gdf = combined_gdf[combined_gdf['world_ourairports_airports_type'] != 'closed']
-#combined_gdf = combined_gdf[~combined_gdf['world_osm_daylight_aerodrome_name'].str.contains('heliport', case=False, na=False)]
-
-#combined_gdf = combined_gdf.h3.geo_to_h3(3)
-gdf = combined_gdf
-coords = np.array(list(zip(gdf.geometry.x, gdf.geometry.y)))
-    
-# Perform DBSCAN clustering
-db = DBSCAN(eps=.005, min_samples=2).fit(coords)
-labels = db.labels_
-gdf['cluster'] = db.labels_
-
-# Number of clusters in labels, ignoring noise if present.
-n_clusters_ = len(set(labels)) - (1 if -1 in labels else 0)
-n_noise_ = list(labels).count(-1)
-
-print("Estimated number of clusters: %d" % n_clusters_)
-print("Estimated number of noise points: %d" % n_noise_)
-
-# Aggregate based on cluster
-singles = gdf[gdf["cluster"] == -1]
-clusters = gdf[gdf["cluster"] != -1].dissolve(by='cluster')
-
-# Convert singles to GeoDataFrame to concatenate
-#singles = gpd.GeoDataFrame(singles, geometry='geometry')
-
-# Concatenate clusters and singles
-clusters = pd.concat([clusters, singles])
-
-# Save the result to a new layer called "clusters"
-clusters.to_file("package.gpkg", layer='clusters', driver="GPKG")
-
+import instrument
+import h3_index
+import consolidate
+import clustering
+from datasets import Datasets
+
+UNIFIED_PATH = 'data/world/unified/aerodromes'
+# one point per aerodrome, what query_service.py serves
+SNAPSHOT_PATH = 'data/world/unified/snapshot.parquet'
+
+def main(datasets, full=False):
+    gdfs = datasets.all_aerodromes()
+    with instrument.stage('filter_active', rows_in=sum(len(g) for g in gdfs.values())) as s:
+        for file in gdfs:
+            # filter out closed airports and heliports
+            g = gdfs[file]
+            airports = g[g['_is_airport'] == True]
+            active = airports[airports['_is_active'] == True]
+            gdfs[file] = active
+        s.rows_out = sum(len(g) for g in gdfs.values())
+
+
+    # the unified fields of every row, in the same order as the concatenated frame below
+    runways = consolidate.runway_summaries(datasets)
+    rows = pd.concat([consolidate.candidates(file, gdfs[file], runways) for file in gdfs], ignore_index=True)
+
+    prefixes = [ f"{k.replace('data/', '').replace('.csv', '').replace('/', '_').replace('.', '_')}_" for k in lon_lat_lookup ]
+    gdfs = [gdfs[file] for file in gdfs]
+    all_gdf_cnt = len(gdfs)
+    prefixed_gdfs = []
+    for gdf, prefix in zip(gdfs, prefixes):
+        prefixed_gdf = gdf.rename(columns=lambda x: f"{prefix}{x}" if x != 'geometry' else x)
+        prefixed_gdfs.append(prefixed_gdf)
+    gdfs = prefixed_gdfs
+
+    for gdf in gdfs:
+        gdf.set_crs(epsg=4326, inplace=True)
+
+    for i, gdf in enumerate(gdfs):
+        gdfs[i] = gdf.rename(columns={'geometry': f'geometry_temp_{i}'})
+
+    with instrument.stage('concat') as s:
+        # Concatenate all GeoDataFrames
+        combined_gdf = pd.concat(gdfs, ignore_index=True)
+
+        # Combine the geometry columns into one efficiently
+        geometry_cols = [f'geometry_temp_{i}' for i in range(len(gdfs))]
+        combined_gdf['geometry'] = combined_gdf[geometry_cols[0]]
+        for col in geometry_cols[1:]:
+            combined_gdf['geometry'] = combined_gdf['geometry'].combine_first(combined_gdf[col])
+
+        # Drop the temporary geometry columns
+        combined_gdf = combined_gdf.drop(columns=geometry_cols)
+
+        # Convert the combined DataFrame back to a GeoDataFrame
+        combined_gdf = gpd.GeoDataFrame(combined_gdf, geometry='geometry')
+        s.rows_out = len(combined_gdf)
+    #combined_gdf = combined_gdf[combined_gdf['us_faa_nasr_APT_BASE_SITE_TYPE_CODE'] != 'H']
+    #combined_gdf = combined_gdf[combined_gdf['world_ourairports_airports_type'] != 'heliport']
+    #combined_gdf = combined_gdf[combined_gdf['world_ourairports_airports_type'] != 'closed']
+    #combined_gdf = combined_gdf[~combined_gdf['world_osm_daylight_aerodrome_name'].str.contains('heliport', case=False, na=False)]
+
+    # uint64 H3 cells at each of h3_index.RESOLUTIONS, for integer grouping and neighbor lookups
+    with instrument.stage('h3', rows_in=len(combined_gdf)):
+        combined_gdf = h3_index.add_point_cells(combined_gdf)
+    gdf = combined_gdf
+    # aerodrome ids stay stable across runs, only the area around changed rows is re-clustered
+    with instrument.stage('cluster', rows_in=len(gdf)) as s:
+        keys = clustering.row_keys(rows['ref'])
+        lon, lat = rows['lon'].to_numpy(), rows['lat'].to_numpy()
+        cells = gdf[h3_index.column_name(clustering.CELL_RESOLUTION)].to_numpy()
+        ids, reclustered = clustering.assign(keys, lon, lat, cells, clustering.load_state(), full=full)
+        gdf['aerodrome_id'] = ids
+        clustering.save_state(clustering.state(keys, lon, lat, cells, ids))
+        s.rows_out = reclustered
+
+    print(f"Re-clustered {reclustered} of {len(gdf)} rows into {len(np.unique(ids))} aerodromes")
+
+    # Every source row with its cells, cluster and aerodrome, partitioned by the coarsest cell
+    with instrument.stage('write_unified', rows_in=len(gdf)):
+        h3_index.write_partitioned(gdf, UNIFIED_PATH)
+
+    # One point per aerodrome, fields merged by source priority (see consolidate.py)
+    with instrument.stage('consolidate', rows_in=len(gdf)) as s:
+        aerodromes = consolidate.consolidate(rows, gdf['aerodrome_id'].to_numpy())
+        aerodromes = h3_index.add_point_cells(aerodromes)
+        s.rows_out = len(aerodromes)
+
+    # written aside and renamed over the last one, so a running query service only ever reloads a whole file
+    with instrument.stage('write_snapshot', rows_in=len(aerodromes)):
+        aerodromes.to_parquet(f'{SNAPSHOT_PATH}.tmp', compression='zstd')
+        os.replace(f'{SNAPSHOT_PATH}.tmp', SNAPSHOT_PATH)
+
+    # Save the result to a new layer called "clusters"
+    with instrument.stage('write_gpkg', rows_in=len(aerodromes)):
+        aerodromes.to_file("package.gpkg", layer='clusters', driver="GPKG")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Combine all aerodrome sources into one point per aerodrome.')
+    parser.add_argument('--full', action='store_true',
+                        help=f'Re-cluster every row instead of only those around changes since {clustering.STATE_PATH}')
+    args = parser.parse_args()
+
+    main(Datasets(), full=args.full)
@@ -1,10 +1,9 @@
 #!/bin/bash -ex
 
 #python scripts/overpass-osm.py
-python scripts/gas-grass.py
-python scripts/google-places.py
-cd data/content-pack 
-rm -f barbless-maps.zip
-zip -r barbless-maps barbless-maps
-cd -
-rclone copy data/content-pack/barbless-maps.zip vue-barbless:vue-barbless/content-packs/
+# one process, so APT_BASE.csv is parsed once for both layers
+python scripts/unidrome.py gas-grass google-places
+# the full pack plus a delta against the last published one, both in data/content-pack/build
+python scripts/content-pack.py build
+rclone copy data/content-pack/build/ vue-barbless:vue-barbless/content-packs/ --include "*.zip"
+python scripts/content-pack.py published
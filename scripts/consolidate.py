@@ -0,0 +1,171 @@
+"""
+Consolidate clustered source rows into one point per aerodrome.
+
+Each lon_lat_lookup source maps its own columns onto a few unified fields.
+Rows of a cluster are sorted by source priority, and every field is merged
+with an explicit rule: the first non-null value by priority, the longest
+runway, the union of identifiers, or of fuel and surface bits. Everything is sort and groupby over
+whole columns, no geometry unions.
+"""
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.compute as pc
+import shapely
+import fuels
+import surfaces
+
+FEET_PER_METRE = 3.28084
+
+# in priority order: national authorities, then OurAirports, then OSM and Wikidata.
+# key is the source's own row id, fields map unified names to source columns,
+# weight is the source's share of a weighted centroid location
+SOURCES = {
+    'data/us/faa/nasr/APT_BASE.csv': {
+        'source': 'faa', 'key': 'SITE_NO', 'weight': 4,
+        'fields': {'name': 'ARPT_NAME', 'icao': 'ICAO_ID', 'ident': 'ARPT_ID', 'elevation_ft': 'ELEV'},
+    },
+    'data/mx/afac/aerodromos.csv': {
+        'source': 'afac', 'key': 'NO. DE EXPEDIENTE', 'weight': 3,
+        'fields': {'name': 'NOMBRE', 'ident': 'DESIGNADOR', 'elevation_m': 'ELEV (M)'},
+    },
+    # DESIGNADOR holds the MRxx ICAO codes, OACI despite its name the municipality
+    'data/cr/ad-locales-v15.csv': {
+        'source': 'cr', 'key': 'DESIGNADOR', 'weight': 3,
+        'fields': {'name': 'AERÓDROMO', 'icao': 'DESIGNADOR', 'ident': 'DESIGNADOR'},
+    },
+    'data/world/ourairports/airports.csv': {
+        'source': 'ourairports', 'key': 'id', 'weight': 2,
+        'fields': {'name': 'name', 'icao': 'icao_code', 'iata': 'iata_code', 'ident': 'ident',
+                   'elevation_ft': 'elevation_ft'},
+    },
+    'data/world/osm/daylight/aerodrome.csv': {
+        'source': 'osm', 'key': 'id', 'weight': 1,
+        'fields': {'name': 'name', 'icao': 'icao', 'ident': 'ref', 'elevation_m': 'ele'},
+    },
+    'data/world/wikidata/airports.csv': {
+        'source': 'wikidata', 'key': 'airport', 'weight': 1,
+        'fields': {'name': 'minName', 'icao': 'minICAO', 'iata': 'minIATA', 'elevation_m': 'minEle'},
+    },
+}
+PRIORITY = {path: i for i, path in enumerate(SOURCES)}
+
+# merge rules per unified field
+FIRST = ['name', 'icao', 'iata', 'ident', 'elevation_ft']
+MAX = ['longest_runway_ft', 'runways']
+# bitwise or: any source reporting a fuel or a runway surface
+ANY = [fuels.FUEL_COLUMN, 'surface_mask']
+# identifiers are the source row refs plus codes, e.g. faa:12345.*A;icao:KSFO;ourairports:3878
+CODES = ['icao', 'iata']
+
+def runway_summaries(datasets):
+    """
+    Longest runway in feet, runway count and surfaces.mask bits per source key,
+    for the sources that publish runways separately.
+    """
+    faa = datasets.faa_runways()
+    ourairports = datasets.csv('data/world/ourairports/runways.csv')
+    return {
+        'data/us/faa/nasr/APT_BASE.csv': summarize(faa, 'SITE_NO', 'RWY_LEN'),
+        'data/world/ourairports/airports.csv': summarize(ourairports, 'airport_ref', 'length_ft'),
+    }
+
+def summarize(runways, key, length):
+    """longest_runway_ft, runways and surface_mask per key (as text) of a runway frame."""
+    codes, keys = pd.factorize(runways[key].astype(str))
+    longest = np.full(len(keys), np.nan)
+    np.fmax.at(longest, codes, runways[length].to_numpy(dtype=float))
+    surface_mask = np.zeros(len(keys), dtype=np.uint8)
+    np.bitwise_or.at(surface_mask, codes, surfaces.mask(runways[surfaces.SURFACE_COLUMN]))
+    return pd.DataFrame({'longest_runway_ft': longest, 'runways': np.bincount(codes, minlength=len(keys)),
+                         'surface_mask': surface_mask}, index=keys)
+
+def text(values):
+    """Strings with blanks as missing, whatever the source column's dtype."""
+    values = values.astype('string').str.strip()
+    return values.mask(values == '')
+
+def candidates(path, gdf, runways=None):
+    """The unified fields of one source's rows, aligned with gdf."""
+    source = SOURCES[path]
+    fields = source['fields']
+    df = pd.DataFrame(index=gdf.index)
+    df['source'] = source['source']
+    df['priority'] = PRIORITY[path]
+    df['weight'] = source['weight']
+    df['lon'] = shapely.get_x(gdf.geometry.values)
+    df['lat'] = shapely.get_y(gdf.geometry.values)
+    for field in ['name', 'icao', 'iata', 'ident']:
+        df[field] = text(gdf[fields[field]]) if field in fields else pd.Series(pd.NA, index=gdf.index, dtype='string')
+    if 'elevation_ft' in fields:
+        df['elevation_ft'] = pd.to_numeric(gdf[fields['elevation_ft']], errors='coerce')
+    elif 'elevation_m' in fields:
+        df['elevation_ft'] = pd.to_numeric(gdf[fields['elevation_m']], errors='coerce') * FEET_PER_METRE
+    else:
+        df['elevation_ft'] = np.nan
+    key = text(gdf[source['key']])
+    df['ref'] = source['source'] + ':' + key
+    if runways is not None and path in runways:
+        # keys compared as text, the runway files type them differently from the aerodrome files
+        summary = runways[path].reindex(key.to_numpy(dtype=object))
+        df['longest_runway_ft'] = summary['longest_runway_ft'].to_numpy(dtype=float)
+        df['runways'] = summary['runways'].fillna(0).to_numpy(dtype=np.int64)
+        df['surface_mask'] = summary['surface_mask'].fillna(0).to_numpy(dtype=np.uint8)
+    else:
+        df['longest_runway_ft'] = np.nan
+        df['runways'] = 0
+        df['surface_mask'] = np.uint8(0)
+    # set by schemas.read_frame for sources with a fuel column
+    df[fuels.FUEL_COLUMN] = gdf[fuels.FUEL_COLUMN] if fuels.FUEL_COLUMN in gdf else np.uint16(0)
+    return df
+
+def union(values):
+    """';'-joined sorted distinct non-null values per index label."""
+    values = values.dropna()
+    pairs = pd.DataFrame({'group': values.index, 'value': values.to_numpy()})
+    pairs = pairs.drop_duplicates().sort_values(['group', 'value'])
+    # each group is a run of the sorted pairs, joined in one pass as an Arrow list array
+    groups = pairs['group'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    offsets = pa.array(np.r_[starts, len(groups)], pa.int32())
+    lists = pa.ListArray.from_arrays(offsets, pa.array(pairs['value'].to_numpy(dtype=object), pa.string()))
+    return pd.Series(pc.binary_join(lists, ';').to_numpy(zero_copy_only=False), index=groups[starts])
+
+def consolidate(rows, groups, location='priority'):
+    """
+    One point per group of candidate rows.
+
+    location='priority' places it at the highest priority source's point,
+    location='centroid' at the source-weighted mean of the group's points.
+    """
+    df = rows.assign(aerodrome_id=groups).sort_values(['aerodrome_id', 'priority'], kind='stable')
+    grouped = df.groupby('aerodrome_id', sort=True)
+
+    # groupby first skips nulls, so after the sort it is the first non-null value by priority
+    result = grouped[FIRST].first()
+    result[MAX] = grouped[MAX].max()
+    # groups are runs of the sorted rows, reduced in one pass
+    aerodrome_ids = df['aerodrome_id'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, aerodrome_ids[1:] != aerodrome_ids[:-1]])
+    for field in ANY:
+        result[field] = np.bitwise_or.reduceat(df[field].to_numpy(), starts)
+
+    if location == 'priority':
+        result[['lon', 'lat']] = grouped[['lon', 'lat']].first()
+    elif location == 'centroid':
+        weighted = df[['lon', 'lat']].mul(df['weight'], axis=0).groupby(df['aerodrome_id']).sum()
+        result[['lon', 'lat']] = weighted.div(grouped['weight'].sum(), axis=0)
+    else:
+        raise ValueError(f"unknown location {location!r}, expected 'priority' or 'centroid'")
+
+    ids = df.set_index('aerodrome_id')
+    identifiers = pd.concat([ids['ref']] + [kind + ':' + ids[kind] for kind in CODES])
+    result['identifiers'] = union(identifiers)
+    result['sources'] = union(ids['source'])
+    result['members'] = grouped.size()
+
+    result = result.reset_index()
+    geometry = gpd.points_from_xy(result['lon'], result['lat'])
+    return gpd.GeoDataFrame(result.drop(columns=['lon', 'lat']), geometry=geometry, crs='EPSG:4326')
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Package the content pack for upload.
+
+Usage:
+    python scripts/content-pack.py build [--version 3]
+    python scripts/content-pack.py published
+
+build writes data/content-pack/build/barbless-maps.zip and, once a pack has
+been published, barbless-maps-delta-<from>-<to>.zip with only the features
+added, changed and removed since then. published records the build as the pack
+the next delta is made against, run it after the upload succeeds.
+
+The work is done in content_pack.py.
+"""
+
+import argparse
+import content_pack
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build full and delta content pack zips.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='Zip the pack and a delta against the last published pack')
+    build_parser.add_argument('--version', type=int, help='Manifest version (default the published version + 1)')
+    subparsers.add_parser('published', help='Mark the last build as published')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        content_pack.build(version=args.version)
+    else:
+        content_pack.mark_published()
@@ -1,7 +1,42 @@
 
+"""
+Content pack layers and packaging.
+
+A build zips the pack and, against the last published pack, a delta of the
+features added, changed and removed per layer plus changed icons. Features
+are tracked by a stable id per layer: LAYER_IDS for GeoJSON layers, the
+placemark id written by gdf_to_kmz_with_bundled_icons for KMZ layers.
+"""
+
+import hashlib
+import json
 import os
-import simplekml
+import shutil
+import xml.etree.ElementTree as ET
 import zipfile
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+import simplekml
+
+CONTENT_PACK_DIR = 'data/content-pack'
+PACK_NAME = 'barbless-maps'
+# the index and manifest of the last published pack, which deltas are made against
+PUBLISHED_DIR = os.path.join(CONTENT_PACK_DIR, 'published')
+# zips to upload, with the index and manifest to mark published once they are
+BUILD_DIR = os.path.join(CONTENT_PACK_DIR, 'build')
+# id property per GeoJSON and FlatGeobuf layer name, features of other layers are keyed by their content
+LAYER_IDS = {
+    'Gas and Grass': 'ARPT_ID',
+}
+LAYER_EXTENSIONS = ('.geojson', '.fgb', '.kmz')
+# decimal places of written coordinates, 1e-5 degrees is about a metre
+LAYER_PRECISION = 5
+# features per write when streaming a compact GeoJSON layer
+LAYER_CHUNK = 50000
+ICONS = 'icons'
+KML_NS = '{http://www.opengis.net/kml/2.2}'
 
 def series_to_html_table(series, columns=None):
     if columns is not None:
@@ -14,13 +49,16 @@ def series_to_html_table(series, columns=None):
     return html
 
 # local path of icons should be passed at gfd["icon_path"]
-def gdf_to_kmz_with_bundled_icons(gdf, file_path):
+# id_column is written to each placemark's ExtendedData as id, the key delta packs track features by
+def gdf_to_kmz_with_bundled_icons(gdf, file_path, id_column=None):
     kml = simplekml.Kml()
 
     for _, row in gdf.iterrows():
         geom = row.geometry
         if geom.geom_type == 'Point':
             point = kml.newpoint(name=row.get('name', ''), coords=[(geom.x, geom.y)])
+            if id_column is not None:
+                point.extendeddata.newdata(name='id', value=str(row[id_column]))
             if "icon_path" in row:
                 point.style.iconstyle.icon.href = os.path.basename(row["icon_path"])
                 point.style.iconstyle.color = simplekml.Color.white
@@ -45,3 +83,236 @@ def gdf_to_kmz_with_bundled_icons(gdf, file_path):
     # Remove the temporary KML file
     os.remove(kml_path)
 
+
+def geojson_geometries(geometry, precision):
+    """Minified GeoJSON geometries snapped to precision decimal places, for the whole array at once."""
+    snapped = shapely.set_precision(geometry, 10 ** -precision)
+    # snapping leaves float noise like 0.30000000000000004, cut it back to precision digits
+    return pd.Series(shapely.to_geojson(snapped)).str.replace(rf'(\.\d{{{precision}}})\d+', r'\1', regex=True)
+
+def write_compact_geojson(gdf, path, precision):
+    """
+    RFC 7946 GeoJSON without the CRS block or whitespace, one string per column
+    joined per chunk of features rather than serialized feature by feature.
+    """
+    properties = gdf.drop(columns=gdf.geometry.name)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('{"type":"FeatureCollection","features":[')
+        for start in range(0, len(gdf), LAYER_CHUNK):
+            chunk = slice(start, start + LAYER_CHUNK)
+            # only '\n' ends a record, splitlines() would also split on U+2028 and the like inside values
+            records = properties.iloc[chunk].to_json(orient='records', lines=True, force_ascii=False)
+            records = records.rstrip('\n').split('\n')
+            features = ('{"type":"Feature","properties":' + pd.Series(records) + ',"geometry":'
+                        + geojson_geometries(gdf.geometry.values[chunk], precision) + '}')
+            file.write((',' if start else '') + ','.join(features))
+        file.write(']}')
+
+def write_layer(gdf, path, precision=LAYER_PRECISION):
+    """
+    Write a content pack layer compactly: coordinates quantized to precision decimal
+    places and features in Hilbert curve order, so neighbors are near each other in
+    the file. .geojson is minified GeoJSON, .fgb FlatGeobuf with its spatial index.
+    Prints the size against the file it replaces.
+    """
+    gdf = gdf.reset_index() if any(name is not None for name in gdf.index.names) else gdf.reset_index(drop=True)
+    gdf = gdf.to_crs('EPSG:4326') if gdf.crs is not None else gdf.set_crs('EPSG:4326')
+    gdf = gdf.iloc[np.argsort(gdf.hilbert_distance(), kind='stable')].reset_index(drop=True)
+    stem = os.path.splitext(path)[0]
+    replaced = [p for p in (f'{stem}.geojson', f'{stem}.fgb') if os.path.exists(p)]
+    previous = sum(os.path.getsize(p) for p in replaced) or None
+    for p in replaced:
+        os.remove(p)
+
+    if path.endswith('.fgb'):
+        gdf = gdf.set_geometry(shapely.set_precision(gdf.geometry.values, 10 ** -precision))
+        # written through Arrow in batches, the index is FlatGeobuf's packed Hilbert R-tree
+        gdf.to_file(path, driver='FlatGeobuf', engine='pyogrio', use_arrow=True, SPATIAL_INDEX='YES')
+    else:
+        write_compact_geojson(gdf, path, precision)
+
+    size = os.path.getsize(path)
+    change = f", was {previous} ({(size - previous) / previous:+.0%})" if previous else ''
+    print(f"{path}: {len(gdf)} features, {size} bytes{change}")
+    return size
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def kml_geometry(placemark):
+    for kind, build in [('Point', shapely.Point), ('LineString', shapely.LineString), ('Polygon', shapely.Polygon)]:
+        element = placemark.find(f'.//{KML_NS}{kind}')
+        if element is not None:
+            text = element.find(f'.//{KML_NS}coordinates').text.split()
+            coords = [tuple(float(v) for v in c.split(',')[:2]) for c in text]
+            return build(coords[0]) if kind == 'Point' else build(coords)
+    return None
+
+def read_kmz(path):
+    """Placemarks of a KMZ as a GeoDataFrame of id, name, description and icon, plus its bundled files."""
+    with zipfile.ZipFile(path) as kmz:
+        kml_name = next(name for name in kmz.namelist() if name.endswith('.kml'))
+        root = ET.fromstring(kmz.read(kml_name))
+        bundled = {name: hashlib.sha256(kmz.read(name)).hexdigest() for name in kmz.namelist() if name != kml_name}
+    # styles are numbered per write by simplekml, so features refer to their icon file instead
+    icons = {f"#{style.get('id')}": style.findtext(f'.//{KML_NS}href') for style in root.iter(f'{KML_NS}Style')}
+    rows = []
+    for placemark in root.iter(f'{KML_NS}Placemark'):
+        data = {d.get('name'): d.findtext(f'{KML_NS}value') for d in placemark.iter(f'{KML_NS}Data')}
+        rows.append({
+            'id': data.get('id'),
+            'name': placemark.findtext(f'{KML_NS}name'),
+            'description': placemark.findtext(f'{KML_NS}description'),
+            'icon': icons.get(placemark.findtext(f'{KML_NS}styleUrl')),
+            'geometry': kml_geometry(placemark),
+        })
+    gdf = gpd.GeoDataFrame(pd.DataFrame(rows, columns=['id', 'name', 'description', 'icon', 'geometry']),
+                           geometry='geometry', crs='EPSG:4326')
+    return gdf, bundled
+
+def read_layer(path):
+    """A layer's features as a GeoDataFrame, its id column (or None) and the icons bundled with it."""
+    if path.endswith('.kmz'):
+        gdf, bundled = read_kmz(path)
+        return gdf, 'id' if gdf['id'].notna().all() else None, bundled
+    gdf = gpd.read_file(path)
+    id_column = LAYER_IDS.get(os.path.splitext(os.path.basename(path))[0])
+    return gdf, id_column if id_column in gdf else None, {}
+
+def hash_strings(values):
+    return pd.util.hash_pandas_object(pd.Series(values, dtype=object), index=False).to_numpy()
+
+def feature_index(layer, gdf, id_column):
+    """layer, id, key and content hash of every feature, key being a hash of layer and id."""
+    properties = gdf.drop(columns=gdf.geometry.name).astype(str)
+    properties['geometry'] = gdf.geometry.to_wkb(hex=True).astype(str)
+    content = pd.util.hash_pandas_object(properties, index=False).to_numpy()
+    ids = gdf[id_column].astype(str) if id_column else pd.Series(content.astype(str))
+    # repeated ids (e.g. a place near two airports) are told apart by their order
+    ids = ids.reset_index(drop=True)
+    ids = ids + '#' + ids.groupby(ids).cumcount().astype(str)
+    return pd.DataFrame({'layer': layer, 'id': ids.to_numpy(dtype=object), 'key': hash_strings(layer + '/' + ids),
+                         'hash': content, 'row': np.arange(len(gdf))})
+
+def pack_index(pack_dir):
+    """
+    Feature index of every layer in a pack with its icons as layer ICONS, per-layer manifest
+    entries, the layers' features and the KMZ each icon is bundled in.
+    """
+    layers_dir = os.path.join(pack_dir, 'layers')
+    frames, layers, features, icons, icon_sources = [], {}, {}, {}, {}
+    for layer in sorted(os.listdir(layers_dir)):
+        if not layer.endswith(LAYER_EXTENSIONS):
+            continue
+        path = os.path.join(layers_dir, layer)
+        gdf, id_column, bundled = read_layer(path)
+        frames.append(feature_index(layer, gdf, id_column))
+        layers[layer] = {'features': len(gdf), 'sha256': sha256(path)}
+        features[layer] = gdf
+        icons.update(bundled)
+        icon_sources.update({name: path for name in bundled})
+    names = pd.Series(sorted(icons), dtype=object)
+    frames.append(pd.DataFrame({'layer': ICONS, 'id': names, 'key': hash_strings(ICONS + '/' + names),
+                                'hash': hash_strings([icons[name] for name in names]), 'row': np.arange(len(names))}))
+    index = pd.concat(frames, ignore_index=True).sort_values('key', kind='stable', ignore_index=True)
+    return index, layers, features, icon_sources
+
+def diff(previous, current):
+    """
+    Rows of current that were added or changed and rows of previous that were removed,
+    as one frame with a change column. Both indexes must be sorted by key.
+    """
+    previous_keys = previous['key'].to_numpy()
+    current_keys = current['key'].to_numpy()
+    # a sorted join on the key hashes, then one comparison of the content hashes
+    if len(previous_keys):
+        position = np.minimum(np.searchsorted(previous_keys, current_keys), len(previous_keys) - 1)
+        found = previous_keys[position] == current_keys
+        changed = found & (previous['hash'].to_numpy()[position] != current['hash'].to_numpy())
+    else:
+        position = np.zeros(len(current_keys), dtype=np.int64)
+        found = changed = np.zeros(len(current_keys), dtype=bool)
+    kept = np.zeros(len(previous_keys), dtype=bool)
+    kept[position[found]] = True
+    return pd.concat([
+        current[~found].assign(change='added'),
+        current[changed].assign(change='changed'),
+        previous[~kept].assign(change='removed'),
+    ], ignore_index=True)
+
+def write_delta(path, manifest, previous_manifest, changes, features, icon_sources):
+    """A zip of the features and icons that changed since previous_manifest, and what was removed."""
+    summary = {'name': manifest['name'], 'from': previous_manifest['version'], 'version': manifest['version'],
+               'layers': {}, 'icons': {}}
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as delta:
+        for layer, group in changes.groupby('layer', sort=True):
+            ids = {change: sorted(rows['id'].str.rsplit('#', n=1).str[0]) for change, rows in group.groupby('change')}
+            if layer == ICONS:
+                summary['icons'] = ids
+                for name in group.loc[group['change'] != 'removed', 'id'].str.rsplit('#', n=1).str[0]:
+                    with zipfile.ZipFile(icon_sources[name]) as kmz:
+                        delta.writestr(f'{ICONS}/{name}', kmz.read(name))
+                continue
+            summary['layers'][layer] = ids
+            upserts = group[group['change'] != 'removed']
+            if len(upserts):
+                changed = features[layer].iloc[upserts['row'].to_numpy()].assign(_change=upserts['change'].to_numpy())
+                delta.writestr(f'layers/{os.path.splitext(layer)[0]}.geojson', changed.to_json(drop_id=True))
+        delta.writestr('delta.json', json.dumps(summary, indent=2))
+    return summary
+
+def build(pack_dir=os.path.join(CONTENT_PACK_DIR, PACK_NAME), version=None):
+    """
+    Zip the pack and a delta against the last published pack into BUILD_DIR,
+    adding per-layer feature counts and checksums to the manifest.
+    """
+    manifest_path = os.path.join(pack_dir, 'manifest.json')
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    index, layers, features, icon_sources = pack_index(pack_dir)
+
+    previous_manifest, previous = None, None
+    if os.path.exists(os.path.join(PUBLISHED_DIR, 'index.parquet')):
+        previous = pd.read_parquet(os.path.join(PUBLISHED_DIR, 'index.parquet'))
+        with open(os.path.join(PUBLISHED_DIR, 'manifest.json')) as file:
+            previous_manifest = json.load(file)
+        # versions are integers, packs published before that may still say 1.0
+        previous_manifest['version'] = int(previous_manifest['version'])
+    changes = diff(previous, index) if previous is not None else None
+    if changes is not None and len(changes) == 0 and version is None:
+        print(f"No changes since published version {previous_manifest['version']}")
+        return None
+
+    if version is not None:
+        manifest['version'] = int(version)
+    elif previous_manifest is not None:
+        manifest['version'] = previous_manifest['version'] + 1
+    else:
+        manifest['version'] = int(manifest['version'])
+    manifest['layers'] = layers
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file, indent=4)
+
+    shutil.rmtree(BUILD_DIR, ignore_errors=True)
+    os.makedirs(BUILD_DIR)
+    full = shutil.make_archive(os.path.join(BUILD_DIR, PACK_NAME), 'zip', root_dir=os.path.dirname(pack_dir),
+                               base_dir=os.path.basename(pack_dir))
+    print(f"{full}: version {manifest['version']}, {os.path.getsize(full)} bytes")
+    if changes is not None:
+        delta = os.path.join(BUILD_DIR, f"{PACK_NAME}-delta-{previous_manifest['version']}-{manifest['version']}.zip")
+        write_delta(delta, manifest, previous_manifest, changes, features, icon_sources)
+        counts = changes.groupby(['layer', 'change']).size()
+        print(f"{delta}: {os.path.getsize(delta)} bytes, {counts.to_dict()}")
+    index.drop(columns='row').to_parquet(os.path.join(BUILD_DIR, 'index.parquet'), index=False)
+    shutil.copy(manifest_path, os.path.join(BUILD_DIR, 'manifest.json'))
+    return manifest
+
+def mark_published():
+    """Make the last build the pack the next delta is made against."""
+    os.makedirs(PUBLISHED_DIR, exist_ok=True)
+    for name in ['index.parquet', 'manifest.json']:
+        shutil.copy(os.path.join(BUILD_DIR, name), os.path.join(PUBLISHED_DIR, name))
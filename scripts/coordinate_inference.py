@@ -0,0 +1,196 @@
+"""
+Find the coordinate columns of a new source CSV without a network round trip.
+
+Headers are matched against English and Spanish names for latitude, longitude
+and their degree/minute/second parts, and candidate columns are checked with
+statistics over a sample of values: how many parse as numbers, whether they are
+whole, their range, and whether they look like packed DMS or WKT points. The
+result is a spec that coordinates.parse_spec reads and
+lon_lat_lookup_gen.spec_parser turns into a lon_lat_lookup parser:
+
+    {'format': 'decimal', 'lon': 'LONG_DECIMAL', 'lat': 'LAT_DECIMAL'}
+    {'format': 'split_dms', 'lon': [deg, min, sec], 'lat': [deg, min, sec], 'lon_sign': -1}
+    {'format': 'packed_dms', 'lon': 'LON', 'lat': 'LAT'}
+    {'format': 'wkt_point', 'column': 'geometry'}
+
+Specs are cached by a hash of the header, so a file seen before is instant.
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+import coordinates
+
+CACHE_PATH = 'data/coordinate-specs.json'
+SAMPLE_ROWS = 1000
+
+LAT_WORDS = {'lat', 'latitude', 'latitud', 'y'}
+LON_WORDS = {'lon', 'lng', 'long', 'longitude', 'longitud', 'x'}
+DEGREE_WORDS = {'deg', 'degree', 'degrees', 'grado', 'grados', 'gra'}
+MINUTE_WORDS = {'min', 'mins', 'minute', 'minutes', 'minuto', 'minutos'}
+SECOND_WORDS = {'sec', 'secs', 'second', 'seconds', 'seg', 'segundo', 'segundos'}
+DECIMAL_WORDS = {'decimal', 'dec', 'dd'}
+WEST_WORDS = {'w', 'west', 'oeste', 'o'}
+
+# share of non-blank sample values that must fit a format
+MATCH_RATE = .9
+
+def words(header):
+    """Lowercase, accent-free words of a header, camelCase and snake_case split."""
+    header = re.sub(r'([a-z])([A-Z])', r'\1 \2', str(header))
+    header = unicodedata.normalize('NFKD', header).encode('ascii', 'ignore').decode().lower()
+    return set(re.findall(r'[a-z]+', header))
+
+def header_roles(header):
+    """(axis, part, decimal) of a header, e.g. ('lat', 'min', False) for "LATITUD '"."""
+    found = words(header)
+    axis = 'lat' if found & LAT_WORDS else 'lon' if found & LON_WORDS else None
+    text = str(header)
+    if "''" in text or '"' in text or '″' in text or found & SECOND_WORDS:
+        part = 'sec'
+    elif "'" in text or '′' in text or found & MINUTE_WORDS:
+        part = 'min'
+    elif '°' in text or 'º' in text or found & DEGREE_WORDS:
+        part = 'deg'
+    else:
+        part = None
+    return axis, part, bool(found & DECIMAL_WORDS)
+
+def column_stats(sample):
+    """Per column statistics of a sample read as text, one vectorized pass per column."""
+    rows = []
+    for column in sample.columns:
+        text = sample[column].dropna().astype(str).str.strip()
+        text = text[text != '']
+        values = coordinates.to_float(text)
+        finite = values[np.isfinite(values)]
+        packed = text.str.extract(coordinates.PACKED_DMS)
+        hemispheres = packed[1].dropna().str.upper()
+        count = max(len(text), 1)
+        rows.append({
+            'column': column,
+            'count': len(text),
+            'numeric': len(finite) / count,
+            'whole': float(np.mean(finite == np.round(finite))) if len(finite) else 0.,
+            # a percentile, so a few mistyped values don't rule a column out
+            'p99_abs': float(np.quantile(np.abs(finite), .99)) if len(finite) else np.nan,
+            'negative': float(np.mean(finite < 0)) if len(finite) else 0.,
+            'packed_dms': len(hemispheres) / count,
+            'hemisphere': hemispheres.mode().iloc[0] if len(hemispheres) else None,
+            'wkt_point': text.str.match(coordinates.WKT_POINT, flags=re.IGNORECASE).sum() / count,
+        })
+    stats = pd.DataFrame(rows).set_index('column')
+    roles = pd.DataFrame([header_roles(column) for column in stats.index], index=stats.index,
+                         columns=['axis', 'part', 'decimal'])
+    return stats.join(roles)
+
+def decimal_columns(stats, named=True):
+    """Best decimal degree column per axis: numeric, mostly fractional and in range."""
+    limits = {'lat': 90, 'lon': 180}
+    usable = stats[(stats['count'] > 0) & (stats['numeric'] >= MATCH_RATE) & (stats['whole'] < .5)
+                   & (stats['part'] != 'min') & (stats['part'] != 'sec')]
+    found = {}
+    if named:
+        for axis, limit in limits.items():
+            candidates = usable[(usable['axis'] == axis) & (usable['p99_abs'] <= limit)]
+            if len(candidates):
+                # decimal named columns first, e.g. LAT_DECIMAL over LAT_DEG
+                found[axis] = candidates.sort_values('decimal', ascending=False, kind='stable').index[0]
+        return found
+    # unnamed: only when exactly two columns qualify, the one beyond +-90 being the longitude
+    candidates = usable[usable['p99_abs'] <= 180]
+    if len(candidates) == 2 and (candidates['p99_abs'] > 90).sum() == 1:
+        found['lon'] = candidates['p99_abs'].idxmax()
+        found['lat'] = candidates['p99_abs'].idxmin()
+    return found
+
+def split_dms_columns(stats):
+    """[degrees, minutes, seconds] columns per axis, recognised by their headers and whole degree values."""
+    found = {}
+    for axis, limit in {'lat': 90, 'lon': 180}.items():
+        named = stats[(stats['axis'] == axis) & (stats['numeric'] >= MATCH_RATE)]
+        parts = {}
+        for part in ['deg', 'min', 'sec']:
+            columns = named.index[named['part'] == part]
+            if len(columns):
+                parts[part] = columns[0]
+        if 'deg' not in parts:
+            # the unmarked column next to marked minutes and seconds, e.g. LAT / LAT MIN / LAT SEC
+            unmarked = named.index[named['part'].isna() & (named['whole'] >= MATCH_RATE)]
+            if len(unmarked):
+                parts['deg'] = unmarked[0]
+        if len(parts) == 3 and named.loc[parts['deg'], 'p99_abs'] <= limit \
+                and named.loc[parts['min'], 'p99_abs'] <= 60 and named.loc[parts['sec'], 'p99_abs'] <= 60:
+            found[axis] = [parts['deg'], parts['min'], parts['sec']]
+    return found
+
+def infer(sample, west=False):
+    """A coordinate spec for a sample DataFrame read as text, or None when no coordinates are found."""
+    stats = column_stats(sample)
+
+    decimal = decimal_columns(stats)
+    if len(decimal) == 2:
+        return {'format': 'decimal', 'lon': decimal['lon'], 'lat': decimal['lat']}
+
+    dms = split_dms_columns(stats)
+    if len(dms) == 2:
+        spec = {'format': 'split_dms', 'lon': dms['lon'], 'lat': dms['lat']}
+        # unsigned degrees with a west marker in the header, or the caller knowing the source is west of Greenwich
+        unsigned = stats.loc[dms['lon'][0], 'negative'] == 0
+        if unsigned and (west or words(dms['lon'][0]) & WEST_WORDS):
+            spec['lon_sign'] = -1
+        return spec
+
+    packed = stats[stats['packed_dms'] >= MATCH_RATE]
+    lat = packed.index[packed['hemisphere'].isin(['N', 'S'])]
+    lon = packed.index[packed['hemisphere'].isin(['E', 'W'])]
+    if len(lat) and len(lon):
+        return {'format': 'packed_dms', 'lon': lon[0], 'lat': lat[0]}
+
+    wkt = stats.index[stats['wkt_point'] >= MATCH_RATE]
+    if len(wkt):
+        return {'format': 'wkt_point', 'column': wkt[0]}
+
+    decimal = decimal_columns(stats, named=False)
+    if len(decimal) == 2:
+        return {'format': 'decimal', 'lon': decimal['lon'], 'lat': decimal['lat']}
+    return None
+
+def read_sample(path, rows=SAMPLE_ROWS):
+    return pd.read_csv(path, nrows=rows, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+
+def header_hash(headers):
+    return hashlib.sha256('\x1f'.join(map(str, headers)).encode()).hexdigest()
+
+def load_cache(path=CACHE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+def save_cache(cache, path=CACHE_PATH):
+    with open(path, 'w') as file:
+        json.dump(cache, file, indent=2, ensure_ascii=False, sort_keys=True)
+
+def infer_file(path, west=False, refresh=False, cache_path=CACHE_PATH):
+    """
+    The coordinate spec of a CSV, from the cache when a file with the same header
+    was seen before. Returns (spec, share of sample rows it parses, whether it was cached).
+    """
+    headers = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns.tolist()
+    key = header_hash(headers)
+    cache = load_cache(cache_path)
+    cached = key in cache and not refresh
+    sample = read_sample(path)
+    spec = cache[key] if cached else infer(sample, west=west)
+    if not cached:
+        cache[key] = spec
+        save_cache(cache, cache_path)
+    valid = 0.
+    if spec is not None and len(sample):
+        valid = float(coordinates.valid_lon_lat(*coordinates.parse_spec(sample, spec)).mean())
+    return spec, valid, cached
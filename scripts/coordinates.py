@@ -0,0 +1,96 @@
+import re
+import numpy as np
+import pandas as pd
+import shapely
+
+# 094135 N / 0850532 W / 085727.4 N: degrees, minutes and seconds packed together with a hemisphere
+PACKED_DMS = r'^\s*(\d+(?:[.,]\d+)?)\s*([NSEWnsew])\s*$'
+# POINT (-121.763427 39.427188) or Point(114.73 26.85), as written by geopandas and wikidata
+WKT_POINT = r'^\s*POINT\s*\(\s*([-+]?[\d.eE+-]+)\s+([-+]?[\d.eE+-]+)\s*\)\s*$'
+
+def to_float(values):
+    """Coerce a column to a float array, with NaN where a value cannot be parsed."""
+    values = pd.Series(values)
+    if values.dtype == object or pd.api.types.is_string_dtype(values):
+        values = values.astype(str).str.strip().str.replace(',', '.', regex=False)
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+
+def parse_decimal(lon, lat):
+    """Signed decimal degree columns to (lon, lat) float arrays."""
+    return to_float(lon), to_float(lat)
+
+def parse_split_dms(deg, minutes, seconds, sign=1):
+    """Separate degree, minute and second columns to signed decimal degrees."""
+    return sign * (to_float(deg) + to_float(minutes) / 60 + to_float(seconds) / 3600)
+
+def parse_packed_dms(values):
+    """
+    Packed DDMMSS[.s] H / DDDMMSS[.s] H strings to signed decimal degrees.
+
+    Latitudes (N/S) carry two degree digits and longitudes (E/W) three, so a
+    value with a dropped seconds digit like 10404.21 N still reads as 10°40'4.21".
+    """
+    parts = pd.Series(values, dtype=object).astype(str).str.extract(PACKED_DMS)
+    digits = parts[0].str.replace(',', '.', regex=False)
+    hemisphere = parts[1].str.upper()
+    is_lat = hemisphere.isin(['N', 'S']).to_numpy()
+
+    result = np.full(len(parts), np.nan)
+    for mask, width in ((is_lat, 2), (~is_lat, 3)):
+        d = digits[mask]
+        result[mask] = parse_split_dms(d.str[:width], d.str[width:width + 2], d.str[width + 2:])
+
+    result[hemisphere.isin(['S', 'W']).to_numpy()] *= -1
+    return result
+
+def parse_wkt_point(values):
+    """POINT(x y) WKT strings to (lon, lat) float arrays."""
+    parts = pd.Series(values, dtype=object).astype(str).str.extract(WKT_POINT, flags=re.IGNORECASE)
+    return to_float(parts[0]), to_float(parts[1])
+
+def parse_spec(df, spec):
+    """(lon, lat) float arrays of a frame by a coordinate_inference spec."""
+    kind = spec['format']
+    if kind == 'decimal':
+        return parse_decimal(df[spec['lon']], df[spec['lat']])
+    if kind == 'split_dms':
+        return (parse_split_dms(*(df[column] for column in spec['lon']), sign=spec.get('lon_sign', 1)),
+                parse_split_dms(*(df[column] for column in spec['lat']), sign=spec.get('lat_sign', 1)))
+    if kind == 'packed_dms':
+        return parse_packed_dms(df[spec['lon']]), parse_packed_dms(df[spec['lat']])
+    if kind == 'wkt_point':
+        return parse_wkt_point(df[spec['column']])
+    raise ValueError(f"unknown coordinate format {kind!r}")
+
+def spec_columns(spec):
+    """Columns a coordinate_inference spec reads."""
+    if spec['format'] == 'wkt_point':
+        return [spec['column']]
+    lon, lat = spec['lon'], spec['lat']
+    return (list(lon) if isinstance(lon, (list, tuple)) else [lon]) + (list(lat) if isinstance(lat, (list, tuple)) else [lat])
+
+def valid_lon_lat(lon, lat):
+    """Mask of finite coordinates inside the WGS84 range."""
+    with np.errstate(invalid='ignore'):
+        return np.isfinite(lon) & np.isfinite(lat) & (np.abs(lon) <= 180) & (np.abs(lat) <= 90)
+
+def points(lon, lat):
+    """Object array of shapely Points, None where the coordinate is invalid."""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    valid = valid_lon_lat(lon, lat)
+    geoms = np.full(len(lon), None, dtype=object)
+    geoms[valid] = shapely.points(lon[valid], lat[valid])
+    return geoms
+
+def report_unparsed(name, geoms, df=None, columns=None):
+    """Print how many rows had no usable coordinate, with a few examples."""
+    missing = pd.isna(pd.Series(geoms, dtype=object)).to_numpy()
+    count = int(missing.sum())
+    if count:
+        print(f"{name}: {count} of {len(missing)} rows have unparseable coordinates")
+        if df is not None and columns:
+            examples = df.loc[missing, columns].dropna(how='all').head(5)
+            if not examples.empty:
+                print(examples.to_string())
+    return count
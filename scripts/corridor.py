@@ -0,0 +1,96 @@
+"""
+Aerodromes along a route: everything within a cross-track distance of a multi-leg great-circle route.
+
+Candidates come from the k-d tree of a query_service.Index, with one ball query
+per point sampled along each leg. The exact cross-track and along-track distances
+are then computed for all candidates and legs at once with unit vector algebra:
+for a leg from A to B with pole n = A x B / |A x B|, a point p is asin(p . n)
+off the great circle and atan2(p . (n x A), p . A) along it from A. Points
+beyond either end of a leg are measured to that end instead.
+"""
+
+import numpy as np
+from runway_geodesy import EARTH_RADIUS_M, M_PER_NM, unit_vectors, m_to_chord
+
+# most ball queries per route, the sample spacing grows for long routes with narrow corridors
+MAX_SAMPLES = 2000
+MAX_WAYPOINTS = 100
+
+def legs(lat, lon):
+    """Start and end unit vectors, length (radians) and route distance at the start (radians) of each leg."""
+    points = unit_vectors(lat, lon)
+    starts, ends = points[:-1], points[1:]
+    lengths = angle_between(starts, ends)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return starts, ends, lengths, offsets
+
+def angle_between(a, b):
+    """Angle in radians between rows of unit vectors, accurate for small angles unlike arccos."""
+    return np.arctan2(np.linalg.norm(np.cross(a, b), axis=-1), np.einsum('...i,...i', a, b))
+
+def samples(starts, ends, lengths, spacing):
+    """Points every spacing radians along each leg, both ends included."""
+    points = []
+    for start, end, length in zip(starts, ends, lengths):
+        count = int(np.ceil(length / spacing)) + 1
+        t = np.linspace(0, 1, count)[:, None]
+        if length == 0:
+            points.append(start[None, :])
+            continue
+        # slerp from start to end
+        points.append((np.sin((1 - t) * length) * start + np.sin(t * length) * end) / np.sin(length))
+    return np.concatenate(points)
+
+def candidates(tree, starts, ends, lengths, radius):
+    """Rows of the tree within radius (radians) of the route, possibly a few more."""
+    spacing = max(radius, lengths.sum() / MAX_SAMPLES, 1e-9)
+    points = samples(starts, ends, lengths, spacing)
+    # anything within radius of the route is within radius + spacing / 2 of a sample
+    found = tree.query_ball_point(points, m_to_chord((radius + spacing / 2) * EARTH_RADIUS_M))
+    if not len(found):
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate([np.asarray(rows, dtype=np.int64) for rows in found]))
+
+def track_distances(points, starts, ends, lengths, offsets):
+    """
+    Distance to the route, distance along it to the closest position and the leg of that
+    position, all in radians, for (n, 3) unit vectors against every leg at once.
+    """
+    poles = np.cross(starts, ends)
+    norms = np.linalg.norm(poles, axis=1, keepdims=True)
+    # zero length legs have no great circle, their points are measured to the waypoint
+    poles = np.divide(poles, norms, out=np.zeros_like(poles), where=norms > 0)
+    cross = np.arcsin(np.clip(points @ poles.T, -1, 1))
+    along = np.arctan2(points @ np.cross(poles, starts).T, points @ starts.T)
+    within = (along >= 0) & (along <= lengths) & (lengths > 0)
+    to_ends = np.minimum(angle_between(points[:, None, :], starts[None, :, :]),
+                         angle_between(points[:, None, :], ends[None, :, :]))
+    distance = np.where(within, np.abs(cross), to_ends)
+    leg = np.argmin(distance, axis=1)
+    rows = np.arange(len(points))
+    position = np.clip(along[rows, leg], 0, lengths[leg])
+    return distance[rows, leg], offsets[leg] + position, leg
+
+def along_route(index, lat, lon, nm, filters, limit=None):
+    """
+    Rows of a query_service.Index within nm nautical miles of the route through the
+    waypoints lat, lon that pass filters, ordered along the route, with their
+    cross-track and along-track distances in nautical miles and leg number.
+    """
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    if len(lat) < 2 or len(lat) != len(lon):
+        raise ValueError("a route needs at least two waypoints")
+    if len(lat) > MAX_WAYPOINTS:
+        raise ValueError(f"at most {MAX_WAYPOINTS} waypoints per route")
+    if nm < 0:
+        raise ValueError("nm must not be negative")
+    starts, ends, lengths, offsets = legs(lat, lon)
+    radius = nm * M_PER_NM / EARTH_RADIUS_M
+    rows = candidates(index.tree, starts, ends, lengths, radius)
+    rows = rows[index.matches(rows, filters)]
+    cross, along, leg = track_distances(index.vectors[rows], starts, ends, lengths, offsets)
+    inside = cross <= radius
+    rows, cross, along, leg = rows[inside], cross[inside], along[inside], leg[inside]
+    order = np.lexsort((cross, along))[:limit]
+    to_nm = EARTH_RADIUS_M / M_PER_NM
+    return rows[order], cross[order] * to_nm, along[order] * to_nm, leg[order]
@@ -0,0 +1,81 @@
+"""
+Lazily loaded inputs shared by every stage run in one process.
+
+Each source is parsed the first time a stage asks for it and handed to later
+stages from memory. Stages must treat what they get as read only: filter or
+copy before adding columns, never modify in place.
+"""
+
+import pandas as pd
+import geopandas as gpd
+import instrument
+import schemas
+from lon_lat_lookup_gen import lon_lat_lookup, get_gdf, get_all_gdfs
+
+FAA_AIRPORTS_CSV = 'data/us/faa/nasr/APT_BASE.csv'
+FAA_RUNWAYS_CSV = 'data/us/faa/nasr/APT_RWY.csv'
+OURAIRPORTS_CSV = 'data/world/ourairports/airports.csv'
+OVERPASS_AERODROMES_CSV = 'data/world/osm/overpass/aerodrome.csv'
+OVERPASS_RUNWAYS_CSV = 'data/world/osm/overpass/runway.csv'
+RAF_AIRFIELDS_CSV = 'data/us/raf/airfields.csv'
+MISSING_CSV = 'data/world/osm/overpass/missing_from_ourairports.csv'
+
+def points_gdf(df, lon_column, lat_column):
+    """GeoDataFrame of points in EPSG:4326 from lon/lat columns, replacing any existing geometry column."""
+    geometry = gpd.points_from_xy(df[lon_column], df[lat_column])
+    return gpd.GeoDataFrame(df.drop(columns=['geometry'], errors='ignore'), geometry=geometry, crs='EPSG:4326')
+
+class Datasets:
+    def __init__(self):
+        self.cache = {}
+
+    def load(self, key, loader):
+        if key not in self.cache:
+            with instrument.stage('load', dataset=key) as s:
+                self.cache[key] = loader()
+                s.rows_out = len(self.cache[key])
+        return self.cache[key]
+
+    def put(self, key, value):
+        """Publish a stage's output so later stages in the same run skip re-reading it."""
+        self.cache[key] = value
+
+    def csv(self, path) -> pd.DataFrame:
+        """A source CSV, through its declared schema in schemas.py when it has one."""
+        return self.load(f'csv:{path}', lambda: schemas.read_csv(path))
+
+    def aerodromes(self, path) -> gpd.GeoDataFrame:
+        """get_gdf for one lon_lat_lookup source, sharing the raw CSV with any stage that reads it directly."""
+        return self.load(f'aerodromes:{path}', lambda: get_gdf(path, self.csv(path).copy()))
+
+    def all_aerodromes(self) -> dict:
+        """Every lon_lat_lookup source, in lookup order, as a new dict the caller may reassign entries of."""
+        # sources no stage has read yet are parsed in parallel, the rest reuse the CSV already in memory
+        unread = [path for path in lon_lat_lookup
+                  if f'aerodromes:{path}' not in self.cache and f'csv:{path}' not in self.cache]
+        if len(unread) > 1:
+            for path, gdf in get_all_gdfs(unread).items():
+                self.put(f'aerodromes:{path}', gdf)
+        return {path: self.aerodromes(path) for path in lon_lat_lookup}
+
+    def faa_airports(self) -> pd.DataFrame:
+        return self.csv(FAA_AIRPORTS_CSV)
+
+    def faa_runways(self) -> pd.DataFrame:
+        return self.csv(FAA_RUNWAYS_CSV)
+
+    def ourairports(self) -> pd.DataFrame:
+        return self.csv(OURAIRPORTS_CSV)
+
+    def overpass_aerodromes(self) -> pd.DataFrame:
+        return self.csv(OVERPASS_AERODROMES_CSV)
+
+    def overpass_runways(self) -> pd.DataFrame:
+        return self.csv(OVERPASS_RUNWAYS_CSV)
+
+    def raf_airfields(self) -> pd.DataFrame:
+        return self.csv(RAF_AIRFIELDS_CSV)
+
+    def missing_airports(self) -> gpd.GeoDataFrame:
+        """Airports missing from OSM, from this run's missing-from-ourairports stage or else its last CSV."""
+        return self.load('missing_airports', lambda: points_gdf(self.csv(MISSING_CSV), 'longitude_deg', 'latitude_deg'))
@@ -1,14 +1,30 @@
+import argparse
 import boto3
-import csv
+import json
 import os
 import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import shapely
+import fuels
+import osm_tags
 
 class AthenaQueryRunner:
-    def __init__(self, database, s3_output):
+    # polling starts fast for short DDL queries and backs off for long scans
+    POLL_INITIAL_SECONDS = 0.5
+    POLL_MAX_SECONDS = 30
+    POLL_FACTOR = 2
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, database, s3_output, athena=None, glue=None, s3=None):
         self.database = database
         self.s3_output = s3_output
-        self.athena = boto3.client('athena')
-        self.glue = boto3.client('glue')
+        self.athena = athena or boto3.client('athena')
+        self.glue = glue or boto3.client('glue')
+        self.s3 = s3 or boto3.client('s3')
+        self.stats = {}
 
     def ensure_database_exists(self):
         """Ensure the Athena database exists, create if it does not."""
@@ -34,35 +50,65 @@ class AthenaQueryRunner:
         )
         return response['QueryExecutionId']
 
-    def wait_for_query_to_complete(self, query_execution_id, wait_time=5):
-        """Wait for the query to complete and handle any failures or cancellations with more details."""
+    def run_queries(self, queries):
+        """Submit independent queries together and wait for all of them. Returns name -> QueryExecution."""
+        query_execution_ids = {name: self.run_query(query) for name, query in queries.items()}
+        executions = self.wait_for_queries(query_execution_ids.values())
+        return {name: executions[query_execution_id] for name, query_execution_id in query_execution_ids.items()}
+
+    def poll_delays(self):
+        delay = self.POLL_INITIAL_SECONDS
         while True:
-            response = self.athena.get_query_execution(QueryExecutionId=query_execution_id)
-            state = response['QueryExecution']['Status']['State']
+            yield delay
+            delay = min(delay * self.POLL_FACTOR, self.POLL_MAX_SECONDS)
+
+    def wait_for_query_to_complete(self, query_execution_id):
+        """Wait for the query to complete and handle any failures or cancellations with more details."""
+        return self.wait_for_queries([query_execution_id])[query_execution_id]
+
+    def wait_for_queries(self, query_execution_ids):
+        """Poll every pending query in one call per round, backing off exponentially between rounds."""
+        pending = set(query_execution_ids)
+        completed = {}
+        delays = self.poll_delays()
+        while pending:
+            response = self.athena.batch_get_query_execution(QueryExecutionIds=sorted(pending))
+            for execution in response['QueryExecutions']:
+                query_execution_id = execution['QueryExecutionId']
+                state = execution['Status']['State']
 
-            if state in ['FAILED', 'CANCELLED']:
-                reason = response['QueryExecution']['Status'].get('StateChangeReason', 'No specific reason provided.')
-                raise Exception(f"Query {state.lower()} due to: {reason}")
+                if state in ['FAILED', 'CANCELLED']:
+                    reason = execution['Status'].get('StateChangeReason', 'No specific reason provided.')
+                    raise Exception(f"Query {query_execution_id} {state.lower()} due to: {reason}")
 
-            if state == 'SUCCEEDED':
-                print("Query completed successfully")
-                break
+                if state == 'SUCCEEDED':
+                    print(f"Query {query_execution_id} completed successfully")
+                    self.record_stats(execution)
+                    completed[query_execution_id] = execution
+                    pending.discard(query_execution_id)
 
-            time.sleep(wait_time)
+            if pending:
+                time.sleep(next(delays))
+        return completed
 
-    def get_query_results(self, query_execution_id):
-        """Retrieve and return results from a completed Athena query."""
-        results = []
-        response = self.athena.get_query_results(QueryExecutionId=query_execution_id)
-        for row in response['ResultSet']['Rows']:
-            results.append([value.get('VarCharValue', '') for value in row['Data']])
-        return results
+    def record_stats(self, execution):
+        statistics = execution.get('Statistics', {})
+        stats = {
+            'bytes_scanned': statistics.get('DataScannedInBytes'),
+            'engine_execution_ms': statistics.get('EngineExecutionTimeInMillis'),
+            'total_execution_ms': statistics.get('TotalExecutionTimeInMillis'),
+        }
+        self.stats[execution['QueryExecutionId']] = stats
+        print(f"Query {execution['QueryExecutionId']}: {stats['bytes_scanned']} bytes scanned in {stats['engine_execution_ms']} ms")
 
-    def save_results_to_csv(self, results, filepath):
-        """Save query results to a CSV file."""
-        with open(filepath, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerows(results)
+    def download_results(self, execution, filepath):
+        """Stream the CSV Athena wrote to S3 for a completed query into filepath."""
+        location = execution['ResultConfiguration']['OutputLocation']
+        bucket, key = location[len('s3://'):].split('/', 1)
+        body = self.s3.get_object(Bucket=bucket, Key=key)['Body']
+        with open(filepath, 'wb') as file:
+            for chunk in body.iter_chunks(chunk_size=self.CHUNK_SIZE):
+                file.write(chunk)
 
     def create_external_table(self):
         """Create an external table for Daylight OSM features if it does not exist."""
@@ -110,6 +156,11 @@ class AthenaQueryRunner:
             tag_col = tag.replace(":", "_")
             columns.append(f"json_extract_scalar(CAST(tags AS JSON), '$.{tag}') AS {tag_col}")
 
+        if aeroway_type == 'aerodrome':
+            # the same fuels column as fuels.osm_fuels: names of the fuel:*=yes tags, ';'-joined
+            columns.append("array_join(transform(filter(map_keys(tags), k -> k LIKE 'fuel:%' AND lower(tags[k]) IN "
+                           "('yes', 'true', '1')), k -> substr(k, 6)), ';') AS fuels")
+
         all = ",".join(columns)
         query = f"""
                 SELECT
@@ -123,7 +174,8 @@ class AthenaQueryRunner:
                 """
         return query
 
-    def get_top_tags(self, aeroway_type):
+    @staticmethod
+    def get_top_tags(aeroway_type):
         with open(f"data/world/osm/top-{aeroway_type}.txt", "r") as file:
             return [line.strip() for line in file.readlines()]
 
@@ -137,25 +189,153 @@ class S3Fetcher:
         print(f"Latest release version fetched: {latest_release}")
         return latest_release.split('/')[1]
 
+class LocalDaylightReader:
+    """
+    Scan a local copy of the Daylight osm_features Parquet release instead of going through Athena.
+
+    The directory is laid out like s3://daylight-openstreetmap/parquet/osm_features/, with
+    release=.../type=... hive partitions. Partitions are pruned before any file is opened, the
+    aeroway filter and the top tag columns are evaluated straight on the tags map, and centroids
+    are taken from the bounding box columns or, with centroid='wkt', from the WKT in bulk.
+    """
+    TYPES = ["node", "way", "relation"]
+    BATCH_SIZE = 64 * 1024
+
+    def __init__(self, path, types=TYPES, centroid='bbox'):
+        self.dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        self.types = types
+        self.centroid = centroid
+
+    def latest_release(self):
+        """Highest release partition, read from the directory names rather than the data."""
+        releases = {ds.get_partition_keys(fragment.partition_expression).get('release')
+                    for fragment in self.dataset.get_fragments()}
+        return max(release for release in releases if release)
+
+    @staticmethod
+    def tag(key):
+        return pc.map_lookup(ds.field('tags'), key, 'first')
+
+    def build_top_projection(self, top_tags):
+        columns = {'id': ds.field('id')}
+        if self.centroid == 'wkt':
+            columns['wkt'] = ds.field('wkt')
+        else:
+            columns['latitude'] = pc.multiply(pc.add(ds.field('min_lat'), ds.field('max_lat')), 0.5)
+            columns['longitude'] = pc.multiply(pc.add(ds.field('min_lon'), ds.field('max_lon')), 0.5)
+        for tag in top_tags:
+            columns[tag.replace(":", "_")] = self.tag(tag)
+        return columns
+
+    def scan_top(self, top_tags, aeroway_type, release_version):
+        row_filter = ((ds.field('release') == release_version)
+                      & ds.field('type').isin(self.types)
+                      & (self.tag('aeroway') == aeroway_type))
+        columns = self.build_top_projection(top_tags)
+        if aeroway_type == 'aerodrome':
+            columns['tags'] = ds.field('tags')
+        scanner = self.dataset.scanner(columns=columns, filter=row_filter, batch_size=self.BATCH_SIZE)
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                if aeroway_type == 'aerodrome':
+                    batch = self.with_fuels(batch)
+                yield self.with_wkt_centroids(batch) if self.centroid == 'wkt' else batch
+
+    @staticmethod
+    def with_fuels(batch):
+        """Replace the tags column with the fuels column of the overpass CSV."""
+        names = [name for name in batch.schema.names if name != 'tags']
+        return pa.RecordBatch.from_arrays([batch.column(name) for name in names]
+                                          + [fuels.osm_fuels(batch.column('tags'))],
+                                          names=names + ['fuels'])
+
+    @staticmethod
+    def with_wkt_centroids(batch):
+        """Replace the wkt column with latitude and longitude of each geometry's centroid."""
+        centroids = shapely.centroid(shapely.from_wkt(batch.column('wkt').to_numpy(zero_copy_only=False)))
+        tags = [name for name in batch.schema.names if name not in ('id', 'wkt')]
+        return pa.RecordBatch.from_arrays(
+            [batch.column('id'), pa.array(shapely.get_y(centroids)), pa.array(shapely.get_x(centroids))]
+            + [batch.column(name) for name in tags],
+            names=['id', 'latitude', 'longitude'] + tags)
+
+    def save_tags_parquet(self, aeroway_type, release_version, filepath):
+        """Write every matching feature with typed core tags and the remaining tags as a sparse map."""
+        row_filter = ((ds.field('release') == release_version)
+                      & ds.field('type').isin(self.types)
+                      & (self.tag('aeroway') == aeroway_type))
+        columns = self.build_top_projection([])
+        columns['type'] = ds.field('type')
+        columns['tags'] = ds.field('tags')
+        scanner = self.dataset.scanner(columns=columns, filter=row_filter, batch_size=self.BATCH_SIZE)
+        tables = []
+        for batch in scanner.to_batches():
+            if not batch.num_rows:
+                continue
+            if self.centroid == 'wkt':
+                batch = self.with_wkt_centroids(batch)
+            tables.append(osm_tags.tags_table(batch.column('type'), batch.column('id'), batch.column('latitude'),
+                                              batch.column('longitude'), batch.column('tags'), aeroway_type))
+        if tables:
+            table = pa.concat_tables(tables, promote_options='permissive').sort_by(osm_tags.SORT_KEYS)
+            osm_tags.write_parquet(table, filepath)
+            return table.num_rows
+        return 0
+
+    def save_top_csv(self, top_tags, aeroway_type, release_version, filepath):
+        """Stream matching rows into filepath, returning the number of rows written."""
+        count = 0
+        writer = None
+        try:
+            for batch in self.scan_top(top_tags, aeroway_type, release_version):
+                if writer is None:
+                    writer = pacsv.CSVWriter(filepath, batch.schema)
+                writer.write_batch(batch)
+                count += batch.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract OSM aerodromes and runways from a Daylight release.")
+    parser.add_argument('--local', type=str, help="Local osm_features Parquet directory to scan instead of Athena")
+    parser.add_argument('--release', type=str, help="Daylight release, defaults to the latest one")
+    parser.add_argument('--centroid', choices=['bbox', 'wkt'], default='bbox', help="Centroid source for --local")
+    args = parser.parse_args()
+
     DATABASE = 'unidrome_daylight'
     S3_OUTPUT = 'unidrome-daylight-latest'
     BUCKET = 'daylight-map-distribution'
     KEY = 'release/latest.txt'
-    
-    runner = AthenaQueryRunner(DATABASE, f"s3://{S3_OUTPUT}/")
-    runner.ensure_database_exists()
-    runner.create_external_table()  # Ensure table exists
-
-    release_version = S3Fetcher.get_latest_release(BUCKET, KEY)
-    
-    for tag in ["runway", "aerodrome"]:
-        top_tags = runner.get_top_tags(tag)
-        query = runner.build_top_query(top_tags, tag, release_version)
-        print(query)
-        query_execution_id = runner.run_query(query)
-        runner.wait_for_query_to_complete(query_execution_id)
-        out = os.path.join('data', 'world', 'osm', 'daylight', f'{tag}.csv')
-        s3 = boto3.client('s3')
-        s3.download_file(S3_OUTPUT, f"{query_execution_id}.csv", out)
-        print("Results saved to", out)
+
+    if args.local:
+        reader = LocalDaylightReader(args.local, centroid=args.centroid)
+        release_version = args.release or reader.latest_release()
+        for tag in ["runway", "aerodrome"]:
+            top_tags = AthenaQueryRunner.get_top_tags(tag)
+            out = os.path.join('data', 'world', 'osm', 'daylight', f'{tag}.csv')
+            count = reader.save_top_csv(top_tags, tag, release_version, out)
+            print(f"{count} rows from release {release_version} saved to", out)
+            out = os.path.join('data', 'world', 'osm', 'daylight', f'{tag}.parquet')
+            reader.save_tags_parquet(tag, release_version, out)
+            print("Tags saved to", out)
+    else:
+        runner = AthenaQueryRunner(DATABASE, f"s3://{S3_OUTPUT}/")
+        runner.ensure_database_exists()
+        runner.create_external_table()  # Ensure table exists
+
+        release_version = args.release or S3Fetcher.get_latest_release(BUCKET, KEY)
+
+        queries = {}
+        for tag in ["runway", "aerodrome"]:
+            top_tags = runner.get_top_tags(tag)
+            queries[tag] = runner.build_top_query(top_tags, tag, release_version)
+            print(queries[tag])
+        executions = runner.run_queries(queries)
+        for tag, execution in executions.items():
+            out = os.path.join('data', 'world', 'osm', 'daylight', f'{tag}.csv')
+            runner.download_results(execution, out)
+            print("Results saved to", out)
+        with open(os.path.join('data', 'world', 'osm', 'daylight', 'athena-stats.json'), 'w') as file:
+            json.dump({tag: runner.stats[execution['QueryExecutionId']] for tag, execution in executions.items()}, file, indent=2)
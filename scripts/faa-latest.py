@@ -1,54 +1,141 @@
-from datetime import timedelta, date
+from datetime import timedelta, date, datetime
+import argparse
 import requests
 import os
+import csv
 import zipfile
 import shutil
 import tempfile
+import pandas as pd
 
 class FAA:
     DATA_PATH = os.path.join("data", "us/faa/nasr")
+    BASE_URL = "https://nfdc.faa.gov/webContent/28DaySub/extra"
     CYCLE_LENGTH = timedelta(days=28)
     START_CYCLE_DATE = date(2024, 1, 25)
+    FILES = ["APT_BASE.csv", "APT_RWY.csv"]
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, data_path=DATA_PATH, base_url=BASE_URL):
+        self.data_path = data_path
+        self.base_url = base_url
 
     def get_latest_path(self):
-        return os.path.join(self.DATA_PATH, "APT_BASE-latest.csv")
+        return os.path.join(self.data_path, "APT_BASE-latest.csv")
 
-    def current_data_cycle(self):
-        next_cycle = self.START_CYCLE_DATE
-        while date.today() >= next_cycle:
-            next_cycle += self.CYCLE_LENGTH
-        return next_cycle - self.CYCLE_LENGTH
+    def get_changes_path(self):
+        return os.path.join(self.data_path, "changes.csv")
 
-    def download_airport_data_archive(self, destination_directory):
+    def current_data_cycle(self, today=None):
+        today = today or date.today()
+        cycles = (today - self.START_CYCLE_DATE).days // self.CYCLE_LENGTH.days
+        return self.START_CYCLE_DATE + cycles * self.CYCLE_LENGTH
+
+    def local_data_cycle(self):
+        """EFF_DATE of the APT_RWY.csv on disk, or None if there is none."""
+        path = os.path.join(self.data_path, "APT_RWY.csv")
+        if not os.path.exists(path):
+            return None
+        with open(path, newline='') as file:
+            first = next(csv.DictReader(file), None)
+        if not first or not first.get("EFF_DATE"):
+            return None
+        return datetime.strptime(first["EFF_DATE"], "%Y/%m/%d").date()
+
+    def is_up_to_date(self):
+        return self.local_data_cycle() == self.current_data_cycle()
+
+    def get_archive_url(self):
         cycle_date = self.current_data_cycle().strftime('%d_%b_%Y')
-        url = f"https://nfdc.faa.gov/webContent/28DaySub/extra/{cycle_date}_CSV.zip"
+        return f"{self.base_url}/{cycle_date}_CSV.zip"
+
+    def download_airport_data_archive(self, destination_directory):
+        url = self.get_archive_url()
+        archive_path = os.path.join(destination_directory, 'archive.zip')
         try:
-            response = requests.get(url)
-            response.raise_for_status()  # Will raise an exception for 4XX/5XX errors
-            archive_path = os.path.join(destination_directory, 'archive.zip')
-            with open(archive_path, 'wb') as file:
-                file.write(response.content)
-            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(destination_directory)
-            print("Download and extraction successful.")
+            with requests.get(url, stream=True) as response:
+                response.raise_for_status()  # Will raise an exception for 4XX/5XX errors
+                with open(archive_path, 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                        file.write(chunk)
+            print("Download successful.")
+            return archive_path
         except requests.RequestException as e:
             print(f"Failed to download or handle the file: {e}")
+            return None
+
+    def extract_data_files(self, archive_path, destination_directory):
+        """Extract only FILES from the archive, wherever they sit inside it."""
+        extracted = {}
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            members = {os.path.basename(name): name for name in zip_ref.namelist()}
+            for filename in self.FILES:
+                if filename not in members:
+                    print(f"Warning: {filename} not found in {archive_path}")
+                    continue
+                dst = os.path.join(destination_directory, filename)
+                with zip_ref.open(members[filename]) as src, open(dst, 'wb') as out:
+                    shutil.copyfileobj(src, out, self.CHUNK_SIZE)
+                extracted[filename] = dst
+        return extracted
+
+    @staticmethod
+    def row_hashes(path):
+        """SITE_NO, ARPT_ID and a hash of every row, ignoring EFF_DATE."""
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        df = df.drop(columns=["EFF_DATE"], errors="ignore")
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        return df[["SITE_NO", "ARPT_ID"]].assign(hash=hashes)
+
+    def diff_cycle(self, extracted):
+        """SITE_NO keyed added/removed/changed sites between the data on disk and the new cycle."""
+        changes = []
+        for filename, new_path in extracted.items():
+            old_path = os.path.join(self.data_path, filename)
+            new = self.row_hashes(new_path)
+            old = self.row_hashes(old_path) if os.path.exists(old_path) else new.iloc[0:0]
+
+            # rows whose hash only exists on one side belong to a site that changed
+            rows = old.merge(new, on=["SITE_NO", "ARPT_ID", "hash"], how="outer", indicator=True)
+            differing = rows[rows["_merge"] != "both"]
+            sites = differing.drop_duplicates("SITE_NO")[["SITE_NO", "ARPT_ID"]]
+
+            old_sites = set(old["SITE_NO"])
+            new_sites = set(new["SITE_NO"])
+            sites["file"] = filename
+            sites["change"] = "changed"
+            sites.loc[~sites["SITE_NO"].isin(old_sites), "change"] = "added"
+            sites.loc[~sites["SITE_NO"].isin(new_sites), "change"] = "removed"
+            changes.append(sites)
+        if not changes:
+            return pd.DataFrame(columns=["SITE_NO", "ARPT_ID", "file", "change"])
+        return pd.concat(changes, ignore_index=True)
+
+    def manage_data_files(self, extracted):
+        # Move the extracted CSV files into the data directory
+        for filename, src in extracted.items():
+            dst = os.path.join(self.data_path, filename)
+            shutil.move(src, dst)
+            print(f"Copied {filename} to {self.data_path}")
 
-    def manage_data_files(self, temp_directory):
-        files = ["APT_BASE.csv", "APT_RWY.csv"]
-        # Copy required CSV files to the cycle directory
-        for filename in files:
-            src = os.path.join(temp_directory, filename)
-            dst = os.path.join(self.DATA_PATH, filename)
-            if os.path.exists(src):
-                shutil.copy(src, dst)
-                print(f"Copied {filename} to {self.DATA_PATH}")
-            else:
-                print(f"Warning: {filename} not found at {src}")
+    def update(self, force=False):
+        if not force and self.is_up_to_date():
+            print(f"Cycle {self.current_data_cycle()} already in {self.data_path}, skipping download.")
+            return None
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive_path = self.download_airport_data_archive(temp_dir)
+            if not archive_path:
+                return None
+            extracted = self.extract_data_files(archive_path, temp_dir)
+            changes = self.diff_cycle(extracted)
+            self.manage_data_files(extracted)
+        changes.to_csv(self.get_changes_path(), index=False)
+        print(f"{len(changes)} site changes saved to {self.get_changes_path()}")
+        return changes
 
 if __name__ == "__main__":
-    faa = FAA()
-    with tempfile.TemporaryDirectory() as temp_dir:
-        faa.download_airport_data_archive(temp_dir)
-        faa.manage_data_files(temp_dir)
+    parser = argparse.ArgumentParser(description="Fetch the current FAA NASR airport cycle.")
+    parser.add_argument('--force', action='store_true', help="Download even if the local EFF_DATE matches the current cycle")
+    args = parser.parse_args()
 
+    FAA().update(force=args.force)
@@ -0,0 +1,39 @@
+"""
+Filter missing airports by a bounding region and output to a GeoJSON file.
+
+Run with scripts/filter-missing-airports.py or as a unidrome stage.
+"""
+
+import geopandas as gpd
+
+def main(datasets, bounding_geojson_path, output_geojson_path):
+    # Step 1: Load the Missing Airports Data
+    # ---------------------------------------
+    # From this run's missing-from-ourairports stage, or else its CSV
+    missing_airports_gdf = datasets.missing_airports()
+
+    # Step 2: Load the Bounding Region GeoJSON
+    # ----------------------------------------
+    # Load the bounding region GeoJSON file
+    bounding_region_gdf = gpd.read_file(bounding_geojson_path)
+
+    # Ensure both GeoDataFrames are in the same CRS
+    if bounding_region_gdf.crs != missing_airports_gdf.crs:
+        bounding_region_gdf = bounding_region_gdf.to_crs(missing_airports_gdf.crs)
+
+    # Step 3: Filter Missing Airports by Bounding Region
+    # --------------------------------------------------
+    # Combine all geometries in bounding_region_gdf into a single geometry
+    bounding_union = bounding_region_gdf.unary_union
+
+    # Filter missing airports to those within the bounding region
+    missing_airports_in_region_gdf = missing_airports_gdf[
+        missing_airports_gdf.geometry.within(bounding_union)
+    ]
+
+    # Step 4: Output the Filtered Airports to a GeoJSON File
+    # ------------------------------------------------------
+    # Output the filtered GeoDataFrame to a GeoJSON file
+    missing_airports_in_region_gdf.to_file(output_geojson_path, driver='GeoJSON')
+
+    print(f"Filtered airports saved to {output_geojson_path}")
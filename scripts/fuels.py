@@ -0,0 +1,84 @@
+"""
+Fuel availability as a uint16 bitmask, one bit per fuel.
+
+FAA FUEL_TYPES ("100LL,A"), RAF fuels ("['100LL', 'JetA']") and OSM fuel:*=yes
+tags all spell fuels differently. Each distinct raw value is tokenized once,
+tokens map to bits through ALIASES, and schemas.read_frame adds the mask as
+FUEL_COLUMN for sources that declare a fuel column. Queries are then bitwise
+operations over the column:
+
+    df[has_any(df[FUEL_COLUMN], ['100LL', 'UL94'])]
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+FUELS = ('100LL', '100', '80', 'UL91', 'UL94', 'UL100', 'MOGAS', 'JET-A', 'JET-A1', 'JET-B', 'JP')
+BITS = {name: np.uint16(1 << i) for i, name in enumerate(FUELS)}
+FUEL_COLUMN = 'fuel_mask'
+
+# normalized tokens: upper case, no '-', '_' or spaces, additive suffixes after '+' dropped (A++, J8+10)
+ALIASES = {
+    '100LL': '100LL', 'AVGAS': '100LL', 'AVGAS100LL': '100LL',
+    '100': '100', 'AVGAS100': '100', '100130': '100',
+    '80': '80', 'AVGAS80': '80', '8087': '80',
+    'UL91': 'UL91', '91UL': 'UL91', 'AVGASUL91': 'UL91',
+    'UL94': 'UL94', '94UL': 'UL94', 'AVGASUL94': 'UL94',
+    'UL100': 'UL100', '100UL': 'UL100',
+    'MOGAS': 'MOGAS', 'AUTOGAS': 'MOGAS',
+    'A': 'JET-A', 'JETA': 'JET-A',
+    'A1': 'JET-A1', 'JETA1': 'JET-A1',
+    'B': 'JET-B', 'JETB': 'JET-B',
+    'J': 'JP', 'J5': 'JP', 'J8': 'JP', 'JP4': 'JP', 'JP5': 'JP', 'JP8': 'JP',
+}
+ALIAS_INDEX = pd.Index(list(ALIASES))
+ALIAS_BITS = np.array([BITS[name] for name in ALIASES.values()] + [0], dtype=np.uint16)
+
+# between tokens: list punctuation and quotes of stringified lists, and whitespace
+SEPARATORS = r"[\s,;/\[\]'\"]+"
+OSM_YES = ['yes', 'true', '1']
+
+def bits(names):
+    """The mask of fuel names, e.g. bits(['100LL', 'UL94'])."""
+    mask = np.uint16(0)
+    for name in names:
+        mask |= BITS[name]
+    return mask
+
+def masks(values):
+    """uint16 fuel masks of a column of raw fuel strings, tokenizing each distinct value once."""
+    categorical = pd.Categorical(values)
+    tokens = pd.Series(categorical.categories.astype(str)).str.upper().str.split(SEPARATORS, regex=True).explode()
+    tokens = tokens.str.replace(r'[-_ ]', '', regex=True).str.replace(r'\+.*', '', regex=True)
+    # unknown tokens (and blanks) get the 0 appended last
+    token_bits = ALIAS_BITS[ALIAS_INDEX.get_indexer(tokens.to_numpy(dtype=object))]
+    table = np.zeros(len(categorical.categories) + 1, dtype=np.uint16)
+    np.bitwise_or.at(table, tokens.index.to_numpy(), token_bits)
+    # missing values have category code -1, the 0 appended last
+    return table[categorical.codes]
+
+def osm_fuels(map_array):
+    """';'-joined fuel names of the fuel:*=yes tags of each feature in a tags MapArray, null where there are none."""
+    keys = map_array.keys.cast(pa.string())
+    offered = pc.and_(pc.starts_with(keys, 'fuel:'), pc.is_in(pc.utf8_lower(map_array.items), pa.array(OSM_YES)))
+    offered = offered.fill_null(False).to_numpy(zero_copy_only=False)
+    rows = np.repeat(np.arange(len(map_array)), np.diff(map_array.offsets.to_numpy()))
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(rows[offered], minlength=len(map_array)))])
+    names = pc.utf8_slice_codeunits(keys.filter(pa.array(offered)), len('fuel:'))
+    joined = pc.binary_join(pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), names), ';')
+    return pc.if_else(pc.equal(joined, ''), pa.scalar(None, pa.string()), joined)
+
+def has_any(mask, names):
+    """Rows offering at least one of the fuels."""
+    return (np.asarray(mask, dtype=np.uint16) & bits(names)) != 0
+
+def has_all(mask, names):
+    """Rows offering every one of the fuels."""
+    wanted = bits(names)
+    return (np.asarray(mask, dtype=np.uint16) & wanted) == wanted
+
+def names(mask):
+    """Comma separated fuel names of one mask, for display."""
+    return ','.join(name for name, bit in BITS.items() if mask & bit)
@@ -0,0 +1,70 @@
+import pandas as pd
+import overpy
+import geopandas as gpd
+from shapely.geometry import Point
+import os
+from content_pack import gdf_to_kmz_with_bundled_icons, write_layer
+import instrument
+from surfaces import SURFACE_COLUMN, is_unpaved
+from fuels import FUEL_COLUMN, has_any
+
+LAYER_PATH = 'data/content-pack/barbless-maps/layers/Gas and Grass'
+# compact: quantized minified GeoJSON, fgb: FlatGeobuf with a spatial index, geojson: the GDAL GeoJSON writer
+LAYER_FORMATS = ['compact', 'fgb', 'geojson']
+
+def main(datasets, layer_format='compact'):
+    osm_runways = datasets.overpass_runways()
+    # grass, gravel, dirt and sand, by the surface codes added on load
+    osm_runways = osm_runways[is_unpaved(osm_runways[SURFACE_COLUMN])]
+
+    # Read data
+    faa_airports = datasets.faa_airports()
+    faa_airports = faa_airports[faa_airports["SITE_TYPE_CODE"] == "A"]
+    faa_runways = datasets.faa_runways()
+
+    # Filter runways with grass surfaces
+    only_grass = faa_runways[is_unpaved(faa_runways[SURFACE_COLUMN])]
+
+    # Filter airports with 100LL fuel type
+    only_gas = faa_airports[has_any(faa_airports[FUEL_COLUMN], ['100LL'])]
+
+    with instrument.stage('build_geometry', rows_in=len(osm_runways) + len(only_gas)):
+        # Create a GeoDataFrame from the runways list
+        geometry = [Point(xy) for xy in zip(osm_runways['longitude'], osm_runways['latitude'])]
+        osm_only_grass_gfd = gpd.GeoDataFrame(osm_runways, geometry=geometry, crs='EPSG:4326')
+
+        geometry = [Point(xy) for xy in zip(only_gas['LONG_DECIMAL'], only_gas['LAT_DECIMAL'])]
+        only_gas_gdf = gpd.GeoDataFrame(only_gas, geometry=geometry, crs='EPSG:4326')
+
+    # Create a buffer around the grass runways from OSM
+    buffer_distance = .02 
+    osm_only_grass_gfd_projected = osm_only_grass_gfd.to_crs('EPSG:4326')
+    osm_only_grass_gfd_buffer = osm_only_grass_gfd_projected.buffer(buffer_distance)
+    osm_only_grass_gfd_buffer = gpd.GeoDataFrame(osm_only_grass_gfd, geometry=osm_only_grass_gfd_buffer)
+    #osm_only_grass_gfd_buffer.to_file('osm_only_grass_gfd_buffer.geojson', driver='GeoJSON')
+    #only_gas_gdf.to_file('only_gas_gdf.geojson', driver='GeoJSON')
+
+    # Perform a spatial join between only_gas_gdf and the buffered grass runways from OSM
+    with instrument.stage('sjoin', rows_in=len(only_gas_gdf)) as s:
+        intersection = only_gas_gdf.sjoin(osm_only_grass_gfd_buffer, predicate="intersects")
+        s.rows_out = len(intersection)
+
+    # Merge filtered DataFrames
+    faa_gas_grass = pd.merge(only_grass, only_gas_gdf, on="SITE_NO")
+    faa_gas_grass_gdf = gpd.GeoDataFrame(faa_gas_grass, geometry=faa_gas_grass["geometry"], crs='EPSG:4326')
+
+    final_gdf = pd.concat([faa_gas_grass_gdf, intersection])
+    final_gdf = final_gdf[["ARPT_ID", "ARPT_NAME", "geometry"]]
+    # dedupes where the FAA and OSM say there is a grass runway
+    with instrument.stage('dissolve', rows_in=len(final_gdf)) as s:
+        final_gdf = final_gdf.dissolve(by=["ARPT_ID", "ARPT_NAME"])
+        s.rows_out = len(final_gdf)
+    #final_gdf = final_gdf.reset_index()
+    #final_gdf["Name"] = final_gdf.apply(lambda row: f"{row['ARPT_NAME']} ({row['ARPT_ID']})", axis=1)
+    #final_gdf["icon_path"] = "icons/ABW-icon.png"
+    with instrument.stage('write_layer', rows_in=len(final_gdf), layer_format=layer_format):
+        if layer_format == 'geojson':
+            final_gdf.to_file(f'{LAYER_PATH}.geojson', driver='GeoJSON')
+        else:
+            write_layer(final_gdf, f"{LAYER_PATH}.{'fgb' if layer_format == 'fgb' else 'geojson'}")
+    #gdf_to_kmz_with_bundled_icons(final_gdf, "data/content-pack/barbless-maps/layers/Gas and Grass.kmz")
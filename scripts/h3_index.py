@@ -0,0 +1,94 @@
+"""
+H3 cell ids as uint64 columns at several resolutions, and GeoParquet output partitioned by the coarsest one.
+
+Only the finest cell is computed from coordinates. Coarser cells are derived from it
+with integer bit operations over the whole column, which is the same as cell_to_parent.
+"""
+
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import geopandas as gpd
+import shapely
+import h3.api.numpy_int as h3
+
+# the first is the partition key of persisted outputs
+RESOLUTIONS = (1, 3, 6, 9)
+NO_CELL = np.uint64(0)
+
+# H3 index layout: 4 bit resolution at bit 52, then 15 3-bit digits down to bit 0
+RES_OFFSET = np.uint64(52)
+RES_MASK = np.uint64(0xF << 52)
+DIGIT_BITS = 3
+MAX_RES = 15
+
+def column_name(resolution):
+    return f"h3_res{resolution}"
+
+def cells(lat, lon, resolution):
+    """uint64 cell ids of coordinate arrays, NO_CELL where the coordinate is missing."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    result = np.full(len(lat), NO_CELL, dtype=np.uint64)
+    valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+    result[valid] = [h3.latlng_to_cell(y, x, resolution) for y, x in zip(lat[valid], lon[valid])]
+    return result
+
+def parents(cell_ids, resolution):
+    """Vectorized cell_to_parent: set the resolution field and fill the unused digits with 7."""
+    cell_ids = np.asarray(cell_ids, dtype=np.uint64)
+    unused = np.uint64((1 << ((MAX_RES - resolution) * DIGIT_BITS)) - 1)
+    result = (cell_ids & ~RES_MASK) | (np.uint64(resolution) << RES_OFFSET) | unused
+    return np.where(cell_ids == NO_CELL, NO_CELL, result)
+
+def add_cells(df, lat, lon, resolutions=RESOLUTIONS):
+    """Add an h3_res<N> uint64 column per resolution, computing the finest from lat/lon and deriving the rest."""
+    finest = cells(lat, lon, max(resolutions))
+    for resolution in sorted(resolutions):
+        df[column_name(resolution)] = finest if resolution == max(resolutions) else parents(finest, resolution)
+    return df
+
+def add_point_cells(gdf, resolutions=RESOLUTIONS):
+    """add_cells for a GeoDataFrame of points (EPSG:4326)."""
+    geometry = gdf.geometry.values
+    return add_cells(gdf, shapely.get_y(geometry), shapely.get_x(geometry), resolutions)
+
+def neighbors(cell_id, k=1):
+    """Cells within k steps of cell_id, itself included, as a uint64 array for isin lookups."""
+    return np.asarray(h3.grid_disk(cell_id, k), dtype=np.uint64)
+
+def write_partitioned(gdf, path, resolution=RESOLUTIONS[0]):
+    """
+    Write a GeoDataFrame as a hive partitioned GeoParquet dataset keyed by one coarse H3 cell column.
+
+    The dataset is written next to path and swapped in whole, so partitions of an earlier
+    write that have no rows now don't survive it.
+    """
+    staging, previous = f"{path}.tmp", f"{path}.old"
+    for leftover in (staging, previous):
+        shutil.rmtree(leftover, ignore_errors=True)
+    table = pa.Table.from_pandas(gdf.to_wkb(), preserve_index=False)
+    key = column_name(resolution)
+    partitioning = ds.partitioning(pa.schema([(key, pa.uint64())]), flavor='hive')
+    ds.write_dataset(table, staging, format='parquet', partitioning=partitioning,
+                     file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'))
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+
+def read_partitioned(path, cell_ids=None, resolution=RESOLUTIONS[0], columns=None):
+    """Read a write_partitioned dataset, only the partitions of cell_ids (at resolution) when given."""
+    key = column_name(resolution)
+    partitioning = ds.partitioning(pa.schema([(key, pa.uint64())]), flavor='hive')
+    dataset = ds.dataset(path, format='parquet', partitioning=partitioning)
+    condition = None
+    if cell_ids is not None:
+        condition = ds.field(key).isin(pa.array(np.asarray(cell_ids, dtype=np.uint64)))
+    df = dataset.to_table(columns=columns, filter=condition).to_pandas()
+    if 'geometry' in df:
+        return gpd.GeoDataFrame(df, geometry=gpd.GeoSeries.from_wkb(df['geometry']), crs='EPSG:4326')
+    return pd.DataFrame(df)
@@ -0,0 +1,187 @@
+"""
+Lightweight per-stage instrumentation for the pipeline scripts.
+
+Disabled unless UNIDROME_REPORT names a JSON file to write the run report to:
+
+    UNIDROME_REPORT=report.json python scripts/combine.py
+
+Each stage records wall time, CPU time, growth of the process peak RSS and,
+when the script sets them, rows in and rows out. Stages nest, so a report
+shows e.g. combine/get_all_gdfs/get_gdf/read_csv.
+
+UNIDROME_PROFILE=<stage name> additionally runs that one stage under a
+sampling profiler (pyinstrument, if installed) and writes its HTML report
+next to the run report.
+"""
+
+import atexit
+import functools
+import json
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+
+REPORT_ENV = 'UNIDROME_REPORT'
+PROFILE_ENV = 'UNIDROME_PROFILE'
+
+class NullStage:
+    """Stand-in used when instrumentation is off, so a stage costs one attribute lookup and a no-op with."""
+    rows_in = None
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+NULL_STAGE = NullStage()
+
+class Stage:
+    def __init__(self, run, name, rows_in=None, **attrs):
+        self.run = run
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.attrs = attrs
+        self.profiler = None
+
+    def __enter__(self):
+        self.path = '/'.join([s.name for s in self.run.stack] + [self.name])
+        self.run.stack.append(self)
+        if self.run.profile_stage in (self.name, self.path):
+            self.profiler = start_profiler()
+        self.peak_rss_start = peak_rss_mb()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        peak_rss = peak_rss_mb()
+        self.run.stack.pop()
+        record = {
+            'stage': self.path,
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'peak_rss_mb': round(peak_rss, 1),
+            # growth of the process high-water mark while this stage ran
+            'peak_rss_delta_mb': round(peak_rss - self.peak_rss_start, 1),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+        }
+        record.update(self.attrs)
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        if self.profiler is not None:
+            record['profile'] = stop_profiler(self.profiler, self.run.report_path, self.path)
+        self.run.stages.append(record)
+        return False
+
+class Run:
+    def __init__(self, report_path, profile_stage=None):
+        self.report_path = report_path
+        self.profile_stage = profile_stage
+        self.pid = os.getpid()
+        self.script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+        self.started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.wall_start = time.perf_counter()
+        self.stack = []
+        self.stages = []
+
+    def report(self):
+        return {
+            'script': self.script,
+            'argv': sys.argv[1:],
+            'started': self.started,
+            'wall_s': round(time.perf_counter() - self.wall_start, 4),
+            'cpu_s': round(time.process_time(), 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'stages': self.stages,
+        }
+
+    def save(self):
+        # worker processes inherit the run but hand their stages back with records() instead
+        if os.getpid() != self.pid:
+            return
+        with open(self.report_path, 'w') as file:
+            json.dump(self.report(), file, indent=2, default=str)
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+def start_profiler():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        print(f"{PROFILE_ENV} is set but pyinstrument is not installed, skipping the profile", file=sys.stderr)
+        return None
+    profiler = Profiler()
+    profiler.start()
+    return profiler
+
+def stop_profiler(profiler, report_path, stage_path):
+    profiler.stop()
+    html_path = f"{os.path.splitext(report_path)[0]}.{stage_path.replace('/', '.')}.html"
+    with open(html_path, 'w') as file:
+        file.write(profiler.output_html())
+    return html_path
+
+_run = None
+
+def enable(report_path, profile_stage=None):
+    """Turn instrumentation on for this process, writing the report at exit."""
+    global _run
+    if _run is None:
+        atexit.register(lambda: _run.save())
+    _run = Run(report_path, profile_stage)
+    return _run
+
+def stage(name, rows_in=None, **attrs):
+    """
+    Context manager timing one stage. Set rows_out (and rows_in) on it as the stage learns them:
+
+        with instrument.stage('read_csv', source=path) as s:
+            df = pd.read_csv(path)
+            s.rows_out = len(df)
+    """
+    if _run is None:
+        return NULL_STAGE
+    return Stage(_run, name, rows_in, **attrs)
+
+def staged(name=None):
+    """Decorator form of stage(), taking rows_out from len() of the return value when it has one."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _run is None:
+                return func(*args, **kwargs)
+            with stage(stage_name) as s:
+                result = func(*args, **kwargs)
+                if hasattr(result, '__len__'):
+                    s.rows_out = len(result)
+                return result
+        return wrapper
+    return decorator
+
+def records():
+    """Stage records so far, for a worker process to hand its stages back to the parent."""
+    return list(_run.stages) if _run is not None else []
+
+def merge(stage_records):
+    """Add stage records from a worker process to this run's report."""
+    if _run is not None:
+        _run.stages.extend(stage_records)
+
+if os.environ.get(REPORT_ENV):
+    enable(os.environ[REPORT_ENV], os.environ.get(PROFILE_ENV) or None)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Load test a running query service on localhost.
+
+Usage:
+    python scripts/query-service.py &
+    python scripts/load-test.py [--requests 5000] [--concurrency 4] [--p99-ms 50]
+
+Each worker thread keeps one connection open and sends a random mix of
+nearest, radius, bbox, corridor and bulk queries around random points, a share
+of them filtered by fuel or surface. Client side p50/p99 per endpoint are
+printed next to the service's own /metrics, and the exit status is 1 when any
+endpoint's client p99 misses the target.
+"""
+
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+import numpy as np
+
+# endpoint -> share of requests
+MIX = {'nearest': .45, 'radius': .15, 'bbox': .15, 'corridor': .15, 'bulk': .1}
+FILTERS = [{}, {}, {'fuel': '100LL'}, {'surface': 'turf,gravel,dirt'}, {'fuel': '100LL,UL94', 'min_runway_ft': 2000}]
+BULK_SIZE = 20
+RADIUS_KM = 50
+BBOX_DEGREES = 2
+CORRIDOR_NM = 10
+
+def random_query(rng, endpoint):
+    # inhabited latitudes, where the aerodromes are
+    lat, lon = rng.uniform(-50, 70), rng.uniform(-180, 180)
+    params = dict(FILTERS[rng.integers(len(FILTERS))])
+    if endpoint == 'nearest':
+        params.update(lat=round(lat, 5), lon=round(lon, 5), k=int(rng.choice([1, 5, 10])))
+    elif endpoint == 'radius':
+        params.update(lat=round(lat, 5), lon=round(lon, 5), km=RADIUS_KM)
+    elif endpoint == 'corridor':
+        # two to four legs of up to about 300 nm each
+        steps = rng.uniform(-5, 5, size=(rng.integers(2, 5), 2))
+        points = np.clip(np.array([lat, lon]) + np.cumsum(steps, axis=0), [-85, -180], [85, 180])
+        route = [(lat, lon)] + [tuple(point) for point in points]
+        params.update(route=';'.join(f'{y:.5f},{x:.5f}' for y, x in route), nm=CORRIDOR_NM)
+    else:
+        params.update(west=round(lon, 5), south=round(lat, 5), east=round(min(lon + BBOX_DEGREES, 180), 5),
+                      north=round(lat + BBOX_DEGREES, 5))
+    return params
+
+def request(rng):
+    """(endpoint, method, path, body) of one random request."""
+    endpoint = rng.choice(list(MIX), p=list(MIX.values()))
+    if endpoint == 'bulk':
+        queries = []
+        for _ in range(BULK_SIZE):
+            kind = rng.choice(['nearest', 'radius', 'bbox', 'corridor'])
+            queries.append({'endpoint': kind, **random_query(rng, kind)})
+        return endpoint, 'POST', '/bulk', json.dumps({'queries': queries})
+    return endpoint, 'GET', f'/{endpoint}?{urlencode(random_query(rng, endpoint))}', None
+
+def worker(host, port, requests, seed, latencies, failures):
+    rng = np.random.default_rng(seed)
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    for _ in range(requests):
+        endpoint, method, path, body = request(rng)
+        start = time.perf_counter()
+        headers = {'Content-Type': 'application/json'} if body else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.setdefault(endpoint, []).append((time.perf_counter() - start) * 1000)
+        if response.status != 200:
+            failures.append((endpoint, response.status))
+    connection.close()
+
+def main(url, requests, concurrency, p99_ms, seed):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    per_worker = [len(chunk) for chunk in np.array_split(np.arange(requests), concurrency)]
+    results = [{} for _ in range(concurrency)]
+    failures = []
+    threads = [threading.Thread(target=worker, args=(host, port, count, seed + i, results[i], failures))
+               for i, count in enumerate(per_worker)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request('GET', '/metrics')
+    server = json.loads(connection.getresponse().read())['endpoints']
+    connection.close()
+
+    print(f"{requests} requests from {concurrency} connections in {elapsed:.2f}s, {requests / elapsed:.0f} req/s, "
+          f"{len(failures)} failed")
+    print(f"{'endpoint':<10}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'server p50':>12}{'server p99':>12}")
+    missed = []
+    for endpoint in MIX:
+        values = np.concatenate([np.asarray(result.get(endpoint, []), dtype=float) for result in results])
+        if not len(values):
+            continue
+        p50, p99 = np.percentile(values, 50), np.percentile(values, 99)
+        metrics = server.get(endpoint, {})
+        print(f"{endpoint:<10}{len(values):>8}{p50:>10.2f}{p99:>10.2f}"
+              f"{metrics.get('p50_ms', float('nan')):>12.2f}{metrics.get('p99_ms', float('nan')):>12.2f}")
+        # a bulk request carries BULK_SIZE queries, so its target is per query
+        target = p99_ms * (BULK_SIZE if endpoint == 'bulk' else 1)
+        if p99 > target:
+            missed.append(f"{endpoint} p99 {p99:.1f} ms over {target:g} ms")
+    for message in missed:
+        print(f"Missed target: {message}")
+    return 1 if missed or failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load test the local query service.')
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--p99-ms', type=float, default=50, help='p99 latency target per query (default 50)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sys.exit(main(args.url, args.requests, args.concurrency, args.p99_ms, args.seed))
@@ -1,12 +1,25 @@
-from shapely.geometry import Point
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import geopandas as gpd
+import pyarrow as pa
+import shapely
+import coordinates
+import instrument
+import schemas
 
 class AerodromeParser():
+    SCHEMA = None
 
     def parse_geom(row):
         return None
 
+    # vectorized over the whole frame, override this rather than parse_geom
+    @classmethod
+    def parse_geoms(cls, df):
+        return df.apply(cls.parse_geom, axis=1).to_numpy(dtype=object)
+
     def is_airport(row):
         return False
 
@@ -17,23 +30,13 @@ class AerodromeParser():
         return True
 
 class MxParser(AerodromeParser):
-    def parse_geom(row):
-        try:
-            if pd.isna(row.iloc[11]):
-                return None
-            latitude_deg = float(row.iloc[11])
-            latitude_min = float(row.iloc[12])
-            latitude_sec = float(row.iloc[13])
-
-            longitude_deg = float(row.iloc[14])
-            longitude_min = float(row.iloc[15])
-            longitude_sec = float(row.iloc[16])
-            latitude = latitude_deg + latitude_min/60 + latitude_sec/3600
-            longitude = -1 * (longitude_deg + longitude_min/60 + longitude_sec/3600)
-            return Point(longitude, latitude)
-        # if it cannot parse a float, return none
-        except ValueError:
-            return None
+    SCHEMA = schemas.AFAC
+
+    @classmethod
+    def parse_geoms(cls, df):
+        lat = coordinates.parse_split_dms(*(df[column] for column in cls.SCHEMA.lat))
+        lon = coordinates.parse_split_dms(*(df[column] for column in cls.SCHEMA.lon), sign=-1)
+        return coordinates.points(lon, lat)
 
     def is_airport(row):
         return row['TIPO AERÓDROMO'] == 'AERÓDROMO'
@@ -42,8 +45,11 @@ class MxParser(AerodromeParser):
         return row['NO. DE EXPEDIENTE'][:2] == 'HP' or row['TIPO AERÓDROMO'] == 'HELIPUERTO'
 
 class FAAParser(AerodromeParser):
-    def parse_geom(row):
-        return Point(float(row.iloc[24]), float(row.iloc[19])) if row.iloc[19] and row.iloc[24] else None
+    SCHEMA = schemas.FAA_AIRPORTS
+
+    @classmethod
+    def parse_geoms(cls, df):
+        return coordinates.points(*coordinates.parse_decimal(df[cls.SCHEMA.lon], df[cls.SCHEMA.lat]))
 
     def is_airport(row):
         return row['SITE_TYPE_CODE'] != 'H'
@@ -55,8 +61,11 @@ class FAAParser(AerodromeParser):
         return True
 
 class OurAirportsParser(AerodromeParser):
-    def parse_geom(row):
-        return Point(float(row.iloc[5]), float(row.iloc[4]))
+    SCHEMA = schemas.OURAIRPORTS
+
+    @classmethod
+    def parse_geoms(cls, df):
+        return coordinates.points(*coordinates.parse_decimal(df[cls.SCHEMA.lon], df[cls.SCHEMA.lat]))
 
     def is_airport(row):
         return row['type'].find('airport') != -1
@@ -68,8 +77,11 @@ class OurAirportsParser(AerodromeParser):
         return row['type'] != 'closed'
 
 class OSMDaylightParser(AerodromeParser):
-    def parse_geom(row):
-        return Point(float(row.iloc[2]), float(row.iloc[1]))
+    SCHEMA = schemas.DAYLIGHT_AERODROMES
+
+    @classmethod
+    def parse_geoms(cls, df):
+        return coordinates.points(*coordinates.parse_decimal(df[cls.SCHEMA.lon], df[cls.SCHEMA.lat]))
 
     def is_airport(row):
         if pd.isna(row['name']):
@@ -81,11 +93,44 @@ class OSMDaylightParser(AerodromeParser):
             return True
         return row['name'].find('heliport') != -1
 
+class CrParser(AerodromeParser):
+    SCHEMA = schemas.CR
+
+    @classmethod
+    def parse_geoms(cls, df):
+        return coordinates.points(coordinates.parse_packed_dms(df[cls.SCHEMA.lon]),
+                                  coordinates.parse_packed_dms(df[cls.SCHEMA.lat]))
+
+    def is_airport(row):
+        return True
+
+
+def spec_parser(path, spec, multiline=True):
+    """
+    A parser for a source onboarded with conflate-headers.py, from the coordinate
+    spec it inferred. Every row counts as an active airport until is_* are overridden.
+    """
+    lon = tuple(spec['lon']) if isinstance(spec.get('lon'), list) else spec.get('lon')
+    lat = tuple(spec['lat']) if isinstance(spec.get('lat'), list) else spec.get('lat')
+
+    class SpecParser(AerodromeParser):
+        SCHEMA = schemas.Schema(path, {column: 'string' for column in coordinates.spec_columns(spec)},
+                                lon=lon, lat=lat, multiline=multiline)
+
+        @classmethod
+        def parse_geoms(cls, df):
+            return coordinates.points(*coordinates.parse_spec(df, spec))
+
+        def is_airport(row):
+            return True
+
+    return SpecParser
 
 lon_lat_lookup = {
     'data/mx/afac/aerodromos.csv': MxParser,
+    'data/cr/ad-locales-v15.csv': CrParser,
     'data/us/faa/nasr/APT_BASE.csv': FAAParser,
-    ##'data/world/ourairports/runways.csv': lambda row: Point(float(row.iloc[10]), float(row.iloc[9])) if row.iloc[9] and row.iloc[10] else None,
+    # runway centerlines for data/world/ourairports/runways.csv come from runway_geodesy.get_runway_gdf
     'data/world/ourairports/airports.csv': OurAirportsParser,
     ##'data/world/osm/daylight/runway.csv': lambda row: Point(float(row.iloc[2]), float(row.iloc[1])),
     'data/world/osm/daylight/aerodrome.csv': OSMDaylightParser,
@@ -93,25 +138,101 @@ lon_lat_lookup = {
 }
 
 
-def get_gdf(file_path):
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(file_path, low_memory=False)
-    
+def get_gdf(file_path, df=None):
+    """Parse one lon_lat_lookup source. Pass df to reuse an already read copy of the CSV, it is modified."""
     parser = lon_lat_lookup[file_path]
-    # Apply the lambda function to each row
-    df['geometry'] = df.apply(parser.parse_geom, axis=1)
-    df = df.dropna(subset=['geometry'])
-    df['_is_airport'] = df.apply(parser.is_airport, axis=1)
-    df['_is_heliport'] = df.apply(parser.is_heliport, axis=1)
-    df['_is_active'] = df.apply(parser.is_active, axis=1)
-    gdf = gpd.GeoDataFrame(df)
-    
+    with instrument.stage('get_gdf', source=file_path) as s:
+        if df is None:
+            # Read the declared columns of the CSV file into a DataFrame
+            with instrument.stage('read_csv') as read:
+                df = schemas.read_frame(parser.SCHEMA)
+                read.rows_out = len(df)
+        s.rows_in = len(df)
+
+        # Parse coordinates for the whole frame at once
+        with instrument.stage('parse_geoms', rows_in=len(df)) as parse:
+            df['geometry'] = parser.parse_geoms(df)
+            coordinates.report_unparsed(file_path, df['geometry'], df, df.columns[:3].tolist())
+            df = df.dropna(subset=['geometry'])
+            parse.rows_out = len(df)
+        with instrument.stage('classify', rows_in=len(df)):
+            df['_is_airport'] = df.apply(parser.is_airport, axis=1)
+            df['_is_heliport'] = df.apply(parser.is_heliport, axis=1)
+            df['_is_active'] = df.apply(parser.is_active, axis=1)
+        gdf = gpd.GeoDataFrame(df)
+        s.rows_out = len(gdf)
+
     return gdf
 
-def get_all_gdfs():
+# workers hand frames back as Arrow IPC files here, memory mapped by the parent rather than pickled
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+def gdf_to_arrow(gdf):
+    """Arrow table of a get_gdf frame, the point geometry as a GeoArrow point struct in its original position."""
+    geometry = gdf.geometry.values
+    position = gdf.columns.get_loc(gdf.geometry.name)
+    table = pa.Table.from_pandas(pd.DataFrame(gdf.drop(columns=[gdf.geometry.name])), preserve_index=True)
+    coords = pa.StructArray.from_arrays([pa.array(shapely.get_x(geometry)), pa.array(shapely.get_y(geometry))],
+                                        names=['x', 'y'])
+    field = pa.field(gdf.geometry.name, coords.type, metadata={b'ARROW:extension:name': b'geoarrow.point'})
+    return table.add_column(position, field, coords)
+
+def arrow_to_gdf(table):
+    """Inverse of gdf_to_arrow."""
+    name = next(field.name for field in table.schema
+                if field.metadata and field.metadata.get(b'ARROW:extension:name') == b'geoarrow.point')
+    position = table.schema.get_field_index(name)
+    coords = table.column(name).combine_chunks()
+    df = table.drop_columns([name]).to_pandas(split_blocks=True)
+    df.insert(position, name, shapely.points(coords.field('x').to_numpy(), coords.field('y').to_numpy()))
+    return gpd.GeoDataFrame(df, geometry=name)
+
+def load_to_shared(file_path, shared_dir=SHARED_DIR):
+    """Worker side: get_gdf into an Arrow IPC file, returning its path and this worker's stage records."""
+    start = len(instrument.records())
+    gdf = get_gdf(file_path)
+    table = gdf_to_arrow(gdf)
+    fd, path = tempfile.mkstemp(prefix='unidrome-', suffix='.arrow', dir=shared_dir)
+    with os.fdopen(fd, 'wb') as file, pa.ipc.new_file(file, table.schema) as writer:
+        writer.write_table(table)
+    return path, instrument.records()[start:]
+
+def read_shared(path):
+    """Parent side: memory map a worker's Arrow file into a GeoDataFrame and remove the file."""
+    try:
+        with pa.memory_map(path) as source:
+            return arrow_to_gdf(pa.ipc.open_file(source).read_all())
+    finally:
+        os.remove(path)
+
+@instrument.staged()
+def get_all_gdfs(files=None, workers=None):
+    """
+    get_gdf for each lon_lat_lookup source (default all), keyed and ordered as given.
+
+    Sources are parsed in parallel across up to one process per core. workers=1
+    parses them one after another in this process.
+    """
+    files = list(files or lon_lat_lookup)
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    if workers <= 1:
+        return {file: get_gdf(file) for file in files}
+
     gdfs = {}
-    for file in lon_lat_lookup:
-        func = lon_lat_lookup.get(file)
-        if func:
-            gdfs[file] = get_gdf(file)
+    # largest first, so the longest parse is not the one left running at the end
+    by_size = sorted(files, key=os.path.getsize, reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {file: executor.submit(load_to_shared, file) for file in by_size}
+        try:
+            for file in files:
+                path, stage_records = futures[file].result()
+                instrument.merge(stage_records)
+                gdfs[file] = read_shared(path)
+        finally:
+            # don't leave finished workers' files behind in shared memory when one fails
+            for file, future in futures.items():
+                if file not in gdfs and not future.cancel() and future.exception() is None:
+                    path = future.result()[0]
+                    if os.path.exists(path):
+                        os.remove(path)
     return gdfs
@@ -0,0 +1,224 @@
+"""
+Find airports from OurAirports that are in neither the overpass aerodrome nor runway dataset.
+
+Airports are matched one country (iso_country) at a time across a process pool.
+OSM points have no country, so each country's partition takes the points in the
+grid cells of its airports and the ring of cells around them: points near a
+border are in the partitions of both countries, and every point within the match
+radius of an airport is in that airport's partition. Besides MISSING_CSV, each
+country gets its own CSV in MISSING_BY_COUNTRY_DIR and a row of SUMMARY_CSV, and
+one country can be re-run on its own.
+
+Run with scripts/missing-from-ourairports.py or as a unidrome stage.
+"""
+
+import pandas as pd
+import geopandas as gpd
+import numpy as np
+import shapely
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import instrument
+from datasets import MISSING_CSV, points_gdf
+
+CHANGES_CSV = 'data/world/ourairports/changes.csv'
+MISSING_BY_COUNTRY_DIR = 'data/world/osm/overpass/missing_by_country'
+SUMMARY_CSV = os.path.join(MISSING_BY_COUNTRY_DIR, 'summary.csv')
+EXCLUDE_TYPES = ['closed', 'heliport', 'seaplane_base']
+# EPSG:3857 metres from an OSM aerodrome or runway point within which an airport is found
+MATCH_RADIUS_M = 1000
+# partition grid, one cell is still over 4 km across at 85 degrees so its ring covers the match radius
+CELL_DEGREES = 0.5
+CELL_COLUMNS = int(360 / CELL_DEGREES) + 2
+UNKNOWN_COUNTRY = 'unknown'
+
+def cell_keys(lon, lat):
+    """Partition grid cell of each point, column 0 left free for the ring west of -180."""
+    rows = np.floor((np.asarray(lat, dtype=float) + 90) / CELL_DEGREES).astype(np.int64)
+    columns = np.floor((np.asarray(lon, dtype=float) + 180) / CELL_DEGREES).astype(np.int64) + 1
+    return rows * CELL_COLUMNS + columns
+
+def partition(countries, lon, lat, osm_lon, osm_lat):
+    """Airport rows and OSM rows of each country, OSM rows from the airports' cells and the ring around them."""
+    ring = np.array([dr * CELL_COLUMNS + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1)])
+    osm_by_cell = pd.Series(np.arange(len(osm_lon))).groupby(cell_keys(osm_lon, osm_lat)).indices
+    keys = cell_keys(lon, lat)
+    partitions = {}
+    for country, rows in pd.Series(np.arange(len(countries))).groupby(countries).indices.items():
+        cells = np.unique((np.unique(keys[rows])[:, None] + ring).ravel())
+        found = [osm_by_cell[cell] for cell in cells if cell in osm_by_cell]
+        partitions[country] = (rows, np.sort(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64))
+    return partitions
+
+def match(lon, lat, osm_lon, osm_lat):
+    """Whether each airport has no OSM point within MATCH_RADIUS_M, measured in EPSG:3857."""
+    project = lambda x, y: gpd.GeoSeries(gpd.points_from_xy(x, y), crs='EPSG:4326').to_crs('EPSG:3857').values
+    tree = shapely.STRtree(project(osm_lon, osm_lat))
+    airports, _ = tree.query(project(lon, lat), predicate='dwithin', distance=MATCH_RADIUS_M)
+    missing = np.ones(len(lon), dtype=bool)
+    missing[airports] = False
+    return missing
+
+def match_country(country, lon, lat, osm_lon, osm_lat):
+    """Worker side: one country's missing mask and how long it took."""
+    start = time.perf_counter()
+    missing = match(lon, lat, osm_lon, osm_lat)
+    return country, missing, time.perf_counter() - start
+
+def match_countries(tasks, workers=None):
+    """match_country for each (country, lon, lat, osm_lon, osm_lat) task, across up to one process per core."""
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        return [match_country(*task) for task in tasks]
+    # largest first, so the longest match is not the one left running at the end
+    by_size = sorted(tasks, key=lambda task: len(task[1]) + len(task[3]), reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(match_country, *zip(*by_size)))
+
+def country_codes(iso_country):
+    """iso_country as an object array, UNKNOWN_COUNTRY where it is blank."""
+    return pd.Series(iso_country).astype('string').fillna(UNKNOWN_COUNTRY).to_numpy(dtype=object)
+
+def summarize(airports, missing, results, osm_points, previous=None):
+    """
+    One row per country: airports checked, how many and what share are missing, and
+    the OSM points and seconds of its last match, kept from previous when not re-run.
+    """
+    summary = pd.DataFrame({'airports': pd.Series(airports).value_counts()})
+    summary['missing'] = pd.Series(missing).value_counts().reindex(summary.index, fill_value=0)
+    summary['missing_ratio'] = (summary['missing'] / summary['airports']).round(4)
+    summary['osm_points'] = pd.Series(osm_points, dtype=float)
+    summary['seconds'] = pd.Series({country: round(seconds, 3) for country, _, seconds in results}, dtype=float)
+    if previous is not None:
+        previous = previous.set_index('iso_country')[['osm_points', 'seconds']]
+        summary = summary.fillna(previous.reindex(summary.index))
+    summary = summary.rename_axis('iso_country').reset_index()
+    summary['osm_points'] = summary['osm_points'].astype('Int64')
+    return summary.sort_values(['missing', 'iso_country'], ascending=[False, True])
+
+def main(datasets, exclude_unable_to_see=False, changed_only=False, countries=None, workers=None):
+    # Step 1: Load and Filter the OurAirports Data
+    # ---------------------------------------------
+    # Load OurAirports data
+    ourairports_df = datasets.ourairports()
+
+    # Exclude airports where type == 'closed' or type == 'heliport'
+    ourairports_df = ourairports_df[~ourairports_df['type'].isin(EXCLUDE_TYPES)]
+
+    # Drop rows with missing latitude or longitude
+    ourairports_df = ourairports_df.dropna(subset=['latitude_deg', 'longitude_deg'])
+
+    # Step 1.2: Optionally Exclude Airports Unable to Be Seen in Imagery
+    # ------------------------------------------------------------------
+    if exclude_unable_to_see:
+        # Load the list of airports that cannot be seen from imagery
+        unable_to_see_csv = 'data/world/ourairports/unable-to-be-seen-in-osm-imagery.csv'
+        try:
+            unable_to_see_df = pd.read_csv(unable_to_see_csv)
+        except FileNotFoundError:
+            print(f"Error: Unable to find '{unable_to_see_csv}' for exclusion.")
+            sys.exit(1)
+
+        # Ensure the 'id' column exists in both DataFrames
+        if 'id' not in ourairports_df.columns or 'id' not in unable_to_see_df.columns:
+            raise ValueError("Both OurAirports data and unable-to-be-seen CSV must contain an 'id' column.")
+
+        # Exclude airports in unable_to_see_df from ourairports_df
+        ourairports_df = ourairports_df[~ourairports_df['id'].isin(unable_to_see_df['id'])]
+
+    # every airport checked, re-run or not, for the summary
+    checked_countries = country_codes(ourairports_df['iso_country'])
+
+    # Step 1.3: Optionally Limit to Airports Changed Since the Last Refresh
+    # ---------------------------------------------------------------------
+    if changed_only:
+        if not os.path.exists(CHANGES_CSV) or not os.path.exists(MISSING_CSV):
+            print(f"Error: --changed-only needs both '{CHANGES_CSV}' and a previous '{MISSING_CSV}'.")
+            sys.exit(1)
+        changes_df = pd.read_csv(CHANGES_CSV)
+        changed_ids = changes_df.loc[changes_df['file'] == 'airports.csv', 'id']
+        ourairports_df = ourairports_df[ourairports_df['id'].isin(changed_ids)]
+        print(f"Re-evaluating {len(ourairports_df)} changed airports.")
+
+    # Step 1.4: Optionally Limit to Some Countries
+    # --------------------------------------------
+    if countries:
+        if not os.path.exists(MISSING_CSV):
+            print(f"Error: --country needs a previous '{MISSING_CSV}' to keep the other countries from.")
+            sys.exit(1)
+        ourairports_df = ourairports_df[np.isin(country_codes(ourairports_df['iso_country']), list(countries))]
+        print(f"Re-evaluating {len(ourairports_df)} airports in {', '.join(countries)}.")
+    country_of = country_codes(ourairports_df['iso_country'])
+
+    # Step 2: Load the overpass Aerodrome and Runway Points
+    # -----------------------------------------------------
+    # aerodromes and runways alike count as a match, so only their coordinates are needed
+    osm_df = pd.concat([
+        datasets.overpass_aerodromes()[['longitude', 'latitude']],
+        datasets.overpass_runways()[['longitude', 'latitude']],
+    ], ignore_index=True).dropna()
+    osm_lon, osm_lat = osm_df['longitude'].to_numpy(), osm_df['latitude'].to_numpy()
+
+    # Step 3: Partition by Country and Match Each Partition in a Process Pool
+    # -----------------------------------------------------------------------
+    lon, lat = ourairports_df['longitude_deg'].to_numpy(), ourairports_df['latitude_deg'].to_numpy()
+    with instrument.stage('partition', rows_in=len(ourairports_df) + len(osm_df)) as s:
+        partitions = partition(country_of, lon, lat, osm_lon, osm_lat)
+        s.rows_out = len(partitions)
+    tasks = [(country, lon[rows], lat[rows], osm_lon[osm_rows], osm_lat[osm_rows])
+             for country, (rows, osm_rows) in partitions.items()]
+    with instrument.stage('match_countries', rows_in=len(ourairports_df), countries=len(tasks)) as s:
+        results = match_countries(tasks, workers)
+        missing = np.zeros(len(ourairports_df), dtype=bool)
+        for country, country_missing, _ in results:
+            missing[partitions[country][0]] = country_missing
+        s.rows_out = int(missing.sum())
+
+    # Step 4: Clean Up and Add OSM Editor Link
+    # ----------------------------------------
+    missing_airports_gdf = points_gdf(ourairports_df[missing], 'longitude_deg', 'latitude_deg')
+    missing_airports_gdf['osm_editor_link'] = [
+        f"https://www.openstreetmap.org/edit?editor=id#map=18/{y:.6f}/{x:.6f}"
+        for x, y in zip(missing_airports_gdf['longitude_deg'], missing_airports_gdf['latitude_deg'])
+    ]
+
+    # per country files to rewrite: every country matched now or losing a previous result
+    rewrite = set(partitions)
+
+    # Keep previous results for every airport that was not re-evaluated
+    if changed_only or countries:
+        previous_df = pd.read_csv(MISSING_CSV, keep_default_na=False, na_values=[''])
+        previous_countries = country_codes(previous_df['iso_country'])
+        replaced = np.zeros(len(previous_df), dtype=bool)
+        if changed_only:
+            # also airports removed from OurAirports or moved to another country
+            replaced |= previous_df['id'].isin(changed_ids).to_numpy()
+        if countries:
+            replaced |= np.isin(previous_countries, list(countries))
+        rewrite.update(previous_countries[replaced])
+        previous_df = previous_df[~replaced]
+        missing_airports_gdf = pd.concat([previous_df, pd.DataFrame(missing_airports_gdf)], ignore_index=True)
+
+    # Step 5: Export to CSV, Overall and per Country
+    # ----------------------------------------------
+    missing_countries = country_codes(missing_airports_gdf['iso_country'])
+    previous_summary = None
+    if (changed_only or countries) and os.path.exists(SUMMARY_CSV):
+        previous_summary = pd.read_csv(SUMMARY_CSV, keep_default_na=False, na_values=[''])
+    summary_df = summarize(checked_countries, missing_countries, results,
+                           {country: len(osm_rows) for country, (_, osm_rows) in partitions.items()}, previous_summary)
+    with instrument.stage('write_csv', rows_in=len(missing_airports_gdf)):
+        missing_airports_gdf.to_csv(MISSING_CSV, index=False)
+        os.makedirs(MISSING_BY_COUNTRY_DIR, exist_ok=True)
+        # the other countries' files are still current
+        for country in sorted(rewrite):
+            missing_airports_gdf[missing_countries == country].to_csv(
+                os.path.join(MISSING_BY_COUNTRY_DIR, f'{country}.csv'), index=False)
+        summary_df.to_csv(SUMMARY_CSV, index=False)
+
+    print(summary_df.head(20).to_string(index=False))
+
+    # Later stages in the same run (filter, verify) take this instead of re-reading the CSV
+    datasets.put('missing_airports', points_gdf(missing_airports_gdf, 'longitude_deg', 'latitude_deg'))
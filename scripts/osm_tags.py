@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import fuels
+
+# Tags every consumer reads get a typed column; everything else goes in the sparse tags map
+CORE_TAGS = {
+    'runway': {
+        'surface': 'category',
+        'ref': 'string',
+        'name': 'string',
+        'length': 'float',
+        'width': 'float',
+        'ele': 'float',
+        'abandoned': 'category',
+        'access': 'category',
+    },
+    'aerodrome': {
+        'name': 'string',
+        'icao': 'string',
+        'iata': 'string',
+        'ref': 'string',
+        'aerodrome:type': 'category',
+        'ele': 'float',
+        'access': 'category',
+        'operator': 'string',
+    },
+}
+# keys per top-{aeroway}.txt, and so tag columns of the overpass and daylight CSVs
+TOP_TAGS_LIMIT = {'runway': 11, 'aerodrome': 30}
+# tag tables are keyed on (type, id), OSM ids repeat across nodes, ways and relations
+SORT_KEYS = [('type', 'ascending'), ('id', 'ascending')]
+ARROW_TYPES = {
+    'category': pa.dictionary(pa.int16(), pa.string()),
+    'string': pa.string(),
+    'float': pa.float64(),
+}
+
+def column_name(tag):
+    return tag.replace(":", "_")
+
+def tags_from_dicts(tag_dicts):
+    """Build a MapArray from an iterable of {key: value} dicts, keys sorted within each feature."""
+    offsets = [0]
+    keys = []
+    values = []
+    for tags in tag_dicts:
+        for key in sorted(tags):
+            keys.append(key)
+            values.append(tags[key])
+        offsets.append(len(keys))
+    return pa.MapArray.from_arrays(pa.array(offsets, pa.int32()), pa.array(keys, pa.string()),
+                                   pa.array(values, pa.string()))
+
+def encode_keys(map_array):
+    """
+    Dictionary encode map keys against a sorted key dictionary, so key ids are stable for the same key set.
+
+    Key ids are int32 like the map's offsets, so any number of distinct keys a map can hold fits.
+    """
+    keys = map_array.keys.cast(pa.string())
+    dictionary = pa.array(np.unique(keys.to_numpy(zero_copy_only=False)).astype(object), pa.string())
+    key_ids = pc.index_in(keys, value_set=dictionary).cast(pa.int32())
+    return pa.MapArray.from_arrays(map_array.offsets, pa.DictionaryArray.from_arrays(key_ids, dictionary),
+                                   map_array.items)
+
+def decode_keys(map_array):
+    """Inverse of encode_keys, plain string keys so pc.map_lookup can take a string query key."""
+    return pa.MapArray.from_arrays(map_array.offsets, map_array.keys.cast(pa.string()), map_array.items)
+
+def tag_frequency(map_array, exclude=('aeroway',)):
+    """Count of features carrying each key, most frequent first and ties broken by key."""
+    keys = map_array.keys.cast(pa.string()).to_numpy(zero_copy_only=False)
+    unique, counts = np.unique(keys, return_counts=True)
+    freq = pd.Series(counts, index=unique.astype(object), name='count')
+    freq = freq.drop(index=[key for key in exclude if key in freq.index])
+    order = np.lexsort((freq.index.to_numpy(dtype=object).astype(str), -freq.to_numpy()))
+    return freq.iloc[order]
+
+def write_top_tags(freq, path, limit):
+    """Write the limit most frequent keys one per line, in a stable order."""
+    with open(path, "w") as file:
+        for key in freq.index[:limit]:
+            file.write(key + "\n")
+
+def typed_column(values, kind):
+    if kind == 'float':
+        return pa.array(pd.to_numeric(values.to_pandas(), errors='coerce'), pa.float64())
+    if kind == 'category':
+        return values.dictionary_encode().cast(ARROW_TYPES['category'])
+    return values
+
+def split_tags(map_array, aeroway):
+    """
+    Split a tags MapArray into typed core columns and a sparse map of the remaining tags.
+
+    Numeric core tags whose value does not parse as a number keep their raw entry in
+    the sparse map, so nothing from the source is lost.
+    """
+    core = CORE_TAGS[aeroway]
+    columns = {}
+    keys = map_array.keys.cast(pa.string()).to_numpy(zero_copy_only=False)
+    items = map_array.items.to_numpy(zero_copy_only=False)
+    offsets = map_array.offsets.to_numpy()
+    lengths = np.diff(offsets)
+    row_of_entry = np.repeat(np.arange(len(map_array)), lengths)
+
+    keep = ~np.isin(keys, list(core))
+    for tag, kind in core.items():
+        raw = pc.map_lookup(map_array, tag, 'first')
+        columns[column_name(tag)] = typed_column(raw, kind)
+        if kind == 'float':
+            entry = keys == tag
+            unparsed = pd.to_numeric(pd.Series(items[entry]), errors='coerce').isna().to_numpy()
+            keep[np.flatnonzero(entry)[unparsed]] = True
+    if aeroway == 'aerodrome':
+        # the fuel:*=yes tags folded into one column for fuels.masks, the tags themselves stay in the map
+        columns['fuels'] = fuels.osm_fuels(map_array)
+
+    kept_per_row = np.bincount(row_of_entry[keep], minlength=len(map_array))
+    new_offsets = np.concatenate([[0], np.cumsum(kept_per_row)]).astype(np.int32)
+    rest = pa.MapArray.from_arrays(pa.array(new_offsets), pa.array(keys[keep], pa.string()),
+                                   pa.array(items[keep], pa.string()))
+    columns['tags'] = encode_keys(rest)
+    return columns
+
+def tags_table(types, ids, latitudes, longitudes, map_array, aeroway):
+    """
+    Feature table ordered by type and id: type, id, latitude, longitude, typed core tags and the sparse tags map.
+
+    OSM ids are only unique per element type (node, way or relation), so a feature is keyed on both.
+    """
+    columns = {
+        'type': pa.array(types, pa.string()),
+        'id': pa.array(ids, pa.int64()),
+        'latitude': pa.array(latitudes, pa.float64()),
+        'longitude': pa.array(longitudes, pa.float64()),
+    }
+    columns.update(split_tags(map_array, aeroway))
+    table = pa.table(columns)
+    # sorted rows make successive refreshes diff cleanly
+    return table.sort_by(SORT_KEYS)
+
+def write_parquet(table, path):
+    pq.write_table(table, path, compression='zstd')
+
+def read_parquet(path, tags=(), columns=None):
+    """
+    Read a tag table into pandas, expanding the requested long tail tags into columns.
+
+    This gives the same wide shape the overpass/daylight CSVs have, for only the tags asked for.
+    """
+    table = pq.read_table(path, columns=columns)
+    if tags:
+        sparse = pa.chunked_array([decode_keys(chunk) for chunk in table.column('tags').chunks])
+        for tag in tags:
+            if column_name(tag) not in table.column_names:
+                table = table.append_column(column_name(tag), pc.map_lookup(sparse, tag, 'first'))
+    return table.drop_columns(['tags']).to_pandas() if 'tags' in table.column_names else table.to_pandas()
@@ -1,37 +1,181 @@
 import os
-import shutil
-import tempfile
-import subprocess
+import sys
+import json
+import argparse
+import requests
+import pandas as pd
+from runway_geodesy import haversine_m
 
 class OurAirports:
-    GIT_REPO = "https://github.com/davidmegginson/ourairports-data.git"
+    BASE_URL = "https://davidmegginson.github.io/ourairports-data"
+    DATA_PATH = os.path.join('data', 'world', 'ourairports')
+    FILES = ['airports.csv', 'runways.csv']
+    CACHE_FILE = 'http-cache.json'
+    CHANGES_FILE = 'changes.csv'
+    CHUNK_SIZE = 1024 * 1024
+    # positions closer than this are treated as unchanged float noise
+    MOVED_THRESHOLD_M = 1.0
+
+    def __init__(self, data_path=DATA_PATH, base_url=BASE_URL):
+        self.data_path = data_path
+        self.base_url = base_url
+
+    def cache_path(self):
+        return os.path.join(self.data_path, self.CACHE_FILE)
+
+    def changes_path(self):
+        return os.path.join(self.data_path, self.CHANGES_FILE)
+
+    def load_cache(self):
+        if os.path.exists(self.cache_path()):
+            with open(self.cache_path()) as file:
+                return json.load(file)
+        return {}
+
+    def save_cache(self, cache):
+        with open(self.cache_path(), 'w') as file:
+            json.dump(cache, file, indent=2, sort_keys=True)
+
+    def fetch(self, filename, cache):
+        """
+        Conditionally download filename next to the local copy.
+
+        Returns the path of the new download, or None when the server says the
+        local copy is current (304). A failed request raises requests.RequestException.
+        """
+        dst_path = os.path.join(self.data_path, filename)
+        headers = {}
+        validators = cache.get(filename, {})
+        if os.path.exists(dst_path):
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        url = f"{self.base_url}/{filename}"
+        tmp_path = dst_path + '.new'
+        try:
+            with requests.get(url, headers=headers, stream=True) as response:
+                if response.status_code == 304:
+                    print(f"{filename} not modified.")
+                    return None
+                response.raise_for_status()
+                with open(tmp_path, 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                        file.write(chunk)
+                cache[filename] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }
+        except requests.RequestException:
+            # no half-written download left next to the local copy
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        print(f"Downloaded {filename}")
+        return tmp_path
 
     @staticmethod
-    def download_and_copy():
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            print(f"Cloning repository into {tmp_dir}")
+    def diff_airports(old, new):
+        """Change set keyed on id: added, removed, type changed and moved (with distance in meters)."""
+        joined = old.merge(new, on='id', how='outer', suffixes=('_old', '_new'), indicator=True)
+        moved_m = haversine_m(
+            joined['latitude_deg_old'].to_numpy(dtype=float), joined['longitude_deg_old'].to_numpy(dtype=float),
+            joined['latitude_deg_new'].to_numpy(dtype=float), joined['longitude_deg_new'].to_numpy(dtype=float),
+        )
+        changes = pd.DataFrame({
+            'id': joined['id'],
+            'file': 'airports.csv',
+            'change': None,
+            'old_type': joined['type_old'],
+            'new_type': joined['type_new'],
+            'moved_m': moved_m,
+        })
+        both = (joined['_merge'] == 'both').to_numpy()
+        type_changed = both & (joined['type_old'] != joined['type_new']).to_numpy()
+        moved = both & (moved_m > OurAirports.MOVED_THRESHOLD_M)
+        changes.loc[moved, 'change'] = 'moved'
+        # a type change is the stronger signal when both happened
+        changes.loc[type_changed, 'change'] = 'type_changed'
+        changes.loc[(joined['_merge'] == 'left_only').to_numpy(), 'change'] = 'removed'
+        changes.loc[(joined['_merge'] == 'right_only').to_numpy(), 'change'] = 'added'
+        return changes.dropna(subset=['change'])
+
+    @staticmethod
+    def diff_rows(old, new, filename):
+        """Change set keyed on id for any other file: added, removed or changed rows."""
+        old = old.assign(hash=pd.util.hash_pandas_object(old.astype(str), index=False).to_numpy())
+        new = new.assign(hash=pd.util.hash_pandas_object(new.astype(str), index=False).to_numpy())
+        joined = old[['id', 'hash']].merge(new[['id', 'hash']], on='id', how='outer', suffixes=('_old', '_new'), indicator=True)
+        joined = joined[joined['hash_old'] != joined['hash_new']]
+        change = joined['_merge'].map({'left_only': 'removed', 'right_only': 'added', 'both': 'changed'}).astype(object)
+        return pd.DataFrame({'id': joined['id'], 'file': filename, 'change': change})
+
+    def diff(self, filename, old_path, new_path):
+        new = pd.read_csv(new_path, low_memory=False)
+        if os.path.exists(old_path):
+            old = pd.read_csv(old_path, low_memory=False)
+        else:
+            old = new.iloc[0:0]
+        if filename == 'airports.csv':
+            return self.diff_airports(old[['id', 'type', 'latitude_deg', 'longitude_deg']], new[['id', 'type', 'latitude_deg', 'longitude_deg']])
+        return self.diff_rows(old, new, filename)
+
+    @staticmethod
+    def merge_changes(previous, changes):
+        """previous with changes applied on top, a newer change of the same row replacing the earlier one."""
+        merged = pd.concat([previous.reindex(columns=changes.columns), changes], ignore_index=True)
+        return merged.drop_duplicates(subset=['id', 'file'], keep='last').reset_index(drop=True)
+
+    def download_and_copy(self):
+        """
+        Refresh every file, returning the change set and the files that failed to download.
+
+        changes.csv is only replaced when a file changed: when nothing did, an earlier change
+        set that --changed-only has not consumed yet stays. When a download failed, the new
+        changes are merged into that earlier set instead, so the rows of the failed file remain.
+        """
+        if not os.path.exists(self.data_path):
+            os.makedirs(self.data_path)
+            print(f"Created directory {self.data_path}")
+
+        cache = self.load_cache()
+        changes = []
+        failed = []
+        for filename in self.FILES:
             try:
-                subprocess.run(["git", "clone", "--depth", "1", OurAirports.GIT_REPO, tmp_dir], check=True)
-                print("Repository successfully cloned.")
-            except subprocess.CalledProcessError:
-                print("Failed to clone repository.")
-                return
-
-            src_files = ['airports.csv', 'runways.csv']
-            destination_dir = os.path.join('data', 'world', 'ourairports')
-            if not os.path.exists(destination_dir):
-                os.makedirs(destination_dir)
-                print(f"Created directory {destination_dir}")
-
-            for filename in src_files:
-                src_path = os.path.join(tmp_dir, filename)
-                dst_path = os.path.join(destination_dir, filename)
-                if os.path.exists(src_path):
-                    shutil.copy(src_path, dst_path)
-                    print(f"Copied {filename} to {destination_dir}")
-                else:
-                    print(f"Warning: {filename} not found in the repository.")
+                new_path = self.fetch(filename, cache)
+            except requests.RequestException as e:
+                print(f"Failed to download {filename}: {e}")
+                failed.append(filename)
+                continue
+            if new_path is None:
+                continue
+            dst_path = os.path.join(self.data_path, filename)
+            changes.append(self.diff(filename, dst_path, new_path))
+            os.replace(new_path, dst_path)
+            print(f"Copied {filename} to {self.data_path}")
+        self.save_cache(cache)
+
+        columns = ['id', 'file', 'change', 'old_type', 'new_type', 'moved_m']
+        if not changes:
+            print(f"No new downloads, {self.changes_path()} left as it was")
+            return pd.DataFrame(columns=columns), failed
+        changes = pd.concat(changes, ignore_index=True).reindex(columns=columns)
+        if failed and os.path.exists(self.changes_path()):
+            changes = self.merge_changes(pd.read_csv(self.changes_path()), changes)
+        changes.to_csv(self.changes_path(), index=False)
+        print(f"{len(changes)} changed rows saved to {self.changes_path()}")
+        return changes, failed
 
 if __name__ == "__main__":
-    OurAirports.download_and_copy()
+    parser = argparse.ArgumentParser(description="Refresh the OurAirports airports.csv and runways.csv mirror.")
+    parser.add_argument('--force', action='store_true', help="Ignore cached ETag / Last-Modified validators")
+    args = parser.parse_args()
 
+    our_airports = OurAirports()
+    if args.force and os.path.exists(our_airports.cache_path()):
+        os.remove(our_airports.cache_path())
+    _, failed = our_airports.download_and_copy()
+    if failed:
+        sys.exit(1)
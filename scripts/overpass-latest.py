@@ -3,6 +3,7 @@ import argparse
 import pickle
 import os
 import csv
+import osm_tags
 
 parser = argparse.ArgumentParser(description='Toggle cache usage')
 parser.add_argument('--use-cache', action='store_true', help='Use cache if set')
@@ -40,45 +41,50 @@ for aeroway in ["runway", "aerodrome"]:
         with open(pickle_file, "wb") as f:
             pickle.dump(result, f)
 
+    elements = [(node.id, float(node.lat), float(node.lon), node.tags, 'node') for node in result.nodes]
+    elements += [(way.id, float(way.center_lat), float(way.center_lon), way.tags, 'way') for way in result.ways]
+    tags = osm_tags.tags_from_dicts(element[3] for element in elements)
+
+    # Derive the top tags from what was fetched, so the columns only move when the data does
+    osm_tags.write_top_tags(osm_tags.tag_frequency(tags), f"data/world/osm/top-{aeroway}.txt",
+                            osm_tags.TOP_TAGS_LIMIT[aeroway])
+
+    # Typed core tags plus the sparse long tail of every tag
+    table = osm_tags.tags_table([e[4] for e in elements], [e[0] for e in elements], [e[1] for e in elements],
+                                [e[2] for e in elements], tags, aeroway)
+    osm_tags.write_parquet(table, f"data/world/osm/overpass/{aeroway}.parquet")
+
     headers = ["id", "latitude", "longitude"]
 
     with open(f"data/world/osm/top-{aeroway}.txt", "r") as file:
         headers.extend([line.strip() for line in file.readlines()])
 
+    # fuels derived from the fuel:* tags, see osm_tags.split_tags; a node and a way can share an id
+    fuels_by_id = {}
+    if 'fuels' in table.column_names:
+        headers.append('fuels')
+        fuels_by_id = dict(zip(zip(table.column('type').to_pylist(), table.column('id').to_pylist()),
+                               table.column('fuels').to_pylist()))
+
     # Create a CSV file with these headers
     with open(f"data/world/osm/overpass/{aeroway}.csv", "w", newline='') as csv_file:
         writer = csv.DictWriter(csv_file, fieldnames=headers)
         writer.writeheader()
 
-        for node in result.nodes:
+        for element_id, lat, lon, element_tags, element_type in sorted(elements, key=lambda element: (element[0], element[4])):
             # Prepare the row data
             row_data = {
-                'id': node.id,
-                'latitude': float(node.lat),
-                'longitude': float(node.lon)
+                'id': element_id,
+                'latitude': lat,
+                'longitude': lon
             }
             update_tags = {}
-            for tag in node.tags:
+            for tag in element_tags:
                 if tag in headers and tag not in row_data:
-                    update_tags[tag] = node.tags[tag]
+                    update_tags[tag] = element_tags[tag]
             # Add tags data
             row_data.update(update_tags)
+            if fuels_by_id:
+                row_data['fuels'] = fuels_by_id[(element_type, element_id)]
             # Write the row to CSV
             writer.writerow(row_data)
-
-        for way in result.ways:
-            # Prepare the row data
-            row_data = {
-                'id': way.id,
-                'latitude': float(way.center_lat),
-                'longitude': float(way.center_lon)
-            }
-            update_tags = {}
-            for tag in way.tags:
-                if tag in headers and tag not in row_data:
-                    update_tags[tag] = way.tags[tag]
-            # Add tags data
-            row_data.update(update_tags)
-            # Write the row to CSV
-            writer.writerow(row_data)
-
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Serve nearest, radius and bounding box queries over the unified aerodromes.
+
+Usage:
+    python scripts/combine.py
+    python scripts/query-service.py [--port 8080]
+    curl 'http://127.0.0.1:8080/nearest?lat=37.5&lon=-122.3&k=3&fuel=100LL&surface=turf'
+
+The service reloads on its own when combine.py writes a new snapshot. The work
+is done in query_service.py, scripts/load-test.py measures it.
+"""
+
+import argparse
+from combine import SNAPSHOT_PATH
+import query_service
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local aerodrome query service.')
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH, help=f'Aerodromes GeoParquet (default {SNAPSHOT_PATH})')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--reload-seconds', type=float, default=query_service.RELOAD_SECONDS,
+                        help='How often to check the snapshot for changes, 0 to never reload')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    query_service.serve(args.snapshot, host=args.host, port=args.port, reload_seconds=args.reload_seconds,
+                        verbose=args.verbose)
@@ -0,0 +1,358 @@
+"""
+Local HTTP service for nearest, radius, bounding box and route corridor queries over the unified aerodromes.
+
+combine.py writes one point per aerodrome to combine.SNAPSHOT_PATH. The service
+loads it into memory at startup: a k-d tree over unit vectors on the sphere, where
+chord distance orders points the same as great circle distance, and the rows
+sorted by latitude for bounding boxes. A background thread swaps in a new index
+when the snapshot file changes. Filters are integer tests on the fuel and surface
+masks, so they cost the same whatever is asked for.
+
+    GET  /nearest?lat=..&lon=..[&k=1]
+    GET  /radius?lat=..&lon=..&km=..[&limit=]
+    GET  /bbox?west=..&south=..&east=..&north=..[&limit=]
+    GET  /corridor?route=lat,lon;lat,lon;..&nm=..[&limit=]
+    POST /bulk      {"queries": [{"endpoint": "nearest", "lat": .., "lon": ..}, ...]}
+    GET  /metrics   request counts and p50/p99 latency per endpoint
+
+Every query also takes fuel=100LL,UL94 and surface=turf,gravel (any of those)
+and min_runway_ft=. Results are GeoJSON FeatureCollections, nearest first for
+nearest and radius queries and in route order, with cross_track_nm and
+along_track_nm, for corridors (see corridor.py).
+"""
+
+import json
+import math
+import os
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+import numpy as np
+import geopandas as gpd
+import shapely
+from scipy.spatial import cKDTree
+import corridor
+import fuels
+import surfaces
+from runway_geodesy import unit_vectors, chord_to_m, m_to_chord
+
+RELOAD_SECONDS = 2
+# latencies kept per endpoint for the percentiles
+METRICS_WINDOW = 10000
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10000
+MAX_BULK = 1000
+# tree neighbours checked against the filters before falling back to scanning every match
+NEAREST_CANDIDATES = 64
+PROPERTIES = ['aerodrome_id', 'name', 'icao', 'iata', 'ident', 'elevation_ft', 'longest_runway_ft', 'runways']
+
+def chord_to_km(chord):
+    return chord_to_m(chord) / 1000
+
+def python_value(value):
+    """JSON-ready scalar: numpy types unboxed, NaN as null."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+class Filters:
+    """Parsed fuel, surface and runway length filters of one query."""
+    def __init__(self, params):
+        wanted = split(params.get('fuel'))
+        unknown = [name for name in wanted if name not in fuels.BITS]
+        if unknown:
+            raise ValueError(f"unknown fuel(s) {unknown}, expected some of {list(fuels.FUELS)}")
+        self.fuel = fuels.bits(wanted)
+        wanted = split(params.get('surface'))
+        unknown = [name for name in wanted if name not in surfaces.NAMES]
+        if unknown:
+            raise ValueError(f"unknown surface(s) {unknown}, expected some of {list(surfaces.NAMES)}")
+        self.surface = np.uint8(sum(1 << surfaces.NAMES.index(name) for name in wanted))
+        self.min_runway_ft = number(params, 'min_runway_ft', None)
+
+def split(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return [v.strip() for v in str(value).split(',') if v.strip()]
+
+def number(params, name, default=...):
+    if name not in params or params[name] in ('', None):
+        if default is ...:
+            raise ValueError(f"missing parameter {name}")
+        return default
+    try:
+        value = float(params[name])
+    except (TypeError, ValueError):
+        raise ValueError(f"parameter {name} is not a number: {params[name]!r}")
+    if not math.isfinite(value):
+        raise ValueError(f"parameter {name} is not finite")
+    return value
+
+def limit(params, name='limit', default=DEFAULT_LIMIT):
+    return max(0, min(int(number(params, name, default)), MAX_LIMIT))
+
+class Index:
+    """One loaded snapshot: arrays per column, the k-d tree and the latitude order."""
+    def __init__(self, path):
+        stat = os.stat(path)
+        self.version = (stat.st_mtime_ns, stat.st_size)
+        gdf = gpd.read_parquet(path)
+        self.loaded = time.time()
+        self.lon = shapely.get_x(gdf.geometry.values)
+        self.lat = shapely.get_y(gdf.geometry.values)
+        self.fuel_mask = gdf[fuels.FUEL_COLUMN].to_numpy(dtype=np.uint16)
+        self.surface_mask = gdf['surface_mask'].to_numpy(dtype=np.uint8)
+        self.longest_runway_ft = gdf['longest_runway_ft'].to_numpy(dtype=float)
+        # object columns are only touched for the rows of a response
+        self.properties = {name: gdf[name].astype(object).where(gdf[name].notna(), None).to_numpy()
+                           for name in PROPERTIES}
+        self.vectors = unit_vectors(self.lat, self.lon)
+        self.tree = cKDTree(self.vectors)
+        self.by_lat = np.argsort(self.lat, kind='stable')
+        self.sorted_lat = self.lat[self.by_lat]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def matches(self, rows, filters):
+        keep = np.ones(len(rows), dtype=bool)
+        if filters.fuel:
+            keep &= (self.fuel_mask[rows] & filters.fuel) != 0
+        if filters.surface:
+            keep &= (self.surface_mask[rows] & filters.surface) != 0
+        if filters.min_runway_ft is not None:
+            keep &= self.longest_runway_ft[rows] >= filters.min_runway_ft
+        return keep
+
+    def nearest(self, lat, lon, k, filters):
+        """
+        The k nearest matching rows and their distances. The tree's nearest candidates
+        usually have enough matches; when a filter is rare nearby, the matching rows are scanned instead.
+        """
+        if not len(self):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        point = unit_vectors([lat], [lon])[0]
+        chord, rows = self.tree.query(point, k=min(len(self), max(4 * k, NEAREST_CANDIDATES)))
+        chord, rows = np.atleast_1d(chord), np.atleast_1d(rows)
+        keep = self.matches(rows, filters)
+        if keep.sum() >= k or len(rows) == len(self):
+            return rows[keep][:k], chord_to_km(chord[keep][:k])
+        rows = np.flatnonzero(self.matches(np.arange(len(self)), filters))
+        chord = np.linalg.norm(self.vectors[rows] - point, axis=1)
+        nearest = np.argsort(chord, kind='stable')[:k] if len(rows) <= k else np.argpartition(chord, k)[:k]
+        nearest = nearest[np.argsort(chord[nearest], kind='stable')]
+        return rows[nearest], chord_to_km(chord[nearest])
+
+    def radius(self, lat, lon, km, filters, limit):
+        point = unit_vectors([lat], [lon])[0]
+        rows = np.asarray(self.tree.query_ball_point(point, m_to_chord(km * 1000)), dtype=np.int64)
+        rows = rows[self.matches(rows, filters)]
+        distances = chord_to_km(np.linalg.norm(self.vectors[rows] - point, axis=1))
+        order = np.argsort(distances, kind='stable')[:limit]
+        return rows[order], distances[order]
+
+    def bbox(self, west, south, east, north, filters, limit):
+        start = np.searchsorted(self.sorted_lat, south, side='left')
+        stop = np.searchsorted(self.sorted_lat, north, side='right')
+        rows = self.by_lat[start:stop]
+        lon = self.lon[rows]
+        # west > east crosses the antimeridian
+        inside = (lon >= west) & (lon <= east) if west <= east else (lon >= west) | (lon <= east)
+        rows = rows[inside]
+        return rows[self.matches(rows, filters)][:limit]
+
+    def feature(self, row, extra):
+        properties = {name: python_value(values[row]) for name, values in self.properties.items()}
+        properties['fuels'] = fuels.names(self.fuel_mask[row]).split(',') if self.fuel_mask[row] else []
+        properties['surfaces'] = surfaces.mask_names(self.surface_mask[row])
+        properties.update(extra)
+        return {'type': 'Feature', 'properties': properties,
+                'geometry': {'type': 'Point', 'coordinates': [float(self.lon[row]), float(self.lat[row])]}}
+
+    def collection(self, rows, **columns):
+        """A FeatureCollection of rows, with columns (e.g. distance_km) aligned with rows added to the properties."""
+        features = []
+        for i, row in enumerate(rows):
+            extra = {name: rounded(values[i]) for name, values in columns.items()}
+            features.append(self.feature(row, extra))
+        return {'type': 'FeatureCollection', 'features': features}
+
+def rounded(value):
+    value = python_value(value)
+    return round(value, 3) if isinstance(value, float) else value
+
+def route(params):
+    """Waypoint lats and lons from "lat,lon;lat,lon;..." or a JSON list of [lat, lon] pairs."""
+    value = params.get('route')
+    if not value:
+        raise ValueError("missing parameter route")
+    if isinstance(value, str):
+        value = [point.split(',') for point in value.split(';') if point.strip()]
+    try:
+        points = np.array(value, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError('route must be "lat,lon;lat,lon;..." or a list of [lat, lon] pairs')
+    if points.ndim != 2 or points.shape[1] != 2 or not np.isfinite(points).all():
+        raise ValueError('route must be "lat,lon;lat,lon;..." or a list of [lat, lon] pairs')
+    return points[:, 0], points[:, 1]
+
+def query(index, endpoint, params):
+    """Run one query against an index, params as strings (query string) or JSON values (bulk)."""
+    filters = Filters(params)
+    if endpoint == 'nearest':
+        k = max(1, min(int(number(params, 'k', 1)), MAX_LIMIT))
+        rows, distances = index.nearest(number(params, 'lat'), number(params, 'lon'), k, filters)
+        return index.collection(rows, distance_km=distances)
+    if endpoint == 'radius':
+        km = number(params, 'km')
+        if km < 0:
+            raise ValueError("km must not be negative")
+        rows, distances = index.radius(number(params, 'lat'), number(params, 'lon'), km, filters, limit(params))
+        return index.collection(rows, distance_km=distances)
+    if endpoint == 'bbox':
+        return index.collection(index.bbox(number(params, 'west'), number(params, 'south'), number(params, 'east'),
+                                           number(params, 'north'), filters, limit(params)))
+    if endpoint == 'corridor':
+        lat, lon = route(params)
+        rows, cross, along, leg = corridor.along_route(index, lat, lon, number(params, 'nm'), filters, limit(params))
+        return index.collection(rows, cross_track_nm=cross, along_track_nm=along, leg=leg)
+    raise ValueError(f"unknown endpoint {endpoint!r}, expected nearest, radius, bbox or corridor")
+
+class Metrics:
+    """Request counts and a window of recent latencies per endpoint."""
+    def __init__(self, window=METRICS_WINDOW):
+        self.lock = threading.Lock()
+        self.window = window
+        self.latencies = {}
+        self.counts = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, error=False):
+        with self.lock:
+            if endpoint not in self.latencies:
+                self.latencies[endpoint] = deque(maxlen=self.window)
+                self.counts[endpoint] = 0
+                self.errors[endpoint] = 0
+            self.latencies[endpoint].append(seconds * 1000)
+            self.counts[endpoint] += 1
+            self.errors[endpoint] += int(error)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = {endpoint: np.array(values) for endpoint, values in self.latencies.items()}
+            counts = dict(self.counts)
+            errors = dict(self.errors)
+        return {endpoint: {
+            'count': counts[endpoint],
+            'errors': errors[endpoint],
+            'p50_ms': round(float(np.percentile(values, 50)), 3),
+            'p99_ms': round(float(np.percentile(values, 99)), 3),
+        } for endpoint, values in latencies.items()}
+
+class Handler(BaseHTTPRequestHandler):
+    # keep-alive, every response has a Content-Length
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # headers and body go out in separate writes, without this each response waits on a delayed ACK
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        endpoint = url.path.strip('/')
+        if endpoint == 'metrics':
+            index = self.server.index
+            return self.send_json(200, {'endpoints': self.server.metrics.snapshot(), 'snapshot': {
+                'path': self.server.path, 'aerodromes': len(index), 'loaded': index.loaded,
+            }})
+        self.timed(endpoint, lambda index: query(index, endpoint, dict(parse_qsl(url.query))))
+
+    def do_POST(self):
+        endpoint = urlsplit(self.path).path.strip('/')
+        if endpoint != 'bulk':
+            return self.send_json(404, {'error': f"unknown endpoint {endpoint!r}"})
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.timed('bulk', lambda index: bulk(index, json.loads(body or b'{}')))
+
+    def timed(self, endpoint, run):
+        start = time.perf_counter()
+        # one index for the whole request, even if a reload swaps it meanwhile
+        index = self.server.index
+        try:
+            status, result = 200, run(index)
+        except (ValueError, TypeError, KeyError) as e:
+            status, result = 400, {'error': str(e)}
+        self.send_json(status, result)
+        if endpoint in ('nearest', 'radius', 'bbox', 'corridor', 'bulk'):
+            self.server.metrics.record(endpoint, time.perf_counter() - start, error=status != 200)
+
+    def send_json(self, status, result):
+        body = json.dumps(result, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def bulk(index, payload):
+    queries = payload.get('queries')
+    if not isinstance(queries, list):
+        raise ValueError('expected {"queries": [...]}')
+    if len(queries) > MAX_BULK:
+        raise ValueError(f"at most {MAX_BULK} queries per bulk request")
+    results = []
+    for params in queries:
+        try:
+            if not isinstance(params, dict):
+                raise ValueError('each query is an object with an endpoint and its parameters')
+            results.append(query(index, params.get('endpoint'), params))
+        except (ValueError, TypeError, KeyError) as e:
+            results.append({'error': str(e)})
+    return {'results': results}
+
+def watch(server, interval):
+    """Swap in a new index whenever the snapshot file is replaced."""
+    while True:
+        time.sleep(interval)
+        try:
+            stat = os.stat(server.path)
+            if (stat.st_mtime_ns, stat.st_size) == server.index.version:
+                continue
+            start = time.perf_counter()
+            index = Index(server.path)
+        except (OSError, ValueError) as e:
+            print(f"Reload of {server.path} failed: {e}")
+            continue
+        server.index = index
+        print(f"Reloaded {len(index)} aerodromes from {server.path} in {time.perf_counter() - start:.2f}s")
+
+def serve(path, host='127.0.0.1', port=8080, reload_seconds=RELOAD_SECONDS, verbose=False):
+    start = time.perf_counter()
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.path = path
+    server.index = Index(path)
+    server.metrics = Metrics()
+    server.verbose = verbose
+    print(f"Loaded {len(server.index)} aerodromes from {path} in {time.perf_counter() - start:.2f}s")
+    if reload_seconds:
+        threading.Thread(target=watch, args=(server, reload_seconds), daemon=True).start()
+    print(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -7,7 +7,9 @@ from shapely.geometry import Point
 import os
 import ast
 from content_pack import gdf_to_kmz_with_bundled_icons, series_to_html_table
+import instrument
 
+@instrument.staged()
 def fetch_all_airports(base_url, headers):
     all_airports = []
     offset = 0
@@ -122,6 +124,7 @@ def add_description(row):
     row["description"] = series_to_html_table(row, columns=columns )
     return row
 
+@instrument.staged()
 def parse_df(df):
     df = df.apply(parse_coord, axis=1)
     df = df.apply(parse_notes, axis=1)
@@ -149,26 +152,29 @@ if __name__ == "__main__":
     airports_data = fetch_all_airports(base_url, headers)
 
     detailed_airports_data = []
-    for airport in airports_data:
-        airport_id = airport['id']
-        overview_data = fetch_airport_overview(airport_id, headers)
-        #comments_data = fetch_airport_comments(airport_id, headers)
-        #amenities_data = fetch_airport_amenities(airport_id, headers)
-        #runways_data = fetch_airport_runways(airport_id, headers)
-        #media_data = fetch_airport_media(airport_id, headers)
-
-        combined_data = {
-            **airport,
-            **overview_data,
-        #    "comments": comments_data,
-        #    "amenities": amenities_data,
-        #    "runways": runways_data,
-        #    "media": media_data
-        }
-        detailed_airports_data.append(combined_data)
+    with instrument.stage('fetch_overviews', rows_in=len(airports_data)) as s:
+        for airport in airports_data:
+            airport_id = airport['id']
+            overview_data = fetch_airport_overview(airport_id, headers)
+            #comments_data = fetch_airport_comments(airport_id, headers)
+            #amenities_data = fetch_airport_amenities(airport_id, headers)
+            #runways_data = fetch_airport_runways(airport_id, headers)
+            #media_data = fetch_airport_media(airport_id, headers)
+
+            combined_data = {
+                **airport,
+                **overview_data,
+            #    "comments": comments_data,
+            #    "amenities": amenities_data,
+            #    "runways": runways_data,
+            #    "media": media_data
+            }
+            detailed_airports_data.append(combined_data)
+        s.rows_out = len(detailed_airports_data)
 
     df = pd.DataFrame(detailed_airports_data)
 
     gdf = parse_df(df)
-    gdf_to_kmz_with_bundled_icons(gdf, f"data/content-pack/barbless-maps/layers/RAF Airfield Guide.kmz")
-    gdf.to_csv('data/us/raf/airfields.csv')
+    with instrument.stage('write_outputs', rows_in=len(gdf)):
+        gdf_to_kmz_with_bundled_icons(gdf, f"data/content-pack/barbless-maps/layers/RAF Airfield Guide.kmz", id_column="id")
+        gdf.to_csv('data/us/raf/airfields.csv')
@@ -0,0 +1,221 @@
+"""
+Precomputed reachability graph over the unified aerodromes, for range-limited trip planning.
+
+Every aerodrome in combine.SNAPSHOT_PATH is a node, with an edge to every other
+aerodrome within MAX_RANGE_NM weighted by the great-circle distance. Edges come
+from radius searches of a k-d tree over unit vectors and are stored in CSR form
+as .npy files in GRAPH_DIR:
+
+    indptr.npy       int64, node i's edges are indices[indptr[i]:indptr[i + 1]]
+    indices.npy      int32 neighbor nodes, nearest first
+    distance_nm.npy  float32 edge weights
+    aerodrome_id.npy, lat.npy, lon.npy, fuel_mask.npy, surface_mask.npy, longest_runway_ft.npy per node
+    component.npy    connected component of each node
+    meta.json        range, counts and the snapshot the graph was built from
+
+The build counts neighbors first and then fills memory-mapped arrays one block
+of nodes at a time, so memory stays bounded by the size of the graph on disk.
+Routes are shortest paths over the edges between nodes that pass the fuel,
+surface and runway filters of the query, which can also shorten the legs. Only
+the nodes inside an ellipse around the two ends are searched, with foci at the
+ends and a bound on the route's length; a route that could be beaten by one
+leaving the ellipse is searched again with the ellipse widened to fit it, so
+results are the same as over the whole graph.
+"""
+
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+from scipy.spatial import cKDTree
+import fuels
+import surfaces
+from runway_geodesy import M_PER_NM, unit_vectors, chord_to_m, m_to_chord
+
+GRAPH_DIR = 'data/world/unified/graph'
+MAX_RANGE_NM = 300
+# nodes per radius search block
+BLOCK_SIZE = 4096
+NODE_COLUMNS = {'aerodrome_id': np.int64, fuels.FUEL_COLUMN: np.uint16, 'surface_mask': np.uint8,
+                'longest_runway_ft': np.float32}
+# first search ellipse: nodes at most ELLIPSE_SLACK times the direct distance plus one leg from the ends
+ELLIPSE_SLACK = 1.25
+
+def build(snapshot_path, graph_dir=GRAPH_DIR, max_range_nm=MAX_RANGE_NM, block_size=BLOCK_SIZE):
+    """Write the graph of snapshot_path's aerodromes with edges up to max_range_nm, returning its meta."""
+    start = time.perf_counter()
+    stat = os.stat(snapshot_path)
+    gdf = gpd.read_parquet(snapshot_path, columns=list(NODE_COLUMNS) + ['geometry'])
+    lat, lon = shapely.get_y(gdf.geometry.values), shapely.get_x(gdf.geometry.values)
+    vectors = unit_vectors(lat, lon)
+    tree = cKDTree(vectors)
+    radius = float(m_to_chord(max_range_nm * M_PER_NM))
+
+    # first pass: edge counts, less one for the node itself
+    counts = tree.query_ball_point(vectors, radius, return_length=True) - 1
+    indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    edges = int(indptr[-1])
+
+    os.makedirs(graph_dir, exist_ok=True)
+    indices = np.lib.format.open_memmap(os.path.join(graph_dir, 'indices.npy.tmp'), mode='w+',
+                                        dtype=np.int32, shape=(edges,))
+    distance_nm = np.lib.format.open_memmap(os.path.join(graph_dir, 'distance_nm.npy.tmp'), mode='w+',
+                                            dtype=np.float32, shape=(edges,))
+    # second pass: neighbors block by block, nearest first
+    links = []
+    for first in range(0, len(vectors), block_size):
+        nodes = np.arange(first, min(first + block_size, len(vectors)))
+        # pairs as one structured array, without a Python list per node
+        pairs = cKDTree(vectors[nodes]).sparse_distance_matrix(tree, radius, output_type='ndarray')
+        sources, targets = pairs['i'] + first, pairs['j']
+        keep = targets != sources
+        sources, targets = sources[keep], targets[keep]
+        distances = chord_to_m(pairs['v'][keep]) / M_PER_NM
+        order = np.lexsort((distances, sources))
+        indices[indptr[nodes[0]]:indptr[nodes[-1] + 1]] = targets[order]
+        distance_nm[indptr[nodes[0]]:indptr[nodes[-1] + 1]] = distances[order]
+        links.append(stars(sources, targets, len(vectors)))
+    indices.flush()
+    distance_nm.flush()
+    del indices, distance_nm
+    # routes between components are impossible with any filter, and known without a search
+    sources, targets = np.concatenate(links, axis=1)
+    _, component = connected_components(edge_matrix(sources, targets, len(vectors)), directed=False)
+
+    arrays = {'indptr': indptr, 'lat': lat, 'lon': lon, 'component': component.astype(np.int32)}
+    for column, dtype in NODE_COLUMNS.items():
+        arrays[column] = gdf[column].to_numpy(dtype=dtype, na_value=np.nan if dtype == np.float32 else 0)
+    for name, values in arrays.items():
+        # through a file, np.save would add .npy to the .tmp name
+        with open(os.path.join(graph_dir, f'{name}.npy.tmp'), 'wb') as file:
+            np.save(file, values)
+    meta = {
+        'snapshot': snapshot_path, 'snapshot_mtime_ns': stat.st_mtime_ns, 'max_range_nm': max_range_nm,
+        'nodes': len(vectors), 'edges': edges, 'build_seconds': round(time.perf_counter() - start, 2),
+    }
+    # renamed last, so a reader never mixes arrays of two builds with a whole meta.json
+    for name in ['indices', 'distance_nm'] + list(arrays):
+        os.replace(os.path.join(graph_dir, f'{name}.npy.tmp'), os.path.join(graph_dir, f'{name}.npy'))
+    with open(os.path.join(graph_dir, 'meta.json'), 'w') as file:
+        json.dump(meta, file, indent=2)
+    return meta
+
+def edge_matrix(sources, targets, size):
+    return csr_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(size, size))
+
+def stars(sources, targets, size):
+    """Edges joining every node of each component of a block's edges to one node of it, with the same components."""
+    _, labels = connected_components(edge_matrix(sources, targets, size), directed=False)
+    _, first = np.unique(labels, return_index=True)
+    nodes = np.arange(size)
+    joined = first[labels] != nodes
+    return np.stack([nodes[joined], first[labels][joined]])
+
+class Graph:
+    """A built graph, with the edge arrays memory-mapped."""
+    def __init__(self, graph_dir=GRAPH_DIR):
+        with open(os.path.join(graph_dir, 'meta.json')) as file:
+            self.meta = json.load(file)
+        load = lambda name, mmap_mode=None: np.load(os.path.join(graph_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+        self.indptr = load('indptr')
+        self.indices = load('indices', 'r')
+        self.distance_nm = load('distance_nm', 'r')
+        self.aerodrome_id = load('aerodrome_id')
+        self.vectors = unit_vectors(load('lat'), load('lon'))
+        self.component = load('component')
+        self.fuel_mask = load(fuels.FUEL_COLUMN)
+        self.surface_mask = load('surface_mask')
+        self.longest_runway_ft = load('longest_runway_ft')
+        self.nodes = pd.Index(self.aerodrome_id)
+
+    def stale(self):
+        """Whether the snapshot was rewritten since the graph was built."""
+        try:
+            return os.stat(self.meta['snapshot']).st_mtime_ns != self.meta['snapshot_mtime_ns']
+        except OSError:
+            return True
+
+    def node(self, aerodrome_id):
+        position = self.nodes.get_indexer([aerodrome_id])[0]
+        if position < 0:
+            raise KeyError(f"aerodrome {aerodrome_id} is not in the graph")
+        return position
+
+    def allowed(self, fuel=(), surface=(), min_runway_ft=None):
+        """Nodes a route may stop at: offering any of fuel, with any of surface, and a long enough runway."""
+        unknown = [name for name in fuel if name not in fuels.BITS]
+        if unknown:
+            raise ValueError(f"unknown fuel(s) {unknown}, expected some of {list(fuels.FUELS)}")
+        unknown = [name for name in surface if name not in surfaces.NAMES]
+        if unknown:
+            raise ValueError(f"unknown surface(s) {unknown}, expected some of {list(surfaces.NAMES)}")
+        allowed = np.ones(len(self.aerodrome_id), dtype=bool)
+        if fuel:
+            allowed &= fuels.has_any(self.fuel_mask, fuel)
+        if surface:
+            wanted = np.uint8(sum(1 << surfaces.NAMES.index(name) for name in surface))
+            allowed &= (self.surface_mask & wanted) != 0
+        if min_runway_ft is not None:
+            allowed &= self.longest_runway_ft >= min_runway_ft
+        return allowed
+
+    def distances_from(self, node):
+        """Great-circle distance in nm from one node to every node."""
+        return chord_to_m(np.linalg.norm(self.vectors - self.vectors[node], axis=1)) / M_PER_NM
+
+    def subgraph(self, allowed, max_leg_nm=None):
+        """CSR matrix of the edges between allowed nodes, no longer than max_leg_nm."""
+        # only the edge ranges of allowed rows are read from the memory maps
+        rows = np.flatnonzero(allowed)
+        starts, counts = self.indptr[rows], np.diff(self.indptr)[rows]
+        edges = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        indices, distances = self.indices[edges], self.distance_nm[edges]
+        keep = allowed[indices]
+        if max_leg_nm is not None:
+            keep &= distances <= max_leg_nm
+        kept = np.bincount(np.repeat(rows, counts)[keep], minlength=len(allowed))
+        indptr = np.concatenate([[0], np.cumsum(kept)])
+        size = len(allowed)
+        return csr_matrix((distances[keep], indices[keep], indptr), shape=(size, size))
+
+def route(graph, source_id, target_id, max_leg_nm=None, fuel=(), surface=(), min_runway_ft=None,
+          fewest_stops=False):
+    """
+    Aerodrome ids from source_id to target_id and the distance of each leg in nm,
+    stopping only at aerodromes that pass the filters (the ends always may), or None
+    when the target can't be reached. fewest_stops minimizes legs instead of distance.
+    """
+    if max_leg_nm is not None and max_leg_nm > graph.meta['max_range_nm']:
+        raise ValueError(f"the graph only has legs up to {graph.meta['max_range_nm']} nm, rebuild it for longer ones")
+    leg_nm = graph.meta['max_range_nm'] if max_leg_nm is None else max_leg_nm
+    source, target = graph.node(source_id), graph.node(target_id)
+    if graph.component[source] != graph.component[target]:
+        return None
+    allowed = graph.allowed(fuel, surface, min_runway_ft)
+    allowed[[source, target]] = True
+    # every node of a route of length at most bound is inside the ellipse
+    foci = graph.distances_from(source) + graph.distances_from(target)
+    bound = foci[target] * ELLIPSE_SLACK + leg_nm
+    while True:
+        matrix = graph.subgraph(allowed & (foci <= bound), max_leg_nm)
+        _, predecessors = dijkstra(matrix, indices=source, unweighted=fewest_stops, return_predecessors=True)
+        if source != target and predecessors[target] < 0:
+            if np.isinf(bound):
+                return None
+            bound = np.inf
+            continue
+        path = [target]
+        while path[-1] != source:
+            path.append(predecessors[path[-1]])
+        path = np.array(path[::-1])
+        legs = np.asarray(matrix[path[:-1], path[1:]], dtype=float).ravel()
+        # a better route than this one stays within its length, or its number of legs times the longest leg
+        needed = (len(legs) * leg_nm) if fewest_stops else legs.sum()
+        if needed <= bound:
+            return graph.aerodrome_id[path], legs
+        bound = needed
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+import schemas
+import h3_index
+
+EARTH_RADIUS_M = 6371008.8
+FT_PER_M = 3.28084
+M_PER_NM = 1852
+
+RUNWAYS_PATH = 'data/world/ourairports/runways.csv'
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between arrays of points given in degrees."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def unit_vectors(lat, lon):
+    """(n, 3) unit vectors of points given in degrees, where chord length orders points like great-circle distance."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+def chord_to_m(chord):
+    """Great-circle distance in meters of a chord between unit vectors."""
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(np.asarray(chord) / 2, 1))
+
+def m_to_chord(meters):
+    """Chord between unit vectors a great-circle distance in meters apart, for k-d tree radius queries."""
+    return 2 * np.sin(np.minimum(np.asarray(meters) / EARTH_RADIUS_M, np.pi) / 2)
+
+def initial_bearing_deg(lat1, lon1, lat2, lon2):
+    """Initial true bearing in degrees [0, 360) from point 1 towards point 2."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+def midpoint(lat1, lon1, lat2, lon2):
+    """Great-circle midpoint of two arrays of points, returned as (lat, lon) in degrees."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    bx = np.cos(lat2) * np.cos(dlon)
+    by = np.cos(lat2) * np.sin(dlon)
+    lat = np.arctan2(np.sin(lat1) + np.sin(lat2), np.sqrt((np.cos(lat1) + bx) ** 2 + by ** 2))
+    lon = lon1 + np.arctan2(by, np.cos(lat1) + bx)
+    lon = (lon + np.pi) % (2 * np.pi) - np.pi
+    return np.degrees(lat), np.degrees(lon)
+
+def get_runway_gdf(file_path=RUNWAYS_PATH, length_tolerance=0.1):
+    """
+    Build runway centerlines from the OurAirports le_/he_ threshold coordinates.
+
+    Rows without both ends are dropped. Adds _length_ft, _heading_degT, _mid_lat,
+    _mid_lon and _length_mismatch, which is True where the computed length differs
+    from length_ft by more than length_tolerance (a fraction of length_ft), and the
+    h3_res<N> cells of the midpoint.
+    """
+    df = schemas.read_csv(file_path)
+    ends = ['le_latitude_deg', 'le_longitude_deg', 'he_latitude_deg', 'he_longitude_deg']
+    df = df.dropna(subset=ends).reset_index(drop=True)
+
+    le_lat = df['le_latitude_deg'].to_numpy(dtype=float)
+    le_lon = df['le_longitude_deg'].to_numpy(dtype=float)
+    he_lat = df['he_latitude_deg'].to_numpy(dtype=float)
+    he_lon = df['he_longitude_deg'].to_numpy(dtype=float)
+
+    length_ft = haversine_m(le_lat, le_lon, he_lat, he_lon) * FT_PER_M
+    df['_length_ft'] = length_ft
+    df['_heading_degT'] = initial_bearing_deg(le_lat, le_lon, he_lat, he_lon)
+    df['_mid_lat'], df['_mid_lon'] = midpoint(le_lat, le_lon, he_lat, he_lon)
+    h3_index.add_cells(df, df['_mid_lat'], df['_mid_lon'])
+
+    published = pd.to_numeric(df['length_ft'], errors='coerce').to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = np.abs(length_ft - published) / published
+    df['_length_mismatch'] = ~(error <= length_tolerance)
+
+    # (n, 2, 2) array of [[le_lon, le_lat], [he_lon, he_lat]] per runway
+    coords = np.stack([np.column_stack([le_lon, le_lat]), np.column_stack([he_lon, he_lat])], axis=1)
+    geometry = shapely.linestrings(coords)
+    return gpd.GeoDataFrame(df, geometry=geometry, crs='EPSG:4326')
+
+if __name__ == "__main__":
+    gdf = get_runway_gdf()
+    mismatched = gdf[gdf['_length_mismatch']]
+    print(f"Built {len(gdf)} runway lines, {len(mismatched)} disagree with length_ft")
+    print(mismatched[['id', 'airport_ident', 'le_ident', 'he_ident', 'length_ft', '_length_ft']].head(20))
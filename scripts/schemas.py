@@ -0,0 +1,230 @@
+"""
+Declared schemas for the source CSVs and an Arrow based reader for them.
+
+Each schema lists the columns the pipeline uses with their types, which of them
+are low-cardinality categories, and where the coordinates are. read_frame parses
+only those columns with the multithreaded Arrow CSV reader into a compact typed
+DataFrame, and iter_batches streams them as bounded-memory record batches.
+"""
+
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import fuels
+import surfaces
+
+ARROW_TYPES = {
+    'string': pa.string(),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'float': pa.float64(),
+    'int': pa.int64(),
+}
+BLOCK_SIZE = 16 * 1024 * 1024
+
+class Schema:
+    def __init__(self, path, columns, lon, lat, multiline=False, surface=None, fuels=None):
+        self.path = path
+        # name -> 'string' | 'category' | 'float' | 'int', in file order
+        self.columns = columns
+        # a column name, or (degrees, minutes, seconds) column names
+        self.lon = lon
+        self.lat = lat
+        # quoted values with embedded newlines, slower to parse so only where needed
+        self.multiline = multiline
+        # raw runway surface column, classified into surfaces.SURFACE_COLUMN codes on read
+        self.surface = surface
+        # raw fuel column, parsed into a fuels.FUEL_COLUMN bitmask on read
+        self.fuels = fuels
+
+    def column_types(self, names):
+        return {name: ARROW_TYPES[self.columns[name]] for name in names}
+
+    def read_options(self, names, block_size=BLOCK_SIZE):
+        return (
+            pacsv.ReadOptions(block_size=block_size, use_threads=True),
+            pacsv.ParseOptions(newlines_in_values=self.multiline),
+            pacsv.ConvertOptions(
+                include_columns=names,
+                include_missing_columns=True,
+                column_types=self.column_types(names),
+                # only empty fields are missing, so codes like NA (Namibia) survive
+                null_values=[''],
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=True,
+            ),
+        )
+
+FAA_AIRPORTS = Schema(
+    'data/us/faa/nasr/APT_BASE.csv',
+    {
+        'EFF_DATE': 'category', 'SITE_NO': 'string', 'SITE_TYPE_CODE': 'category', 'STATE_CODE': 'category',
+        'ARPT_ID': 'string', 'CITY': 'string', 'COUNTRY_CODE': 'category', 'ARPT_NAME': 'string',
+        'OWNERSHIP_TYPE_CODE': 'category', 'FACILITY_USE_CODE': 'category', 'LAT_DECIMAL': 'float',
+        'LONG_DECIMAL': 'float', 'ELEV': 'float', 'ARPT_STATUS': 'category', 'FUEL_TYPES': 'category',
+        'ICAO_ID': 'string',
+    },
+    lon='LONG_DECIMAL', lat='LAT_DECIMAL', fuels='FUEL_TYPES',
+)
+FAA_RUNWAYS = Schema(
+    'data/us/faa/nasr/APT_RWY.csv',
+    {
+        'EFF_DATE': 'category', 'SITE_NO': 'string', 'SITE_TYPE_CODE': 'category', 'STATE_CODE': 'category',
+        'ARPT_ID': 'string', 'RWY_ID': 'string', 'RWY_LEN': 'float', 'RWY_WIDTH': 'float',
+        'SURFACE_TYPE_CODE': 'category', 'COND': 'category', 'TREATMENT_CODE': 'category',
+        'RWY_LGT_CODE': 'category',
+    },
+    lon=None, lat=None, surface='SURFACE_TYPE_CODE',
+)
+OURAIRPORTS = Schema(
+    'data/world/ourairports/airports.csv',
+    {
+        'id': 'int', 'ident': 'string', 'type': 'category', 'name': 'string', 'latitude_deg': 'float',
+        'longitude_deg': 'float', 'elevation_ft': 'float', 'continent': 'category', 'iso_country': 'category',
+        'iso_region': 'category', 'municipality': 'string', 'scheduled_service': 'category', 'icao_code': 'string',
+        'gps_code': 'string', 'iata_code': 'string', 'local_code': 'string', 'home_link': 'string', 'wikipedia_link': 'string',
+        'keywords': 'string',
+    },
+    lon='longitude_deg', lat='latitude_deg',
+)
+OURAIRPORTS_RUNWAYS = Schema(
+    'data/world/ourairports/runways.csv',
+    {
+        'id': 'int', 'airport_ref': 'int', 'airport_ident': 'string', 'length_ft': 'float', 'width_ft': 'float',
+        'surface': 'category', 'lighted': 'int', 'closed': 'int', 'le_ident': 'string', 'le_latitude_deg': 'float',
+        'le_longitude_deg': 'float', 'le_elevation_ft': 'float', 'le_heading_degT': 'float', 'he_ident': 'string',
+        'he_latitude_deg': 'float', 'he_longitude_deg': 'float', 'he_elevation_ft': 'float',
+        'he_heading_degT': 'float',
+    },
+    lon=None, lat=None, surface='surface',
+)
+OVERPASS_AERODROMES = Schema(
+    'data/world/osm/overpass/aerodrome.csv',
+    {
+        'id': 'int', 'latitude': 'float', 'longitude': 'float', 'name': 'string', 'icao': 'string',
+        'ref': 'string', 'ele': 'string', 'type': 'category', 'military': 'category', 'operator': 'string',
+        # derived from the fuel:*=yes tags by fuels.osm_fuels
+        'fuels': 'category',
+    },
+    lon='longitude', lat='latitude', fuels='fuels',
+)
+OVERPASS_RUNWAYS = Schema(
+    'data/world/osm/overpass/runway.csv',
+    {
+        'id': 'int', 'latitude': 'float', 'longitude': 'float', 'ele': 'string', 'access': 'category',
+        'abandoned': 'category', 'surface': 'category', 'width': 'string', 'name': 'string', 'length': 'string',
+        'ref': 'string',
+    },
+    lon='longitude', lat='latitude', surface='surface',
+)
+DAYLIGHT_AERODROMES = Schema(
+    'data/world/osm/daylight/aerodrome.csv',
+    {
+        'id': 'int', 'latitude': 'float', 'longitude': 'float', 'name': 'string', 'icao': 'string',
+        'ref': 'string', 'ele': 'string', 'type': 'category', 'military': 'category', 'operator': 'string',
+        # derived from the fuel:*=yes tags by fuels.osm_fuels
+        'fuels': 'category',
+    },
+    lon='longitude', lat='latitude', fuels='fuels',
+)
+AFAC = Schema(
+    'data/mx/afac/aerodromos.csv',
+    {
+        'NO. DE EXPEDIENTE': 'string', 'TIPO AERÓDROMO': 'category', 'DESIGNADOR': 'string', 'NOMBRE': 'string',
+        'ESTADO': 'category', 'MUNICIPIO': 'string', 'TIPO DE OPERACIÓN': 'category',
+        'TIPO DE SERVICIO': 'category', 'ELEV (M)': 'string', 'SISTEMA': 'category',
+        # hand-entered, so kept as text and parsed leniently by coordinates.parse_split_dms
+        'LATITUD\n°': 'string', "LATITUD '": 'string', "LATITUD ''": 'string',
+        'LONGITUD °': 'string', "LONGITUD '": 'string', "LONGITUD ''": 'string',
+        '¿VIGENTE?': 'category', 'SITUACIÓN': 'category',
+    },
+    lon=('LONGITUD °', "LONGITUD '", "LONGITUD ''"), lat=('LATITUD\n°', "LATITUD '", "LATITUD ''"),
+    multiline=True,
+)
+CR = Schema(
+    'data/cr/ad-locales-v15.csv',
+    {
+        'AERÓDROMO': 'string', 'DESIGNADOR': 'string', 'OACI': 'string', 'LAT': 'string', 'LON': 'string',
+        'HEADING': 'string', 'LENGTH': 'string', 'WIDTH': 'string', 'ELE': 'string', 'SURFACE': 'string',
+        'AUTORIDAD': 'string',
+    },
+    lon='LON', lat='LAT',
+    multiline=True, surface='SURFACE',
+)
+RAF_AIRFIELDS = Schema(
+    'data/us/raf/airfields.csv',
+    {
+        'id': 'string', 'title': 'string', 'number': 'string', 'visitType': 'category', 'elevation': 'float',
+        'longestRunway': 'float', 'region': 'category', 'state': 'category', 'fuels': 'string', 'geometry': 'string',
+    },
+    lon=None, lat=None, multiline=True, fuels='fuels',
+)
+WIKIDATA = Schema(
+    'data/world/wikidata/airports.csv',
+    {
+        'airport': 'string', 'minName': 'string', 'minEle': 'float', 'minRunway': 'string', 'minICAO': 'string',
+        'minIATA': 'string', 'minWebsite': 'string', 'minOSM': 'string', 'LON': 'float', 'LAT': 'float',
+    },
+    lon='LON', lat='LAT',
+)
+
+SCHEMAS = {schema.path: schema for schema in [
+    FAA_AIRPORTS, FAA_RUNWAYS, OURAIRPORTS, OURAIRPORTS_RUNWAYS, OVERPASS_AERODROMES, OVERPASS_RUNWAYS,
+    DAYLIGHT_AERODROMES, AFAC, CR, RAF_AIRFIELDS, WIKIDATA,
+]}
+
+def projection(schema, columns=None):
+    names = list(columns) if columns is not None else list(schema.columns)
+    unknown = [name for name in names if name not in schema.columns]
+    if unknown:
+        raise KeyError(f"{schema.path} has no declared column(s) {unknown}")
+    return names
+
+def lenient(schema):
+    """The same schema with numeric columns read as text, for files with stray values in them."""
+    return Schema(schema.path, {name: 'string' if kind in ('float', 'int') else kind
+                                for name, kind in schema.columns.items()},
+                  schema.lon, schema.lat, schema.multiline, schema.surface, schema.fuels)
+
+def coerce_numeric(table, schema, names):
+    for name in names:
+        if schema.columns[name] in ('float', 'int'):
+            values = pd.to_numeric(table.column(name).to_pandas(), errors='coerce')
+            table = table.set_column(table.schema.get_field_index(name), name, pa.array(values, pa.float64()))
+    return table
+
+def read_table(schema, columns=None):
+    """The declared (or given) columns of a source as an Arrow table."""
+    names = projection(schema, columns)
+    try:
+        return pacsv.read_csv(schema.path, *schema.read_options(names))
+    except pa.ArrowInvalid as e:
+        # a non-numeric value in a numeric column: read it as text and coerce, like pandas would
+        print(f"{schema.path}: {e}, parsing numeric columns leniently", file=sys.stderr)
+        return coerce_numeric(pacsv.read_csv(schema.path, *lenient(schema).read_options(names)), schema, names)
+
+def read_frame(schema, columns=None):
+    """
+    A compact typed DataFrame of the declared (or given) columns, categories as pandas categoricals.
+
+    When the schema's surface or fuel column is read, its int8 surfaces.SURFACE_COLUMN codes
+    or uint16 fuels.FUEL_COLUMN mask are added alongside.
+    """
+    df = read_table(schema, columns).to_pandas(split_blocks=True, self_destruct=True)
+    if schema.surface is not None and schema.surface in df:
+        df[surfaces.SURFACE_COLUMN] = surfaces.classify(df[schema.surface])
+    if schema.fuels is not None and schema.fuels in df:
+        df[fuels.FUEL_COLUMN] = fuels.masks(df[schema.fuels])
+    return df
+
+def iter_batches(schema, columns=None, block_size=BLOCK_SIZE):
+    """Stream a source as record batches, holding about one block in memory at a time."""
+    names = projection(schema, columns)
+    with pacsv.open_csv(schema.path, *schema.read_options(names, block_size)) as reader:
+        yield from reader
+
+def read_csv(path, columns=None):
+    """Read a source through its schema when it has one, otherwise with pandas."""
+    if path in SCHEMAS:
+        return read_frame(SCHEMAS[path], columns)
+    return pd.read_csv(path, low_memory=False, usecols=columns)
@@ -0,0 +1,85 @@
+"""
+One runway surface taxonomy for every source.
+
+Raw values (FAA SURFACE_TYPE_CODE, OurAirports and OSM surface, CR SURFACE)
+map to a small set of int8 codes. schemas.read_frame adds them as
+SURFACE_COLUMN for sources that declare a surface column, so layers filter
+with integer comparisons and agree on what e.g. "grass" means:
+
+    runways[is_unpaved(runways[SURFACE_COLUMN])]
+"""
+
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+UNKNOWN, PAVED, GRAVEL, TURF, DIRT, SAND, WATER = range(7)
+NAMES = ('unknown', 'paved', 'gravel', 'turf', 'dirt', 'sand', 'water')
+SURFACE_COLUMN = 'surface_code'
+
+# normalized raw values per class. A value is looked up whole first, then by its
+# first word, so TURF-GRVL is turf, ASPH-G is paved and Lastre compactado is gravel
+TAXONOMY = {
+    PAVED: [
+        'asph', 'asp', 'asphalt', 'asphaltic concrete', 'asfalto', 'conc', 'con', 'concrete', 'concreto', 'paved',
+        'sealed', 'bit', 'bitumen', 'bituminous', 'tarmac', 'macadam', 'pem', 'pfc', 'mats', 'psp', 'trtd',
+        'treated', 'tratamiento', 'oil', 'roof', 'rooftop', 'deck', 'wood', 'met', 'metal', 'steel', 'alum',
+        'aluminum', 'brick', 'paving stones', 'sett', 'cobblestone', 'grooved asphalt', 'asphalt grooved',
+        'concrete plates', 'concrete lanes', 'concrete slabs', 'hard', 'hardcore', 'mac', 'per', 'pierced',
+        # treated gravel is sealed, FAA groups it with the hard surfaces
+        'grvl trtd', 'gravel trtd',
+    ],
+    GRAVEL: [
+        'grvl', 'gvl', 'gravel', 'grava', 'fine gravel', 'find gravel', 'compacted', 'lastre', 'pebblestone',
+        'crushed rock', 'caliche', 'coral', 'cor', 'picarra', 'cascalho', 'murram', 'murrum', 'grv',
+    ],
+    TURF: [
+        'turf', 'grass', 'grs', 'gre', 'sod', 'zacate', 'grama', 'cesped', 'pasto', 'grass paver',
+        'artificial turf', 'grassed',
+    ],
+    DIRT: [
+        'dirt', 'earth', 'ground', 'unpaved', 'mud', 'clay', 'cla', 'silt', 'tierra', 'ter', 'soil', 'laterite',
+        'trtd dirt',
+    ],
+    SAND: ['sand', 'san', 'arena'],
+    WATER: ['water', 'wat', 'agua'],
+}
+LOOKUP = {value: code for code, values in TAXONOMY.items() for value in values}
+
+def normalize(value):
+    """Lowercase, accent-free words of a raw value joined by single spaces."""
+    value = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode().lower()
+    return ' '.join(re.findall(r'[a-z]+', value))
+
+def code(value):
+    """The class code of one raw value."""
+    value = normalize(value)
+    if value in LOOKUP:
+        return LOOKUP[value]
+    first = value.split(' ', 1)[0]
+    return LOOKUP.get(first, UNKNOWN)
+
+def classify(values):
+    """int8 class codes of a column, classifying each distinct value once and mapping by category code."""
+    categorical = pd.Categorical(values)
+    table = np.array([code(category) for category in categorical.categories] + [UNKNOWN], dtype=np.int8)
+    # missing values have category code -1, the UNKNOWN appended last
+    return table[categorical.codes]
+
+def is_unpaved(codes):
+    """Gravel, turf, dirt or sand: the soft field surfaces."""
+    codes = np.asarray(codes)
+    return (codes >= GRAVEL) & (codes <= SAND)
+
+def mask(codes):
+    """uint8 bit 1 << code per row, for ORing the surfaces of an aerodrome's runways together."""
+    return np.left_shift(np.uint8(1), np.asarray(codes, dtype=np.uint8))
+
+def mask_names(value):
+    """Class names of one surface mask, e.g. ['paved', 'turf']."""
+    return [name for code, name in enumerate(NAMES) if value & (1 << code)]
+
+def names(codes):
+    """Class names for display, as a categorical."""
+    return pd.Categorical.from_codes(np.asarray(codes), categories=NAMES)
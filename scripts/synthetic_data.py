@@ -0,0 +1,363 @@
+"""
+Synthetic source data in the same layout and schemas as data/, for benchmarking offline.
+
+Aerodrome "sites" are drawn around regional hubs so that density looks like the real
+world (dense in the US and Europe, sparse elsewhere), and every source samples its rows
+from those sites with a small positional jitter, national sources only from the sites in
+their own region, so cross-source matching and clustering do the same amount of work they
+do on real data. At scale 1 row counts roughly match the
+current real extracts.
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# lon_min, lon_max, lat_min, lat_max, share of world sites
+REGIONS = {
+    'us': (-124.5, -67.0, 25.0, 49.0, 0.30),
+    'ca': (-140.0, -55.0, 42.0, 65.0, 0.04),
+    'mx': (-117.0, -87.0, 15.0, 32.0, 0.03),
+    'cr': (-85.9, -82.6, 8.1, 11.1, 0.005),
+    'br': (-73.0, -35.0, -33.0, 4.0, 0.08),
+    'eu': (-10.0, 30.0, 36.0, 60.0, 0.17),
+    'af': (-17.0, 50.0, -34.0, 35.0, 0.08),
+    'as': (60.0, 140.0, 5.0, 50.0, 0.16),
+    'au': (113.0, 153.0, -43.0, -11.0, 0.07),
+    'pg': (141.0, 155.0, -11.0, -2.0, 0.015),
+}
+SITES_PER_HUB = 60
+HUB_SPREAD_DEG = 0.8
+# how far the same aerodrome is placed apart by different sources
+SOURCE_JITTER_DEG = 0.002
+
+# rows per source at scale 1
+ROWS = {
+    'ourairports_airports': 80000,
+    'ourairports_runways': 46000,
+    'faa_base': 20000,
+    'faa_runways': 24000,
+    'osm_aerodrome': 50000,
+    'osm_runway': 68000,
+    'daylight_aerodrome': 50000,
+    'afac': 2100,
+    'cr': 400,
+    'raf': 2500,
+    'wikidata': 24000,
+}
+
+FAA_BASE_COLUMNS = [
+    'EFF_DATE', 'SITE_NO', 'SITE_TYPE_CODE', 'STATE_CODE', 'ARPT_ID', 'CITY', 'COUNTRY_CODE', 'REGION_CODE',
+    'ADO_CODE', 'STATE_NAME', 'COUNTY_NAME', 'COUNTY_ASSOC_STATE', 'ARPT_NAME', 'OWNERSHIP_TYPE_CODE',
+    'FACILITY_USE_CODE', 'LAT_DEG', 'LAT_MIN', 'LAT_SEC', 'LAT_HEMIS', 'LAT_DECIMAL', 'LONG_DEG', 'LONG_MIN',
+    'LONG_SEC', 'LONG_HEMIS', 'LONG_DECIMAL', 'SURVEY_METHOD_CODE', 'ELEV', 'ELEV_METHOD_CODE', 'MAG_VARN',
+    'MAG_HEMIS', 'MAG_VARN_YEAR', 'TPA', 'CHART_NAME', 'DIST_CITY_TO_AIRPORT', 'DIRECTION_CODE', 'ACREAGE',
+    'RESP_ARTCC_ID', 'COMPUTER_ID', 'ARTCC_NAME', 'FSS_ON_ARPT_FLAG', 'FSS_ID', 'FSS_NAME', 'PHONE_NO',
+    'TOLL_FREE_NO', 'ALT_FSS_ID', 'ALT_FSS_NAME', 'ALT_TOLL_FREE_NO', 'NOTAM_ID', 'NOTAM_FLAG', 'ACTIVATION_DATE',
+    'ARPT_STATUS', 'FAR_139_TYPE_CODE', 'FAR_139_CARRIER_SER_CODE', 'ARFF_CERT_TYPE_DATE', 'NASP_CODE',
+    'ASP_ANLYS_DTRM_CODE', 'CUST_FLAG', 'LNDG_RIGHTS_FLAG', 'JOINT_USE_FLAG', 'MIL_LNDG_FLAG', 'INSPECT_METHOD_CODE',
+    'INSPECTOR_CODE', 'LAST_INSPECTION', 'LAST_INFO_RESPONSE', 'FUEL_TYPES', 'AIRFRAME_REPAIR_SER_CODE',
+    'PWR_PLANT_REPAIR_SER', 'BOTTLED_OXY_TYPE', 'BULK_OXY_TYPE', 'LGT_SKED', 'BCN_LGT_SKED', 'TWR_TYPE_CODE',
+    'SEG_CIRCLE_MKR_FLAG', 'BCN_LENS_COLOR', 'LNDG_FEE_FLAG', 'MEDICAL_USE_FLAG', 'ARPT_PSN_SOURCE',
+    'POSITION_SRC_DATE', 'ARPT_ELEV_SOURCE', 'ELEVATION_SRC_DATE', 'CONTR_FUEL_AVBL', 'TRNS_STRG_BUOY_FLAG',
+    'TRNS_STRG_HGR_FLAG', 'TRNS_STRG_TIE_FLAG', 'OTHER_SERVICES', 'WIND_INDCR_FLAG', 'ICAO_ID', 'MIN_OP_NETWORK',
+    'USER_FEE_FLAG', 'CTA',
+]
+FAA_RWY_COLUMNS = [
+    'EFF_DATE', 'SITE_NO', 'SITE_TYPE_CODE', 'STATE_CODE', 'ARPT_ID', 'CITY', 'COUNTRY_CODE', 'RWY_ID', 'RWY_LEN',
+    'RWY_WIDTH', 'SURFACE_TYPE_CODE', 'COND', 'TREATMENT_CODE', 'PCN', 'PAVEMENT_TYPE_CODE',
+    'SUBGRADE_STRENGTH_CODE', 'TIRE_PRES_CODE', 'DTRM_METHOD_CODE', 'RWY_LGT_CODE', 'RWY_LEN_SOURCE',
+    'LENGTH_SOURCE_DATE', 'GROSS_WT_SW', 'GROSS_WT_DW', 'GROSS_WT_DTW', 'GROSS_WT_DDTW',
+]
+OURAIRPORTS_COLUMNS = [
+    'id', 'ident', 'type', 'name', 'latitude_deg', 'longitude_deg', 'elevation_ft', 'continent', 'iso_country',
+    'iso_region', 'municipality', 'scheduled_service', 'gps_code', 'iata_code', 'local_code', 'home_link',
+    'wikipedia_link', 'keywords',
+]
+OURAIRPORTS_RUNWAY_COLUMNS = [
+    'id', 'airport_ref', 'airport_ident', 'length_ft', 'width_ft', 'surface', 'lighted', 'closed', 'le_ident',
+    'le_latitude_deg', 'le_longitude_deg', 'le_elevation_ft', 'le_heading_degT', 'le_displaced_threshold_ft',
+    'he_ident', 'he_latitude_deg', 'he_longitude_deg', 'he_elevation_ft', 'he_heading_degT',
+    'he_displaced_threshold_ft',
+]
+AFAC_COLUMNS = [
+    'NO. DE EXPEDIENTE', 'TIPO AERÓDROMO', 'DESIGNADOR', 'NOMBRE', 'ESTADO', 'MUNICIPIO', 'TIPO DE OPERACIÓN',
+    'TIPO DE SERVICIO', 'NONBRE', 'ELEV (M)', 'SISTEMA', 'LATITUD\n°', "LATITUD '", "LATITUD ''", 'LONGITUD °',
+    "LONGITUD '", "LONGITUD ''", 'FECHA DE EXPEDICIÓN', 'DURACIÓN DEL PERMISO/  AUTORIZACIÓN',
+    'FECHA DE  VENCIMIENTO', 'MES', 'AÑO', '¿VIGENTE?', 'SITUACIÓN',
+]
+CR_COLUMNS = [
+    'AERÓDROMO', 'DESIGNADOR', 'OACI', 'LAT', 'LON', 'HEADING', 'LENGTH', 'WIDTH', 'ELE', 'SURFACE', 'AUTORIDAD',
+    'Notes', 'Contact 1 Name - first contacts name', 'Contact 1 Phone', 'Contact 1 Email',
+    'Contact 2 Name - second contacts name', 'Contact 2 Phone', 'Contact 2 Email',
+    'Contact 3 Name - third contacts name', 'Contact 3 Phone', 'Contact 3 Email', 'Remarks', 'Notes Translated',
+]
+RAF_COLUMNS = [
+    '', 'id', 'coordinates', 'visitType', 'title', 'number', 'nearestCity', 'elevation', 'longestRunway', 'networks',
+    'lastSurveyedDate', 'subscribedForUpdates', 'region', 'state', 'communicationFrequency', 'fuels', 'timeZone',
+    'timeNow', 'contact', 'notes', 'favorite', 'briefing', 'lastComment', 'moreInformationLinks', 'galleryPreview',
+    'geometry', 'note_alerts', 'note_default', 'name', 'icon_path', 'description',
+]
+OSM_RUNWAY_TAGS = ['area', 'ele', 'access', 'abandoned', 'surface', 'width', 'name', 'ref:linz:topo50_id', 'length',
+                   'source', 'ref']
+OSM_AERODROME_TAGS = [
+    'source_ref', 'alt_name', 'local_ref', 'wikipedia', 'icao', 'wikidata', 'addr:housenumber', 'name:fr',
+    'addr:state', 'name:en', 'type', 'ref', 'gnis:feature_type', 'landuse', 'ele', 'gnis:feature_id',
+    'operator:type', 'addr:postcode', 'gnis:created', 'military', 'addr:city', 'website', 'name', 'source', 'note',
+    'name:ru', 'phone', 'gnis:county_name', 'addr:street', 'operator',
+]
+WIKIDATA_COLUMNS = ['airport', 'minName', 'minEle', 'minRunway', 'minICAO', 'minIATA', 'minWebsite', 'minOSM', 'LON',
+                    'LAT']
+
+FAA_SURFACES = ['TURF', 'ASPH', 'CONC', 'WATER', 'DIRT', 'ASPH-CONC', 'GRVL', 'GRAVEL', 'TURF-DIRT', 'TURF-GRVL']
+FAA_SURFACE_P = [0.36, 0.27, 0.2, 0.04, 0.03, 0.03, 0.02, 0.02, 0.02, 0.01]
+OSM_SURFACES = ['grass', 'asphalt', 'unpaved', 'paved', 'ground', 'concrete', 'dirt', 'gravel', '']
+OSM_SURFACE_P = [0.26, 0.17, 0.08, 0.05, 0.04, 0.03, 0.03, 0.03, 0.31]
+OURAIRPORTS_SURFACES = ['ASP', 'TURF', 'CON', 'CONC', 'GRS', 'ASPH', 'GRE', 'Turf', 'TURF-G', 'GVL']
+OURAIRPORTS_TYPES = ['small_airport', 'heliport', 'closed', 'medium_airport', 'seaplane_base', 'large_airport',
+                     'balloonport']
+OURAIRPORTS_TYPE_P = [0.55, 0.25, 0.1, 0.06, 0.02, 0.015, 0.005]
+FUEL_TYPES = ['', '100LL', '100LL,A', 'A', '100LL,MOGAS', 'UL94', '100LL,UL94']
+FUEL_P = [0.6, 0.2, 0.1, 0.04, 0.03, 0.02, 0.01]
+US_STATES = ['AK', 'AZ', 'CA', 'CO', 'ID', 'MT', 'NM', 'NV', 'OR', 'TX', 'UT', 'WA', 'WY', 'FL', 'NY', 'OH', 'PA']
+
+def make_sites(n, regions, rng):
+    """n aerodrome locations clustered around hubs, spread over regions by their share."""
+    names = list(regions)
+    shares = np.array([REGIONS[name][4] for name in names])
+    region = rng.choice(len(names), size=n, p=shares / shares.sum())
+    lon = np.empty(n)
+    lat = np.empty(n)
+    for i, name in enumerate(names):
+        mask = region == i
+        count = int(mask.sum())
+        if not count:
+            continue
+        lon_min, lon_max, lat_min, lat_max, _ = REGIONS[name]
+        hubs = max(1, count // SITES_PER_HUB)
+        hub_lon = rng.uniform(lon_min, lon_max, hubs)
+        hub_lat = rng.uniform(lat_min, lat_max, hubs)
+        hub = rng.integers(0, hubs, count)
+        lon[mask] = np.clip(hub_lon[hub] + rng.normal(0, HUB_SPREAD_DEG, count), lon_min, lon_max)
+        lat[mask] = np.clip(hub_lat[hub] + rng.normal(0, HUB_SPREAD_DEG, count), lat_min, lat_max)
+    return pd.DataFrame({'region': np.array(names, dtype=object)[region], 'lon': lon, 'lat': lat})
+
+def sample(sites, n, rng):
+    """n rows of sites, with a per-source jitter. Reuses sites when a source has more rows than sites."""
+    idx = rng.choice(len(sites), size=n, replace=n > len(sites))
+    out = sites.iloc[idx].reset_index(drop=True)
+    out['lon'] = out['lon'] + rng.normal(0, SOURCE_JITTER_DEG, n)
+    out['lat'] = out['lat'] + rng.normal(0, SOURCE_JITTER_DEG, n)
+    return out
+
+def regional(sites, regions):
+    """The sites in regions, for sources that only cover part of the world."""
+    return sites[sites['region'].isin(regions)]
+
+def idents(prefix, n):
+    return [f"{prefix}{i:05d}" for i in range(n)]
+
+def dms(values):
+    values = np.abs(values)
+    deg = np.floor(values)
+    minutes = np.floor((values - deg) * 60)
+    seconds = ((values - deg) * 60 - minutes) * 60
+    return deg.astype(int), minutes.astype(int), np.round(seconds, 2)
+
+def write(df, root, path, **kwargs):
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    df.to_csv(full_path, index=False, **kwargs)
+    return full_path
+
+def faa(root, sites, scale, rng):
+    n = ROWS['faa_base'] * scale
+    sites = sample(regional(sites, ['us']), n, rng)
+    site_no = [f"{i:05d}.{j}" for i, j in zip(range(n), rng.integers(0, 10, n))]
+    arpt_id = idents('F', n)
+    lat_deg, lat_min, lat_sec = dms(sites['lat'].to_numpy())
+    lon_deg, lon_min, lon_sec = dms(sites['lon'].to_numpy())
+    base = pd.DataFrame({column: 'X' for column in FAA_BASE_COLUMNS}, index=range(n))
+    base['EFF_DATE'] = '2024/10/03'
+    base['SITE_NO'] = site_no
+    base['SITE_TYPE_CODE'] = rng.choice(['A', 'H', 'C', 'G', 'U', 'B'], n, p=[0.7, 0.25, 0.02, 0.01, 0.01, 0.01])
+    base['STATE_CODE'] = rng.choice(US_STATES, n)
+    base['ARPT_ID'] = arpt_id
+    base['ARPT_NAME'] = [f"SYNTHETIC FIELD {i}" for i in range(n)]
+    base['LAT_DEG'], base['LAT_MIN'], base['LAT_SEC'], base['LAT_HEMIS'] = lat_deg, lat_min, lat_sec, 'N'
+    base['LAT_DECIMAL'] = sites['lat'].round(8)
+    base['LONG_DEG'], base['LONG_MIN'], base['LONG_SEC'], base['LONG_HEMIS'] = lon_deg, lon_min, lon_sec, 'W'
+    base['LONG_DECIMAL'] = sites['lon'].round(8)
+    base['ELEV'] = rng.integers(0, 9000, n)
+    base['FUEL_TYPES'] = rng.choice(FUEL_TYPES, n, p=FUEL_P)
+    write(base, root, 'data/us/faa/nasr/APT_BASE.csv')
+
+    m = ROWS['faa_runways'] * scale
+    owner = rng.integers(0, n, m)
+    rwy = pd.DataFrame({column: '' for column in FAA_RWY_COLUMNS}, index=range(m))
+    rwy['EFF_DATE'] = '2024/10/03'
+    rwy['SITE_NO'] = np.array(site_no, dtype=object)[owner]
+    rwy['SITE_TYPE_CODE'] = base['SITE_TYPE_CODE'].to_numpy()[owner]
+    rwy['STATE_CODE'] = base['STATE_CODE'].to_numpy()[owner]
+    rwy['ARPT_ID'] = np.array(arpt_id, dtype=object)[owner]
+    rwy['COUNTRY_CODE'] = 'US'
+    rwy['RWY_ID'] = rng.choice(['17/35', '09/27', '04/22', 'H1', '13/31'], m)
+    rwy['RWY_LEN'] = rng.integers(800, 9000, m)
+    rwy['RWY_WIDTH'] = rng.integers(20, 150, m)
+    rwy['SURFACE_TYPE_CODE'] = rng.choice(FAA_SURFACES, m, p=FAA_SURFACE_P)
+    write(rwy, root, 'data/us/faa/nasr/APT_RWY.csv')
+
+def ourairports(root, sites, scale, rng):
+    n = ROWS['ourairports_airports'] * scale
+    rows = sample(sites, n, rng)
+    airports = pd.DataFrame({column: '' for column in OURAIRPORTS_COLUMNS}, index=range(n))
+    airports['id'] = np.arange(1, n + 1)
+    airports['ident'] = idents('OA', n)
+    airports['type'] = rng.choice(OURAIRPORTS_TYPES, n, p=OURAIRPORTS_TYPE_P)
+    airports['name'] = [f"Synthetic Airport {i}" for i in range(n)]
+    airports['latitude_deg'] = rows['lat'].round(6)
+    airports['longitude_deg'] = rows['lon'].round(6)
+    airports['elevation_ft'] = rng.integers(0, 9000, n)
+    airports['iso_country'] = rows['region'].str.upper()
+    airports['iso_region'] = airports['iso_country'] + '-XX'
+    airports['scheduled_service'] = 'no'
+    write(airports, root, 'data/world/ourairports/airports.csv')
+
+    m = ROWS['ourairports_runways'] * scale
+    owner = rng.integers(0, n, m)
+    heading = rng.uniform(0, 180, m)
+    length_ft = rng.integers(800, 9000, m)
+    half = length_ft / 2 / 364000  # ~feet per degree of latitude
+    has_ends = rng.random(m) < 0.3
+    lat = airports['latitude_deg'].to_numpy()[owner]
+    lon = airports['longitude_deg'].to_numpy()[owner]
+    d_lat = half * np.cos(np.radians(heading))
+    d_lon = half * np.sin(np.radians(heading)) / np.cos(np.radians(lat))
+    runways = pd.DataFrame({column: np.nan for column in OURAIRPORTS_RUNWAY_COLUMNS}, index=range(m))
+    runways['id'] = np.arange(1, m + 1)
+    runways['airport_ref'] = owner + 1
+    runways['airport_ident'] = airports['ident'].to_numpy()[owner]
+    runways['length_ft'] = length_ft
+    runways['width_ft'] = rng.integers(20, 150, m)
+    runways['surface'] = rng.choice(OURAIRPORTS_SURFACES, m)
+    runways['lighted'] = rng.integers(0, 2, m)
+    runways['closed'] = 0
+    runways['le_ident'] = '09'
+    runways['he_ident'] = '27'
+    runways.loc[has_ends, 'le_latitude_deg'] = (lat - d_lat)[has_ends]
+    runways.loc[has_ends, 'le_longitude_deg'] = (lon - d_lon)[has_ends]
+    runways.loc[has_ends, 'he_latitude_deg'] = (lat + d_lat)[has_ends]
+    runways.loc[has_ends, 'he_longitude_deg'] = (lon + d_lon)[has_ends]
+    runways.loc[has_ends, 'le_heading_degT'] = heading[has_ends].round(1)
+    runways.loc[has_ends, 'he_heading_degT'] = ((heading + 180) % 360)[has_ends].round(1)
+    write(runways, root, 'data/world/ourairports/runways.csv')
+
+def osm(root, sites, scale, rng):
+    n = ROWS['osm_aerodrome'] * scale
+    rows = sample(sites, n, rng)
+    aerodrome = pd.DataFrame({column: '' for column in ['id', 'latitude', 'longitude'] + OSM_AERODROME_TAGS},
+                             index=range(n))
+    aerodrome['id'] = rng.permutation(n) + 10 ** 9
+    aerodrome['latitude'] = rows['lat'].round(7)
+    aerodrome['longitude'] = rows['lon'].round(7)
+    aerodrome['name'] = np.where(rng.random(n) < 0.7, [f"Synthetic Aerodrome {i}" for i in range(n)], '')
+    aerodrome['icao'] = np.where(rng.random(n) < 0.1, idents('I', n), '')
+    write(aerodrome, root, 'data/world/osm/overpass/aerodrome.csv')
+
+    daylight = aerodrome.sample(n=min(n, ROWS['daylight_aerodrome'] * scale), random_state=1)
+    daylight.columns = [column.replace(':', '_') for column in daylight.columns]
+    write(daylight, root, 'data/world/osm/daylight/aerodrome.csv')
+
+    m = ROWS['osm_runway'] * scale
+    rows = sample(sites, m, rng)
+    runway = pd.DataFrame({column: '' for column in ['id', 'latitude', 'longitude'] + OSM_RUNWAY_TAGS}, index=range(m))
+    runway['id'] = rng.permutation(m) + 2 * 10 ** 9
+    runway['latitude'] = rows['lat'].round(7)
+    runway['longitude'] = rows['lon'].round(7)
+    runway['surface'] = rng.choice(OSM_SURFACES, m, p=OSM_SURFACE_P)
+    runway['ref'] = np.where(rng.random(m) < 0.45, '09/27', '')
+    runway['length'] = np.where(rng.random(m) < 0.3, rng.integers(200, 3000, m).astype(str), '')
+    write(runway, root, 'data/world/osm/overpass/runway.csv')
+
+def afac(root, sites, scale, rng):
+    n = ROWS['afac'] * scale
+    rows = sample(regional(sites, ['mx']), n, rng)
+    lat_deg, lat_min, lat_sec = dms(rows['lat'].to_numpy())
+    lon_deg, lon_min, lon_sec = dms(rows['lon'].to_numpy())
+    df = pd.DataFrame({column: '' for column in AFAC_COLUMNS}, index=range(n))
+    df['NO. DE EXPEDIENTE'] = [f"{p} {i:03d}" for p, i in zip(rng.choice(['SP', 'HP', 'SA'], n, p=[0.6, 0.3, 0.1]), range(n))]
+    df['TIPO AERÓDROMO'] = np.where(df['NO. DE EXPEDIENTE'].str[:2] == 'HP', 'HELIPUERTO', 'AERÓDROMO')
+    df['NOMBRE'] = [f"AERODROMO SINTETICO {i}" for i in range(n)]
+    df['SISTEMA'] = 'WGS 84'
+    df['LATITUD\n°'], df["LATITUD '"], df["LATITUD ''"] = lat_deg, lat_min, lat_sec
+    df['LONGITUD °'], df["LONGITUD '"], df["LONGITUD ''"] = lon_deg, lon_min, lon_sec
+    write(df, root, 'data/mx/afac/aerodromos.csv', encoding='utf-8-sig')
+
+def cr(root, sites, scale, rng):
+    n = ROWS['cr'] * scale
+    rows = sample(regional(sites, ['cr']), n, rng)
+    lat_deg, lat_min, lat_sec = dms(rows['lat'].to_numpy())
+    lon_deg, lon_min, lon_sec = dms(rows['lon'].to_numpy())
+    df = pd.DataFrame({column: '' for column in CR_COLUMNS}, index=range(n))
+    df['AERÓDROMO'] = [f"Aeródromo {i}" for i in range(n)]
+    df['DESIGNADOR'] = idents('MR', n)
+    df['LAT'] = [f"{d:02d}{m:02d}{int(s):02d} N" for d, m, s in zip(lat_deg, lat_min, lat_sec)]
+    df['LON'] = [f"{d:03d}{m:02d}{int(s):02d} W" for d, m, s in zip(lon_deg, lon_min, lon_sec)]
+    # most of the real file has no coordinates
+    df.loc[rng.random(n) < 0.65, ['LAT', 'LON']] = ''
+    df['SURFACE'] = rng.choice(['Zacate', 'Asfalto', 'Grava', 'Concreto', 'Lastre', 'Lastre compactado'], n)
+    write(df, root, 'data/cr/ad-locales-v15.csv', encoding='utf-8-sig')
+
+def raf(root, sites, scale, rng):
+    n = ROWS['raf'] * scale
+    rows = sample(regional(sites, ['us']), n, rng)
+    df = pd.DataFrame({column: '' for column in RAF_COLUMNS}, index=range(n))
+    df[''] = np.arange(n)
+    df['id'] = [f"{i:08x}-0000-4000-8000-000000000000" for i in range(n)]
+    df['coordinates'] = [f"{{'lat': {{'decimal': {lat:.6f}}}, 'lng': {{'decimal': {lon:.6f}}}}}"
+                         for lat, lon in zip(rows['lat'], rows['lon'])]
+    df['visitType'] = rng.choice(['public_or_permissive', 'conditional'], n)
+    df['title'] = df['name'] = [f"RAF Strip {i}" for i in range(n)]
+    df['number'] = idents('R', n)
+    df['elevation'] = rng.integers(0, 9000, n)
+    df['longestRunway'] = rng.integers(800, 6000, n)
+    df['fuels'] = rng.choice(["[]", "['100LL']", "['100LL', 'MOGAS']", "['JET-A']", "['UL94']"], n,
+                             p=[0.7, 0.15, 0.05, 0.05, 0.05])
+    df['geometry'] = [f"POINT ({lon} {lat})" for lat, lon in zip(rows['lat'], rows['lon'])]
+    df['icon_path'] = 'icons/raf-' + df['visitType'] + '.png'
+    df['description'] = '<table></table>'
+    write(df, root, 'data/us/raf/airfields.csv')
+
+def wikidata(root, sites, scale, rng):
+    n = ROWS['wikidata'] * scale
+    rows = sample(sites, n, rng)
+    df = pd.DataFrame({column: '' for column in WIKIDATA_COLUMNS}, index=range(n))
+    df['airport'] = [f"http://www.wikidata.org/entity/Q{i}" for i in rng.permutation(n) + 1000]
+    df['minName'] = [f"Synthetic Airport {i}" for i in range(n)]
+    df['LON'] = rows['lon'].round(6)
+    df['LAT'] = rows['lat'].round(6)
+    write(df, root, 'data/world/wikidata/airports.csv')
+
+def generate(root, scale=1, seed=0):
+    """Write a full synthetic data/ tree under root at the given multiple of world scale."""
+    rng = np.random.default_rng(seed)
+    world = make_sites(ROWS['ourairports_airports'] * scale, list(REGIONS), rng)
+    faa(root, world, scale, rng)
+    ourairports(root, world, scale, rng)
+    osm(root, world, scale, rng)
+    afac(root, world, scale, rng)
+    cr(root, world, scale, rng)
+    raf(root, world, scale, rng)
+    wikidata(root, world, scale, rng)
+    os.makedirs(os.path.join(root, 'data', 'content-pack', 'barbless-maps', 'layers'), exist_ok=True)
+    return root
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic data/ tree for benchmarking.")
+    parser.add_argument('root', type=str, help="Directory to write data/ into")
+    parser.add_argument('--scale', type=int, default=1, help="Multiple of world scale, e.g. 1, 10 or 100")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generate(args.root, args.scale, args.seed)
+    print(f"Synthetic data at {args.scale}x written to {args.root}")
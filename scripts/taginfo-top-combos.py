@@ -11,8 +11,9 @@ for tag in tags.keys():
     response = requests.get(tags[tag])
     data = response.json()
 
-    # Extracting the 'other_key' from each item in the 'data' list
-    other_keys = set([item["other_key"] for item in data["data"]])
+    # Extracting the 'other_key' from each item in the 'data' list, most used first so the order is stable
+    items = sorted(data["data"], key=lambda item: (-item["to_count"], item["other_key"]))
+    other_keys = list(dict.fromkeys(item["other_key"] for item in items))
 
     # Save the 'other_keys' to a text file, one per line
     with open(f"data/world/osm/top-{tag}.txt", "w") as file:
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Plan trips over the precomputed aerodrome reachability graph.
+
+Usage:
+    python scripts/combine.py
+    python scripts/trip-plan.py build [--max-range-nm 300]
+    python scripts/trip-plan.py route KSQL KDEN --max-leg-nm 150 --fuel 100LL
+    python scripts/trip-plan.py route KSQL 0CA1 --max-leg-nm 90 --surface turf,gravel --fewest-stops
+
+Aerodromes are given by ICAO, ident, IATA or aerodrome_id. The graph is built
+from combine.py's snapshot by reachability.py and has to be rebuilt when the
+snapshot changes or for legs longer than its range.
+"""
+
+import argparse
+import sys
+import pandas as pd
+from combine import SNAPSHOT_PATH
+import reachability
+
+COLUMNS = ['aerodrome_id', 'name', 'icao', 'iata', 'ident']
+
+def resolve(snapshot, code):
+    """aerodrome_id of an ICAO, ident, IATA or aerodrome_id code."""
+    for column in ['icao', 'ident', 'iata']:
+        found = snapshot.index[snapshot[column].str.upper() == code.upper()]
+        if len(found):
+            return found[0]
+    if code.isdigit() and int(code) in snapshot.index:
+        return int(code)
+    raise SystemExit(f"No aerodrome {code} in the snapshot")
+
+def print_route(snapshot, aerodrome_ids, legs):
+    total = 0
+    print(f"{'':>4}{'code':<10}{'leg nm':>8}{'total nm':>10}  name")
+    for stop, aerodrome_id in enumerate(aerodrome_ids):
+        row = snapshot.loc[aerodrome_id]
+        code = next((row[column] for column in ['icao', 'ident', 'iata'] if isinstance(row[column], str)),
+                    str(aerodrome_id))
+        leg = legs[stop - 1] if stop else 0
+        total += leg
+        print(f"{stop:>4}{code:<10}{leg:>8.1f}{total:>10.1f}  {row['name'] if isinstance(row['name'], str) else ''}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Range-limited trip planning between aerodromes.')
+    parser.add_argument('--graph-dir', default=reachability.GRAPH_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='Build the reachability graph from the snapshot')
+    build.add_argument('--snapshot', default=SNAPSHOT_PATH)
+    build.add_argument('--max-range-nm', type=float, default=reachability.MAX_RANGE_NM,
+                       help=f'Longest edge, and so longest leg a route can have (default {reachability.MAX_RANGE_NM})')
+    plan = commands.add_parser('route', help='Shortest route between two aerodromes')
+    plan.add_argument('source')
+    plan.add_argument('target')
+    plan.add_argument('--max-leg-nm', type=float, help='Longest leg, up to the range the graph was built with')
+    plan.add_argument('--fuel', default='', help='Stop only where one of these comma separated fuels is sold')
+    plan.add_argument('--surface', default='', help='Stop only with one of these comma separated runway surfaces')
+    plan.add_argument('--min-runway-ft', type=float, help='Stop only with a runway at least this long')
+    plan.add_argument('--fewest-stops', action='store_true', help='Fewest legs instead of the shortest distance')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        meta = reachability.build(args.snapshot, args.graph_dir, max_range_nm=args.max_range_nm)
+        print(f"{meta['nodes']} aerodromes, {meta['edges']} edges up to {meta['max_range_nm']:g} nm "
+              f"in {meta['build_seconds']}s")
+        sys.exit(0)
+
+    graph = reachability.Graph(args.graph_dir)
+    if graph.stale():
+        print(f"Warning: {graph.meta['snapshot']} changed since the graph was built, "
+              f"run trip-plan.py build", file=sys.stderr)
+    snapshot = pd.read_parquet(graph.meta['snapshot'], columns=COLUMNS).set_index('aerodrome_id')
+    fuel = [name for name in args.fuel.upper().split(',') if name]
+    surface = [name for name in args.surface.lower().split(',') if name]
+    try:
+        found = reachability.route(graph, resolve(snapshot, args.source), resolve(snapshot, args.target),
+                                   max_leg_nm=args.max_leg_nm, fuel=fuel, surface=surface,
+                                   min_runway_ft=args.min_runway_ft, fewest_stops=args.fewest_stops)
+    except (KeyError, ValueError) as e:
+        sys.exit(str(e))
+    if found is None:
+        sys.exit(f"No route from {args.source} to {args.target} with these limits")
+    print_route(snapshot, *found)
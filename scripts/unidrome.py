@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Run pipeline stages in one process, so each source is parsed once and every
+library is imported once.
+
+Usage:
+    python scripts/unidrome.py build
+    python scripts/unidrome.py missing-from-ourairports gas-grass combine
+    python scripts/unidrome.py missing-from-ourairports filter-missing-airports --bounds region.geojson --output missing.geojson
+
+Stages run in the order given and share one Datasets registry, e.g. gas-grass,
+google-places and combine all get the same parsed APT_BASE.csv, and filter/verify
+take the missing airports straight from missing-from-ourairports. The
+scripts/<stage>.py wrappers still run one stage on its own.
+"""
+
+import argparse
+import time
+import instrument
+from datasets import Datasets
+
+# stage modules are imported on first use so unselected stages cost nothing
+def run_missing_from_ourairports(datasets, args):
+    import missing_from_ourairports
+    missing_from_ourairports.main(datasets, exclude_unable_to_see=args.exclude_unable_to_see,
+                                  changed_only=args.changed_only, countries=args.country, workers=args.workers)
+
+def run_filter_missing_airports(datasets, args):
+    import filter_missing_airports
+    filter_missing_airports.main(datasets, args.bounds, args.output)
+
+def run_verify_missing_airports(datasets, args):
+    import verify_missing_airports
+    verify_missing_airports.main(datasets, args.bounds)
+
+def run_gas_grass(datasets, args):
+    import gas_grass
+    gas_grass.main(datasets, layer_format=args.layer_format)
+
+def run_google_places(datasets, args):
+    import google_places
+    google_places.main(datasets)
+
+def run_combine(datasets, args):
+    import combine
+    combine.main(datasets, full=args.full)
+
+def run_reachability(datasets, args):
+    import reachability
+    from combine import SNAPSHOT_PATH
+    reachability.build(SNAPSHOT_PATH, max_range_nm=args.max_range_nm)
+
+STAGES = {
+    'missing-from-ourairports': run_missing_from_ourairports,
+    'filter-missing-airports': run_filter_missing_airports,
+    'verify-missing-airports': run_verify_missing_airports,
+    'gas-grass': run_gas_grass,
+    'google-places': run_google_places,
+    'combine': run_combine,
+    'reachability': run_reachability,
+}
+# everything that runs unattended without extra arguments or API keys
+BUILD = ['missing-from-ourairports', 'gas-grass', 'combine']
+REQUIRED_ARGS = {
+    'filter-missing-airports': ['bounds', 'output'],
+    'verify-missing-airports': ['bounds'],
+}
+
+def run(stages, args, datasets=None):
+    datasets = datasets or Datasets()
+    for name in stages:
+        start = time.perf_counter()
+        with instrument.stage(name):
+            STAGES[name](datasets, args)
+        print(f"{name} finished in {time.perf_counter() - start:.1f}s")
+    return datasets
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run unidrome pipeline stages in one process.')
+    parser.add_argument('stages', nargs='+', choices=list(STAGES) + ['build'],
+                        help="Stages to run in order, 'build' for " + ', '.join(BUILD))
+    parser.add_argument('--exclude-unable-to-see', action='store_true',
+                        help='missing-from-ourairports: exclude airports listed in unable-to-be-seen-in-osm-imagery.csv')
+    parser.add_argument('--changed-only', action='store_true',
+                        help='missing-from-ourairports: only re-evaluate airports in data/world/ourairports/changes.csv')
+    parser.add_argument('--country', type=lambda value: [code.strip() for code in value.split(',') if code.strip()],
+                        help='missing-from-ourairports: only re-evaluate these comma separated iso_country codes')
+    parser.add_argument('--workers', type=int, help='missing-from-ourairports: processes matching countries')
+    parser.add_argument('--bounds', type=str, help='filter/verify-missing-airports: bounding region GeoJSON')
+    parser.add_argument('--output', type=str, help='filter-missing-airports: output GeoJSON')
+    parser.add_argument('--layer-format', choices=['compact', 'fgb', 'geojson'], default='compact',
+                        help='gas-grass: compact GeoJSON, FlatGeobuf with a spatial index, or GDAL GeoJSON')
+    parser.add_argument('--full', action='store_true', help='combine: re-cluster every row, not only around changes')
+    parser.add_argument('--max-range-nm', type=float, default=300,
+                        help='reachability: longest edge of the trip planning graph (default 300)')
+    args = parser.parse_args()
+
+    stages = [stage for name in args.stages for stage in (BUILD if name == 'build' else [name])]
+    for name in stages:
+        missing = [f"--{arg}" for arg in REQUIRED_ARGS.get(name, []) if getattr(args, arg) is None]
+        if missing:
+            parser.error(f"{name} needs {' and '.join(missing)}")
+    run(stages, args)
@@ -0,0 +1,131 @@
+"""
+Interactive script to verify missing airports within a bounding region.
+
+Run with scripts/verify-missing-airports.py or as a unidrome stage.
+
+The script will:
+- Load missing airports from 'data/world/osm/overpass/missing_from_ourairports.csv',
+  or from missing-from-ourairports when it ran earlier in the same unidrome run.
+- Filter them by the provided bounding region.
+- Exclude airports already listed in 'data/world/ourairports/unable-to-be-seen-in-osm-imagery.csv'.
+- Iterate through each airport, opening its OSM editor link in a browser.
+- Prompt the user to confirm if there is a missing airport (default 'n').
+- Record any airports unable to be seen in imagery to 'unable-to-be-seen-in-osm-imagery.csv'.
+"""
+
+import sys
+import os
+import pandas as pd
+import geopandas as gpd
+import webbrowser
+from datasets import MISSING_CSV
+
+def main(datasets, bounding_geojson_path):
+    # Paths to data files
+    missing_airports_csv = MISSING_CSV
+    unable_to_see_csv = 'data/world/ourairports/unable-to-be-seen-in-osm-imagery.csv'
+
+    # Step 1: Load the Missing Airports Data
+    # ---------------------------------------
+    try:
+        missing_airports_gdf = datasets.missing_airports()
+    except FileNotFoundError:
+        print(f"Error: Missing airports CSV file '{missing_airports_csv}' not found.")
+        sys.exit(1)
+    except KeyError:
+        print("Error: CSV file does not contain 'longitude_deg' and 'latitude_deg' columns.")
+        sys.exit(1)
+
+    if missing_airports_gdf.empty:
+        print("Error: Missing airports CSV file is empty.")
+        sys.exit(1)
+
+    # Step 2: Load the Bounding Region GeoJSON
+    # ----------------------------------------
+    try:
+        bounding_region_gdf = gpd.read_file(bounding_geojson_path)
+    except FileNotFoundError:
+        print(f"Error: Bounding region GeoJSON file '{bounding_geojson_path}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading GeoJSON file: {e}")
+        sys.exit(1)
+
+    if bounding_region_gdf.empty:
+        print("Error: Bounding region GeoJSON file is empty.")
+        sys.exit(1)
+
+    # Ensure both GeoDataFrames are in the same CRS
+    if bounding_region_gdf.crs != missing_airports_gdf.crs:
+        print("CRS mismatch. Reprojecting bounding region to match missing airports CRS.")
+        bounding_region_gdf = bounding_region_gdf.to_crs(missing_airports_gdf.crs)
+
+    # Step 3: Filter Missing Airports by Bounding Region
+    # --------------------------------------------------
+    # Combine all geometries in bounding_region_gdf into a single geometry
+    bounding_union = bounding_region_gdf.unary_union
+
+    # Filter missing airports to those within the bounding region
+    missing_airports_in_region_gdf = missing_airports_gdf[
+        missing_airports_gdf.geometry.within(bounding_union)
+    ].reset_index(drop=True)
+
+    if missing_airports_in_region_gdf.empty:
+        print("No missing airports found within the specified bounding region.")
+        return
+    else:
+        print(f"Found {len(missing_airports_in_region_gdf)} missing airports within the region.")
+
+    # Step 4: Load Existing Unable-to-See Airports (if any)
+    # -----------------------------------------------------
+    if os.path.exists(unable_to_see_csv):
+        unable_to_see_df = pd.read_csv(unable_to_see_csv)
+        # Ensure that 'id' column exists for merging
+        if 'id' not in unable_to_see_df.columns:
+            print(f"Error: '{unable_to_see_csv}' does not contain 'id' column.")
+            sys.exit(1)
+    else:
+        unable_to_see_df = pd.DataFrame(columns=missing_airports_gdf.columns)
+
+    # Step 5: Exclude Already Reviewed Airports
+    # -----------------------------------------
+    # Exclude airports that are already in unable_to_see_df
+    if not unable_to_see_df.empty:
+        missing_airports_in_region_gdf = missing_airports_in_region_gdf[
+            ~missing_airports_in_region_gdf['id'].isin(unable_to_see_df['id'])
+        ].reset_index(drop=True)
+
+        print(f"After excluding already reviewed airports, {len(missing_airports_in_region_gdf)} remain to be reviewed.")
+
+    if missing_airports_in_region_gdf.empty:
+        print("No new airports to review in the specified bounding region.")
+        return
+
+    # Step 6: Iterate Through Missing Airports
+    # ----------------------------------------
+    for index, row in missing_airports_in_region_gdf.iterrows():
+        print(f"\nProcessing airport {index + 1} of {len(missing_airports_in_region_gdf)}")
+        print(f"Name: {row.get('name', 'Unknown')}")
+        print(f"IATA Code: {row.get('iata_code', 'N/A')}")
+        print(f"ICAO Code: {row.get('ident', 'N/A')}")
+        print(f"Location: ({row['latitude_deg']}, {row['longitude_deg']})")
+        print(f"OSM Editor Link: {row['osm_editor_link']}")
+
+        # Open the OSM editor link in a web browser
+        webbrowser.open(row['osm_editor_link'], new=2)  # new=2 opens in a new tab, if possible
+
+        # Prompt the user for input
+        user_input = input("Is there a missing airport here? [y/N]: ").strip().lower()
+        if user_input == 'y':
+            print("Marked as missing airport.")
+            # Do nothing, as it's already considered missing
+        else:
+            print("Marked as unable to be seen in imagery.")
+            # Add to unable_to_see_df using pd.concat
+            unable_to_see_df = pd.concat([unable_to_see_df, pd.DataFrame([row])], ignore_index=True)
+
+            # Save the unable_to_see_df after each entry
+            unable_to_see_df.to_csv(unable_to_see_csv, index=False)
+
+    print("\nVerification complete.")
+    print(f"Unable to see airports saved to '{unable_to_see_csv}'.")
@@ -1,14 +1,43 @@
 import requests
 import os
 import csv
+import shutil
+import time
+import random
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 class Wikidata:
     QUERY_ENDPOINT = "https://query.wikidata.org/sparql"
+    DATA_PATH = os.path.join('data', 'world', 'wikidata')
+    # the public endpoint allows 5 concurrent queries per client
+    MAX_WORKERS = 4
+    MAX_RETRIES = 5
+    BACKOFF_SECONDS = 2
+    TIMEOUT_SECONDS = 90
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    # a response that breaks off while it streams is read again from the start
+    STREAM_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+    # stands in for airports without a country (P17) statement
+    NO_COUNTRY = "none"
+    HEADERS = {
+        "User-Agent": "unidrome/1.0 (https://github.com/barblessngo/unidrome)",
+        "Accept": "text/csv"
+    }
+    COUNTRIES_QUERY = """
+    SELECT DISTINCT ?country
+    WHERE {
+      ?airport wdt:P31 wd:Q1248784;
+               wdt:P17 ?country.
+    }
+    """
     QUERY = """
     SELECT ?airport (MIN(?name) as ?minName) (MIN(?ele) AS ?minEle) (MIN(?runway) AS ?minRunway) (MIN(?icao) AS ?minICAO) (MIN(?iata) AS ?minIATA) (MIN(?website) AS ?minWebsite) (MIN(?coord) AS ?minCoord) (MIN(?osm) AS ?minOSM)
     WHERE {
       ?airport wdt:P31 wd:Q1248784;  # Instances of airports
                rdfs:label ?name.      # Airport name
+      %(partition)s
 
       OPTIONAL { ?airport wdt:P2044 ?ele. }             # Elevation
       OPTIONAL { ?airport wdt:P529 ?runway. }           # Runway
@@ -22,50 +51,168 @@ class Wikidata:
       FILTER(STRSTARTS(?wkt_string, "Point("))          # Check if ?coord starts with "Point("
     }
     GROUP BY ?airport
-    ORDER BY ?airport 
+    ORDER BY ?airport
     """
+    FIELDS = ['airport', 'minName', 'minEle', 'minRunway', 'minICAO', 'minIATA', 'minWebsite', 'minOSM', 'LON', 'LAT']
+
+    def __init__(self, endpoint=QUERY_ENDPOINT, data_path=DATA_PATH, max_workers=MAX_WORKERS):
+        self.endpoint = endpoint
+        self.data_path = data_path
+        self.max_workers = max_workers
+
+    def partition_dir(self):
+        return os.path.join(self.data_path, 'partitions')
+
+    def partition_path(self, partition):
+        return os.path.join(self.partition_dir(), f"{partition}.csv")
 
     @staticmethod
-    def fetch_data():
-        headers = {
-            "User-Agent": "Mozilla/5.0",
-            "Accept": "application/sparql-results+json"
-        }
-        params = {
-            "query": Wikidata.QUERY,
-            "format": "json"
-        }
+    def partition_clause(partition):
+        if partition == Wikidata.NO_COUNTRY:
+            return "FILTER NOT EXISTS { ?airport wdt:P17 ?anyCountry. }"
+        return f"?airport wdt:P17 wd:{partition}."
+
+    def request(self, query):
+        """Open a streaming query response, retrying timeouts, 429s and 5xx with exponential backoff."""
+        for attempt in range(self.MAX_RETRIES):
+            delay = self.BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, 1)
+            try:
+                response = requests.get(self.endpoint, headers=self.HEADERS, params={"query": query},
+                                        stream=True, timeout=self.TIMEOUT_SECONDS)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f"Error fetching data: {e}, retrying in {delay:.0f}s")
+            else:
+                if response.ok:
+                    response.encoding = 'utf-8'
+                    return response
+                if response.status_code not in self.RETRY_STATUSES:
+                    response.raise_for_status()  # Raises an HTTPError for bad responses
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = int(retry_after)
+                response.close()
+                print(f"Endpoint returned {response.status_code}, retrying in {delay:.0f}s")
+            time.sleep(delay)
+        raise requests.RequestException(f"Gave up after {self.MAX_RETRIES} attempts")
+
+    def query_lines(self, query):
+        """Yield CSV result lines as they arrive."""
+        with self.request(query) as response:
+            yield from response.iter_lines(decode_unicode=True)
+
+    def with_retries(self, read):
+        """Call read(), which streams a whole query, again with the same backoff when the stream breaks off."""
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                return read()
+            except self.STREAM_ERRORS as e:
+                if attempt == self.MAX_RETRIES - 1:
+                    raise
+                delay = self.BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, 1)
+                print(f"Error reading results: {e}, retrying in {delay:.0f}s")
+                time.sleep(delay)
+
+    def fetch_partitions(self):
+        """Countries (P17 QIDs) with at least one airport, plus the no-country partition."""
+        rows = self.with_retries(lambda: list(csv.DictReader(self.query_lines(self.COUNTRIES_QUERY))))
+        countries = sorted(row['country'].rsplit('/', 1)[-1] for row in rows if row.get('country'))
+        return countries + [self.NO_COUNTRY]
+
+    def fetch_partition(self, partition):
+        """Stream one partition into its checkpoint file, returning the number of rows."""
+        query = self.QUERY % {"partition": self.partition_clause(partition)}
+        path = self.partition_path(partition)
+        tmp_path = path + '.part'
+
+        def read():
+            count = 0
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as csvfile:
+                csvwriter = csv.writer(csvfile)
+                csvwriter.writerow(self.FIELDS)
+                for result in csv.DictReader(self.query_lines(query)):
+                    csvwriter.writerow(self.to_row(result))
+                    count += 1
+            return count
+
         try:
-            response = requests.get(Wikidata.QUERY_ENDPOINT, headers=headers, params=params)
-            response.raise_for_status()  # Raises an HTTPError for bad responses
-            return response.json()
-        except requests.RequestException as e:
-            print(f"Error fetching data: {e}")
-            return None
+            count = self.with_retries(read)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # only a complete partition becomes a checkpoint
+        os.replace(tmp_path, path)
+        return count
 
     @staticmethod
-    def save_csv(data, filename):
-        if data:
-            fields = data['head']['vars']
-            fields.extend(['LON', 'LAT'])  # Add latitude and longitude fields
-            fields.remove('minCoord')  # Remove the original coordinate field
-
-            rows = []
-            for result in data['results']['bindings']:
-                row = [result.get(field, {}).get('value', '') for field in fields if field not in ['LAT', 'LON']]
-                coord = result.get('minCoord', {}).get('value', 'Point(0 0)')
-                lon, lat = Wikidata.parse_point(coord)
-                row.append(lat)
-                row.append(lon)
-                rows.append(row)
-
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                csvwriter = csv.writer(csvfile)
-                csvwriter.writerow(fields)  # headers
-                csvwriter.writerows(rows)
-            print(f"Data successfully saved to {filename}")
-        else:
-            print("No data to save.")
+    def to_row(result):
+        row = [result.get(field, '') for field in Wikidata.FIELDS if field not in ['LAT', 'LON']]
+        coord = result.get('minCoord') or 'Point(0 0)'
+        lon, lat = Wikidata.parse_point(coord)
+        row.append(lat)
+        row.append(lon)
+        return row
+
+    def fetch_data(self, refresh=False):
+        """
+        Fetch every partition not already checkpointed, returning all partitions and the ones that failed.
+
+        Checkpoints only outlive a run that had failures (see clear_checkpoints), so
+        they resume that run rather than stand in for a later one.
+        """
+        os.makedirs(self.partition_dir(), exist_ok=True)
+        partitions = self.fetch_partitions()
+        todo = [p for p in partitions if refresh or not os.path.exists(self.partition_path(p))]
+        print(f"{len(partitions)} partitions, {len(todo)} to fetch")
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_partition, p): p for p in todo}
+            for future in as_completed(futures):
+                partition = futures[future]
+                try:
+                    print(f"{partition}: {future.result()} airports")
+                except requests.RequestException as e:
+                    print(f"{partition}: failed ({e})")
+                    failed.append(partition)
+        return partitions, failed
+
+    def save_csv(self, partitions, filename):
+        """Merge partition checkpoints into one file ordered by airport, dropping duplicates."""
+        rows = {}
+        for partition in partitions:
+            path = self.partition_path(partition)
+            if not os.path.exists(path):
+                continue
+            with open(path, newline='', encoding='utf-8') as csvfile:
+                reader = csv.reader(csvfile)
+                next(reader, None)
+                for row in reader:
+                    rows.setdefault(row[0], row)
+
+        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+            csvwriter = csv.writer(csvfile)
+            csvwriter.writerow(self.FIELDS)  # headers
+            csvwriter.writerows(rows[key] for key in sorted(rows))
+        print(f"Data successfully saved to {filename}")
+
+    def update(self, filename, refresh=False):
+        """
+        Fetch every partition and merge them into filename, returning the partitions that failed.
+
+        filename is only rewritten once every partition was fetched, so the airports of a failed
+        partition never look removed. The checkpoints are kept for the rerun instead.
+        """
+        partitions, failed = self.fetch_data(refresh=refresh)
+        if failed:
+            return failed
+        self.save_csv(partitions, filename)
+        self.clear_checkpoints()
+        return failed
+
+    def clear_checkpoints(self):
+        """Remove the partition checkpoints once they are merged, so the next run fetches everything again."""
+        shutil.rmtree(self.partition_dir(), ignore_errors=True)
 
     @staticmethod
     def parse_point(point_str):
@@ -75,9 +222,14 @@ class Wikidata:
         return lat, lon
 
 if __name__ == "__main__":
-    data = Wikidata.fetch_data()
-    if data:
-        Wikidata.save_csv(data, os.path.join('data', 'world', 'wikidata', 'airports.csv'))
-    else:
-        print("Failed to fetch or save data.")
+    parser = argparse.ArgumentParser(description="Fetch Wikidata airports, partitioned by country.")
+    parser.add_argument('--refresh', action='store_true', help="Refetch partitions checkpointed by an earlier run that had failures")
+    parser.add_argument('--workers', type=int, default=Wikidata.MAX_WORKERS, help="Concurrent SPARQL requests")
+    args = parser.parse_args()
 
+    wikidata = Wikidata(max_workers=args.workers)
+    filename = os.path.join(wikidata.data_path, 'airports.csv')
+    failed = wikidata.update(filename, refresh=args.refresh)
+    if failed:
+        print(f"Failed partitions, {filename} left as it was, rerun to retry them: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,61 @@
+"""
+Shared test helpers: scripts/ on the import path, hyphenated scripts loaded by file name, and a
+local HTTP server answering with each test's own handler.
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+@pytest.fixture
+def script():
+    """script('faa-latest') imports scripts/faa-latest.py, which can't be imported by name."""
+    def load(name):
+        spec = importlib.util.spec_from_file_location(name.replace('-', '_'), os.path.join(SCRIPTS_DIR, f'{name}.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+class Handler(BaseHTTPRequestHandler):
+    respond = None
+
+    def do_GET(self):
+        self.respond()
+
+    def reply(self, body=b'', status=200, headers=None, length=None):
+        """Send a whole response, or a Content-Length of length to break the body off early."""
+        body = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body) if length is None else length))
+        self.end_headers()
+        self.wfile.write(body)
+        if length is not None:
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def serve():
+    """serve(respond) starts a local server answering every GET with respond(handler) and returns its URL."""
+    servers = []
+
+    def start(respond):
+        handler = type('StubHandler', (Handler,), {'respond': lambda self: respond(self)})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}'
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
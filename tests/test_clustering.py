@@ -0,0 +1,77 @@
+"""
+Aerodrome ids from clustering.assign across runs, on small synthetic clusters.
+
+Run from the repository root with python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import clustering
+import h3_index
+
+# rows of a cluster STEP apart, clusters GAP apart unless a row is added halfway
+STEP = clustering.EPS / 2
+GAP = 1.8 * clustering.EPS
+
+def rows(points):
+    """Rows of (key, lon, lat) tuples with their cells, as assign and state take them."""
+    df = pd.DataFrame(points, columns=['key', 'lon', 'lat'])
+    df['cell'] = h3_index.cells(df['lat'], df['lon'], clustering.CELL_RESOLUTION)
+    return df
+
+def run(df, previous=None, full=False):
+    ids, _ = clustering.assign(df['key'], df['lon'], df['lat'], df['cell'], previous, full=full)
+    return pd.Series(ids, index=df['key']), clustering.state(df['key'], df['lon'], df['lat'], df['cell'], ids)
+
+def chain(name, lon, lat, size):
+    return [(f'{name}{i}', lon + i * STEP, lat) for i in range(size)]
+
+def world():
+    points = []
+    for n in range(20):
+        points += chain(f'c{n}-', -120 + n, 40 + n % 3, 1 + n % 4)
+    return points
+
+def test_unchanged_rows_keep_their_ids():
+    before = rows(world())
+    first, state = run(before)
+    # one row moved far away, one added next to a cluster, one deleted from another
+    points = [point for point in world() if point[0] != 'c5-1']
+    points = [('c1-0', 10.0, 10.0) if key == 'c1-0' else (key, lon, lat) for key, lon, lat in points]
+    points.append(('new', -120 + 7 + 4 * STEP, 41.0))
+    after = rows(points)
+    for full in (False, True):
+        second, _ = run(after, state, full=full)
+        unchanged = [key for key in after['key'] if key in first.index and key != 'c1-0']
+        assert (second[unchanged] == first[unchanged]).all()
+        # the moved row left the other row of its cluster behind, which keeps the id
+        assert second['c1-0'] not in set(first)
+        assert second['new'] == first['c7-0']
+
+def test_merge_keeps_the_larger_cluster_id():
+    points = chain('a', 0, 0, 3) + chain('b', 2 * STEP + GAP, 0, 2)
+    first, state = run(rows(points))
+    assert first['a0'] != first['b0']
+    bridge = [('bridge', 2 * STEP + GAP / 2, 0)]
+    second, _ = run(rows(points + bridge), state)
+    assert (second == first['a0']).all()
+
+def test_merge_of_equal_clusters_keeps_the_older_id():
+    points = chain('a', 0, 0, 2) + chain('b', STEP + GAP, 0, 2)
+    first, state = run(rows(points))
+    older = min(first['a0'], first['b0'])
+    bridge = [('bridge', STEP + GAP / 2, 0)]
+    second, _ = run(rows(points + bridge), state)
+    assert (second == older).all()
+
+def test_split_keeps_the_id_on_the_larger_part():
+    points = chain('a', 0, 0, 3) + [('gap', 2 * STEP + GAP / 2, 0)] + chain('b', 2 * STEP + GAP, 0, 2)
+    first, state = run(rows(points))
+    assert first.nunique() == 1
+    second, _ = run(rows([point for point in points if point[0] != 'gap']), state)
+    assert (second[['a0', 'a1', 'a2']] == first['a0']).all()
+    assert second['b0'] == second['b1'] != first['a0']
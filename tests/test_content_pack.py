@@ -0,0 +1,61 @@
+"""
+content_pack.py layer writing and pack builds.
+
+Run from the repository root with python -m pytest tests
+"""
+
+import json
+import os
+import zipfile
+import geopandas as gpd
+import shapely
+import content_pack
+
+def test_line_breaks_in_values_keep_properties_with_their_geometry(tmp_path):
+    # all of these are line boundaries to str.splitlines(), only \n is escaped by to_json
+    names = ['plain', 'line\u2028separator', 'paragraph\u2029separator', 'next\x85line', 'file\x1cgroup\x1drecord\x1e',
+             'two\nlines']
+    gdf = gpd.GeoDataFrame({'name': names, 'rank': range(len(names))},
+                           geometry=shapely.points(range(len(names)), range(len(names))), crs='EPSG:4326')
+    path = os.path.join(tmp_path, 'layer.geojson')
+    content_pack.write_layer(gdf, path)
+
+    with open(path, encoding='utf-8') as file:
+        features = json.load(file)['features']
+    assert len(features) == len(names)
+    for feature in features:
+        rank = feature['properties']['rank']
+        assert feature['properties']['name'] == names[rank]
+        assert feature['geometry']['coordinates'] == [rank, rank]
+
+def write_pack(root, version, names):
+    pack_dir = os.path.join(root, content_pack.CONTENT_PACK_DIR, content_pack.PACK_NAME)
+    os.makedirs(os.path.join(pack_dir, 'layers'), exist_ok=True)
+    with open(os.path.join(pack_dir, 'manifest.json'), 'w') as file:
+        json.dump({'name': 'Barbless Maps', 'version': version}, file)
+    gdf = gpd.GeoDataFrame({'ARPT_ID': ['AAA', 'BBB'], 'name': names},
+                           geometry=[shapely.Point(-120, 40), shapely.Point(-110, 45)], crs='EPSG:4326')
+    gdf.to_file(os.path.join(pack_dir, 'layers', 'Gas and Grass.geojson'), driver='GeoJSON')
+    return pack_dir
+
+def test_manifest_versions_are_integers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pack_dir = write_pack(tmp_path, 1.0, ['Alpha', 'Bravo'])
+    assert content_pack.build(pack_dir)['version'] == 1
+    content_pack.mark_published()
+
+    # a pack published while versions were written as 1.0
+    published = os.path.join(content_pack.PUBLISHED_DIR, 'manifest.json')
+    with open(published) as file:
+        manifest = json.load(file)
+    with open(published, 'w') as file:
+        json.dump(dict(manifest, version=1.0), file)
+
+    write_pack(tmp_path, 1, ['Alpha', 'Bravo renamed'])
+    assert content_pack.build(pack_dir)['version'] == 2
+    with open(os.path.join(pack_dir, 'manifest.json')) as file:
+        assert '"version": 2,' in file.read()
+    delta = os.path.join(content_pack.BUILD_DIR, f'{content_pack.PACK_NAME}-delta-1-2.zip')
+    with zipfile.ZipFile(delta) as archive:
+        summary = json.loads(archive.read('delta.json'))
+    assert (summary['from'], summary['version']) == (1, 2)
@@ -0,0 +1,198 @@
+"""
+daylight-latest.py: the local reader over a small osm_features Parquet fixture, and the Athena
+orchestration over fake Athena and S3 clients.
+
+Run from the repository root with python -m pytest tests
+"""
+
+import os
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import pytest
+
+SCHEMA = pa.schema([('id', pa.int64()), ('version', pa.int32()), ('tags', pa.map_(pa.string(), pa.string())),
+                    ('wkt', pa.string()), ('min_lon', pa.float64()), ('max_lon', pa.float64()),
+                    ('min_lat', pa.float64()), ('max_lat', pa.float64())])
+
+def features(rows):
+    """(id, tags, wkt, (min_lon, max_lon, min_lat, max_lat)) rows as a table in the osm_features schema."""
+    return pa.table({
+        'id': [row[0] for row in rows], 'version': [1] * len(rows), 'tags': [list(row[1].items()) for row in rows],
+        'wkt': [row[2] for row in rows], 'min_lon': [row[3][0] for row in rows], 'max_lon': [row[3][1] for row in rows],
+        'min_lat': [row[3][2] for row in rows], 'max_lat': [row[3][3] for row in rows],
+    }, schema=SCHEMA)
+
+@pytest.fixture
+def release(tmp_path):
+    """Two releases of osm_features, with an unreadable relation partition that pruning must never open."""
+    def write(release, kind, rows):
+        directory = os.path.join(tmp_path, f'release={release}', f'type={kind}')
+        os.makedirs(directory)
+        pq.write_table(features(rows), os.path.join(directory, 'part-0.parquet'))
+
+    square = 'POLYGON ((0 0, 4 0, 4 2, 0 2, 0 0))'
+    write('v1.0', 'node', [(1, {'aeroway': 'aerodrome', 'name': 'Old'}, 'POINT (9 9)', (9, 9, 9, 9))])
+    write('v1.1', 'node', [
+        (10, {'aeroway': 'aerodrome', 'name': 'Strip', 'fuel:100ll': 'yes', 'fuel:jeta1': 'no', 'fuel:mogas': 'Yes'},
+         'POINT (1 2)', (1, 1, 2, 2)),
+        (11, {'aeroway': 'aerodrome', 'name': 'Dry'}, 'POINT (3 4)', (3, 3, 4, 4)),
+        (12, {'amenity': 'cafe', 'name': 'Not an aerodrome'}, 'POINT (5 6)', (5, 5, 6, 6)),
+    ])
+    # the bounding box centroid of the L shape is (2, 1), its WKT centroid is not
+    write('v1.1', 'way', [(20, {'aeroway': 'runway', 'surface': 'grass', 'ref': '09/27'},
+                           'POLYGON ((0 0, 4 0, 4 1, 1 1, 1 2, 0 2, 0 0))', (0, 4, 0, 2)),
+                          (21, {'aeroway': 'runway', 'surface': 'asphalt'}, square, (0, 4, 0, 2)),
+                          # the same id as a node, only unique together with the type
+                          (10, {'aeroway': 'aerodrome', 'name': 'Strip apron', 'fuel:diesel': 'yes'}, square,
+                           (0, 4, 0, 2))])
+    relation = os.path.join(tmp_path, 'release=v1.1', 'type=relation')
+    os.makedirs(relation)
+    with open(os.path.join(relation, 'part-0.parquet'), 'wb') as file:
+        file.write(b'not parquet')
+    return str(tmp_path)
+
+@pytest.fixture
+def daylight(script):
+    return script('daylight-latest')
+
+def read_csv(path):
+    # missing tags are written as empty fields
+    return pacsv.read_csv(path).to_pylist()
+
+def test_local_reader_scans_one_release_and_projects_tags(daylight, release, tmp_path):
+    reader = daylight.LocalDaylightReader(release, types=['node', 'way'])
+    assert reader.latest_release() == 'v1.1'
+
+    out = os.path.join(tmp_path, 'runway.csv')
+    assert reader.save_top_csv(['surface', 'ref', 'width'], 'runway', 'v1.1', out) == 2
+    rows = read_csv(out)
+    assert list(rows[0]) == ['id', 'latitude', 'longitude', 'surface', 'ref', 'width']
+    assert [(row['id'], row['latitude'], row['longitude'], row['surface'], row['ref']) for row in rows] == [
+        (20, 1.0, 2.0, 'grass', '09/27'), (21, 1.0, 2.0, 'asphalt', '')]
+
+def test_local_reader_adds_fuels_to_aerodromes(daylight, release, tmp_path):
+    reader = daylight.LocalDaylightReader(release, types=['node', 'way'])
+    out = os.path.join(tmp_path, 'aerodrome.csv')
+    assert reader.save_top_csv(['name'], 'aerodrome', 'v1.1', out) == 3
+    rows = read_csv(out)
+    assert list(rows[0]) == ['id', 'latitude', 'longitude', 'name', 'fuels']
+    assert sorted((row['id'], row['name'], row['fuels']) for row in rows) == [
+        (10, 'Strip', '100ll;mogas'), (10, 'Strip apron', 'diesel'), (11, 'Dry', '')]
+
+def test_tags_parquet_keys_features_on_type_and_id(daylight, release, tmp_path):
+    reader = daylight.LocalDaylightReader(release, types=['node', 'way'])
+    out = os.path.join(tmp_path, 'aerodrome.parquet')
+    assert reader.save_tags_parquet('aerodrome', 'v1.1', out) == 3
+    table = pq.read_table(out)
+    assert table.column_names[:4] == ['type', 'id', 'latitude', 'longitude']
+    assert table.select(['type', 'id', 'name', 'fuels']).to_pylist() == [
+        {'type': 'node', 'id': 10, 'name': 'Strip', 'fuels': '100ll;mogas'},
+        {'type': 'node', 'id': 11, 'name': 'Dry', 'fuels': None},
+        {'type': 'way', 'id': 10, 'name': 'Strip apron', 'fuels': 'diesel'}]
+
+def test_local_reader_wkt_centroids(daylight, release, tmp_path):
+    reader = daylight.LocalDaylightReader(release, types=['way'], centroid='wkt')
+    out = os.path.join(tmp_path, 'runway.csv')
+    reader.save_top_csv(['surface'], 'runway', 'v1.1', out)
+    rows = {row['id']: row for row in read_csv(out)}
+    assert (rows[21]['latitude'], rows[21]['longitude']) == (1.0, 2.0)
+    assert rows[20]['longitude'] == pytest.approx(1.7) and rows[20]['latitude'] == pytest.approx(0.7)
+
+def test_local_reader_only_opens_the_wanted_partitions(daylight, release):
+    # the relation partition isn't parquet at all, so scanning it would raise
+    reader = daylight.LocalDaylightReader(release)
+    with pytest.raises(pa.ArrowInvalid):
+        list(reader.scan_top([], 'runway', 'v1.1'))
+
+class FakeAthena:
+    """Queries that succeed after a given number of RUNNING polls, recording every batch poll."""
+    def __init__(self, polls_until_done, failing=()):
+        self.polls_until_done = polls_until_done
+        self.failing = failing
+        self.started = []
+        self.batches = []
+
+    def start_query_execution(self, QueryString, QueryExecutionContext, ResultConfiguration):
+        query_execution_id = f'q{len(self.started)}'
+        self.started.append((query_execution_id, QueryString, ResultConfiguration['OutputLocation']))
+        return {'QueryExecutionId': query_execution_id}
+
+    def batch_get_query_execution(self, QueryExecutionIds):
+        self.batches.append(list(QueryExecutionIds))
+        executions = []
+        for query_execution_id in QueryExecutionIds:
+            polled = sum(query_execution_id in batch for batch in self.batches)
+            state = 'RUNNING'
+            if polled > self.polls_until_done[query_execution_id]:
+                state = 'FAILED' if query_execution_id in self.failing else 'SUCCEEDED'
+            executions.append({
+                'QueryExecutionId': query_execution_id,
+                'Status': {'State': state, 'StateChangeReason': 'syntax error'},
+                'ResultConfiguration': {'OutputLocation': f's3://results/{query_execution_id}.csv'},
+                'Statistics': {'DataScannedInBytes': 1000, 'EngineExecutionTimeInMillis': 20,
+                               'TotalExecutionTimeInMillis': 30},
+            })
+        return {'QueryExecutions': executions}
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+        self.chunk_sizes = []
+
+    def iter_chunks(self, chunk_size):
+        self.chunk_sizes.append(chunk_size)
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start:start + chunk_size]
+
+    def read(self):
+        raise AssertionError('results are streamed, not read whole')
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+        self.requested = []
+
+    def get_object(self, Bucket, Key):
+        self.requested.append((Bucket, Key))
+        return {'Body': self.objects[(Bucket, Key)]}
+
+@pytest.fixture
+def sleeps(daylight, monkeypatch):
+    slept = []
+    monkeypatch.setattr(daylight.time, 'sleep', slept.append)
+    return slept
+
+def test_queries_are_submitted_together_and_polled_with_backoff(daylight, sleeps):
+    athena = FakeAthena({'q0': 2, 'q1': 7})
+    runner = daylight.AthenaQueryRunner('db', 's3://results/', athena=athena, glue=object(), s3=object())
+    executions = runner.run_queries({'runway': 'SELECT 1', 'aerodrome': 'SELECT 2'})
+
+    assert [started[1] for started in athena.started] == ['SELECT 1', 'SELECT 2']
+    assert {name: execution['QueryExecutionId'] for name, execution in executions.items()} == {
+        'runway': 'q0', 'aerodrome': 'q1'}
+    # both queries in one call per round until the quick one is done, then only the slow one
+    assert athena.batches[:3] == [['q0', 'q1']] * 3
+    assert athena.batches[3:] == [['q1']] * 5
+    assert sleeps == [0.5, 1, 2, 4, 8, 16, 30]
+    assert runner.stats['q1'] == {'bytes_scanned': 1000, 'engine_execution_ms': 20, 'total_execution_ms': 30}
+
+def test_failed_query_raises_with_its_reason(daylight, sleeps):
+    athena = FakeAthena({'q0': 1}, failing={'q0'})
+    runner = daylight.AthenaQueryRunner('db', 's3://results/', athena=athena, glue=object(), s3=object())
+    with pytest.raises(Exception, match='q0 failed due to: syntax error'):
+        runner.wait_for_query_to_complete(runner.run_query('SELECT broken'))
+
+def test_results_are_streamed_from_s3(daylight, tmp_path):
+    data = b'"id","latitude","longitude"\n' + b''.join(f'"{i}","1.0","2.0"\n'.encode() for i in range(100))
+    body = FakeBody(data)
+    s3 = FakeS3({('results', 'athena/q0.csv'): body})
+    runner = daylight.AthenaQueryRunner('db', 's3://results/', athena=object(), glue=object(), s3=s3)
+    runner.CHUNK_SIZE = 64
+    out = os.path.join(tmp_path, 'runway.csv')
+    runner.download_results({'ResultConfiguration': {'OutputLocation': 's3://results/athena/q0.csv'}}, out)
+
+    assert s3.requested == [('results', 'athena/q0.csv')]
+    assert body.chunk_sizes == [64]
+    with open(out, 'rb') as file:
+        assert file.read() == data
@@ -0,0 +1,73 @@
+"""
+faa-latest.py's NASR cycle download against a local HTTP stub serving a small zip.
+
+Run from the repository root with python -m pytest tests
+"""
+
+import io
+import os
+import zipfile
+import pandas as pd
+import pytest
+
+BASE_COLUMNS = 'EFF_DATE,SITE_NO,ARPT_ID,ARPT_NAME\n'
+RWY_COLUMNS = 'EFF_DATE,SITE_NO,ARPT_ID,RWY_ID,RWY_LEN\n'
+
+def nasr_zip(eff_date):
+    """A NASR CSV zip with the two files faa-latest.py wants, one nested in a folder, and some it doesn't."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('CSV_Data/APT_BASE.csv', BASE_COLUMNS
+                         + f'{eff_date},1,AAA,Same Field\n{eff_date},2,BBB,Renamed Field\n{eff_date},4,DDD,New Field\n')
+        archive.writestr('APT_RWY.csv', RWY_COLUMNS + f'{eff_date},1,AAA,09/27,3000\n{eff_date},2,BBB,18/36,2500\n')
+        archive.writestr('ATC_BASE.csv', 'EFF_DATE,FACILITY_ID\n')
+        archive.writestr('Layout_Data/apt_base.pdf', b'%PDF')
+    return buffer.getvalue()
+
+@pytest.fixture
+def faa(script, serve, tmp_path):
+    module = script('faa-latest')
+    requested = []
+    cycle = module.FAA().current_data_cycle().strftime('%Y/%m/%d')
+    archive = nasr_zip(cycle)
+
+    def respond(handler):
+        requested.append(handler.path)
+        handler.reply(archive, headers={'Content-Type': 'application/zip'})
+    return module.FAA(data_path=str(tmp_path), base_url=serve(respond)), requested, cycle
+
+def write(path, text):
+    with open(path, 'w') as file:
+        file.write(text)
+
+def test_update_extracts_only_the_wanted_files_and_diffs_sites(faa, tmp_path):
+    faa, requested, _ = faa
+    # the previous cycle, with site 2 renamed and site 3 closed since
+    write(os.path.join(tmp_path, 'APT_BASE.csv'), BASE_COLUMNS
+          + '2024/01/25,1,AAA,Same Field\n2024/01/25,2,BBB,Old Name\n2024/01/25,3,CCC,Closed Field\n')
+    write(os.path.join(tmp_path, 'APT_RWY.csv'), RWY_COLUMNS
+          + '2024/01/25,1,AAA,09/27,3000\n2024/01/25,2,BBB,18/36,2500\n')
+
+    changes = faa.update()
+    assert requested == [f"/{faa.current_data_cycle().strftime('%d_%b_%Y')}_CSV.zip"]
+    assert sorted(os.listdir(tmp_path)) == ['APT_BASE.csv', 'APT_RWY.csv', 'changes.csv']
+    assert faa.local_data_cycle() == faa.current_data_cycle()
+
+    # EFF_DATE moved on every row, only the sites that really changed are listed
+    expected = {('2', 'BBB', 'APT_BASE.csv', 'changed'), ('3', 'CCC', 'APT_BASE.csv', 'removed'),
+                ('4', 'DDD', 'APT_BASE.csv', 'added')}
+    assert set(changes[['SITE_NO', 'ARPT_ID', 'file', 'change']].itertuples(index=False, name=None)) == expected
+    saved = pd.read_csv(faa.get_changes_path(), dtype=str)
+    assert set(saved.itertuples(index=False, name=None)) == expected
+
+def test_update_skips_the_download_when_the_cycle_is_current(faa, tmp_path):
+    faa, requested, cycle = faa
+    write(os.path.join(tmp_path, 'APT_RWY.csv'), RWY_COLUMNS + f'{cycle},1,AAA,09/27,3000\n')
+
+    assert faa.update() is None
+    assert requested == []
+    assert not os.path.exists(faa.get_changes_path())
+
+    # --force downloads anyway
+    assert faa.update(force=True) is not None
+    assert len(requested) == 1
@@ -0,0 +1,68 @@
+"""
+ourairports-latest.py's conditional downloads and change set against a local HTTP stub.
+
+Run from the repository root with python -m pytest tests
+"""
+
+import os
+import pandas as pd
+import pytest
+
+AIRPORTS = 'id,ident,type,latitude_deg,longitude_deg\n'
+RUNWAYS = 'id,airport_ref,le_ident,length_ft\n'
+
+@pytest.fixture
+def ourairports(script, serve, tmp_path):
+    module = script('ourairports-latest')
+    files = {}
+
+    def respond(handler):
+        name = handler.path.lstrip('/')
+        if name not in files:
+            return handler.reply('unavailable', status=503)
+        etag = f'"{name}"'
+        if handler.headers.get('If-None-Match') == etag:
+            return handler.reply(status=304)
+        handler.reply(files[name], headers={'ETag': etag})
+    return module.OurAirports(data_path=str(tmp_path), base_url=serve(respond)), files
+
+def write(path, text):
+    with open(path, 'w') as file:
+        file.write(text)
+
+def test_failed_download_keeps_the_earlier_changes_of_that_file(ourairports, tmp_path):
+    ourairports, files = ourairports
+    write(os.path.join(tmp_path, 'airports.csv'), AIRPORTS + '1,AAA,small_airport,10.0,20.0\n3,CCC,heliport,0.0,0.0\n')
+    write(os.path.join(tmp_path, 'runways.csv'), RUNWAYS + '100,1,09,3000\n')
+    # an earlier run's change set that --changed-only has not used yet
+    write(ourairports.changes_path(), 'id,file,change,old_type,new_type,moved_m\n'
+          + '3,airports.csv,added,,heliport,\n100,runways.csv,changed,,,\n')
+    files['airports.csv'] = AIRPORTS + '1,AAA,small_airport,10.1,20.0\n2,BBB,closed,5.0,5.0\n3,CCC,small_airport,0.0,0.0\n'
+
+    changes, failed = ourairports.download_and_copy()
+    assert failed == ['runways.csv']
+    assert not os.path.exists(os.path.join(tmp_path, 'runways.csv.new'))
+
+    saved = pd.read_csv(ourairports.changes_path())
+    assert saved[['id', 'file', 'change']].to_records(index=False).tolist() == [
+        (100, 'runways.csv', 'changed'), (1, 'airports.csv', 'moved'),
+        (2, 'airports.csv', 'added'), (3, 'airports.csv', 'type_changed')]
+    assert saved.loc[saved['id'] == 1, 'moved_m'].item() == pytest.approx(11119, rel=1e-3)
+    assert len(changes) == 4
+
+def test_complete_refresh_replaces_the_change_set(ourairports, tmp_path):
+    ourairports, files = ourairports
+    write(ourairports.changes_path(), 'id,file,change,old_type,new_type,moved_m\n100,runways.csv,changed,,,\n')
+    files['airports.csv'] = AIRPORTS + '1,AAA,small_airport,10.0,20.0\n'
+    files['runways.csv'] = RUNWAYS + '100,1,09,3000\n'
+
+    _, failed = ourairports.download_and_copy()
+    assert failed == []
+    saved = pd.read_csv(ourairports.changes_path())
+    assert saved[['id', 'file', 'change']].to_records(index=False).tolist() == [
+        (1, 'airports.csv', 'added'), (100, 'runways.csv', 'added')]
+
+    # the validators make the next run conditional, and nothing new leaves the change set as it was
+    _, failed = ourairports.download_and_copy()
+    assert failed == []
+    assert pd.read_csv(ourairports.changes_path()).equals(saved)
@@ -0,0 +1,78 @@
+"""
+wikidata-latest.py's partitioned fetch against a stub SPARQL endpoint.
+
+Run from the repository root with python -m pytest tests
+"""
+
+import csv
+import os
+import re
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+COUNTRIES = ['Q16', 'Q30']
+HEADER = 'airport,minName,minEle,minRunway,minICAO,minIATA,minWebsite,minCoord,minOSM\n'
+
+class Endpoint:
+    """Answers the countries query and one airport per partition, failing or breaking off partitions on request."""
+    def __init__(self):
+        self.failing = set()
+        self.broken = set()
+        self.queried = []
+
+    def __call__(self, handler):
+        query = parse_qs(urlparse(handler.path).query)['query'][0]
+        if 'SELECT DISTINCT ?country' in query:
+            return handler.reply('country\n' + ''.join(f'http://www.wikidata.org/entity/{q}\n' for q in COUNTRIES))
+        found = re.search(r'wdt:P17 wd:(Q\d+)\.', query)
+        partition = found.group(1) if found else 'none'
+        self.queried.append(partition)
+        if partition in self.failing:
+            return handler.reply('malformed query', status=400)
+        body = HEADER + f'http://www.wikidata.org/entity/A{partition},{partition} Field,10,,,,,Point(-1.5 2.5),\n'
+        if partition in self.broken:
+            self.broken.discard(partition)
+            return handler.reply(body[:len(HEADER) + 5], length=len(body))
+        handler.reply(body)
+
+@pytest.fixture
+def wikidata(script, serve, tmp_path, monkeypatch):
+    module = script('wikidata-latest')
+    monkeypatch.setattr(module.time, 'sleep', lambda seconds: None)
+    endpoint = Endpoint()
+    return module.Wikidata(endpoint=serve(endpoint), data_path=str(tmp_path), max_workers=2), endpoint
+
+def airports(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+def test_failed_partition_leaves_airports_csv_alone(wikidata, tmp_path):
+    wikidata, endpoint = wikidata
+    filename = os.path.join(tmp_path, 'airports.csv')
+    with open(filename, 'w') as file:
+        file.write('previous run\n')
+    endpoint.failing.add('Q16')
+
+    assert wikidata.update(filename) == ['Q16']
+    with open(filename) as file:
+        assert file.read() == 'previous run\n'
+    assert sorted(os.listdir(wikidata.partition_dir())) == ['Q30.csv', 'none.csv']
+
+    # the rerun only fetches the failed partition and then writes every one
+    endpoint.failing.clear()
+    endpoint.queried.clear()
+    assert wikidata.update(filename) == []
+    assert endpoint.queried == ['Q16']
+    rows = airports(filename)
+    assert [row['airport'].rsplit('/', 1)[-1] for row in rows] == ['AQ16', 'AQ30', 'Anone']
+    assert (rows[0]['LON'], rows[0]['LAT']) == ('-1.5', '2.5')
+    assert not os.path.exists(wikidata.partition_dir())
+
+def test_broken_off_stream_is_read_again(wikidata, tmp_path):
+    wikidata, endpoint = wikidata
+    filename = os.path.join(tmp_path, 'airports.csv')
+    endpoint.broken.add('Q30')
+
+    assert wikidata.update(filename) == []
+    assert endpoint.queried.count('Q30') == 2
+    assert [row['minName'] for row in airports(filename)] == ['Q16 Field', 'Q30 Field', 'none Field']